@@ -16,14 +16,20 @@ import warnings
 warnings.filterwarnings('ignore')
 
 import statsmodels.api as sm
-import statsmodels.formula.api as smf
 from statsmodels.stats.outliers_influence import variance_inflation_factor
 
+from model_specs import get_spec
+from resampling import ResamplingExecutor
+from wild_bootstrap import N_WILD_BOOT, wild_cluster_ols, wild_score_logit
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "analysis" / "output" / "holdings_prepared.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
 
+PARSIMONIOUS_FORMULA = ("pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + "
+                        "pro_ds_purpose + level_shifting + any_balancing")
+
 def calculate_vif(df, features):
     """Calculate Variance Inflation Factors for multicollinearity check."""
     X = df[features].dropna()
@@ -39,7 +45,7 @@ def calculate_vif(df, features):
 def logistic_regression(df, formula, model_name):
     """Fit logistic regression and return results summary."""
     try:
-        model = smf.logit(formula, data=df).fit(disp=0)
+        model = get_spec(formula, df).logit()
 
         # Extract results
         results = {
@@ -242,12 +248,7 @@ def run_multivariate_analysis(df):
     print("MODEL 6: PARSIMONIOUS (Key Predictors Only)")
     print("-" * 70)
 
-    m6, r6 = logistic_regression(
-        df,
-        """pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) +
-           pro_ds_purpose + level_shifting + any_balancing""",
-        "Model 6: Parsimonious"
-    )
+    m6, r6 = logistic_regression(df, PARSIMONIOUS_FORMULA, "Model 6: Parsimonious")
     if r6:
         all_results.append(r6)
         models['m6'] = m6
@@ -308,6 +309,42 @@ def run_multivariate_analysis(df):
     coef_df = pd.DataFrame(coef_data)
     print("\n" + coef_df.to_string(index=False))
 
+    # =========================================================================
+    # FEW-CLUSTER INFERENCE: WILD CLUSTER BOOTSTRAP
+    # =========================================================================
+    print("\n" + "-" * 70)
+    print("FEW-CLUSTER INFERENCE: WILD CLUSTER BOOTSTRAP (BEST MODEL)")
+    print("-" * 70)
+
+    # Holdings are clustered in cases; with this few clusters, bootstrap
+    # p-values under the null replace CR1 cluster-robust Wald p-values
+    spec = get_spec(best_model['formula'], df)
+    case_groups = df['case_id'].values[spec.rows]
+    with ResamplingExecutor() as executor:
+        wild_logit = wild_score_logit(spec.X, spec.y, case_groups, spec.columns,
+                                      executor=executor)
+        wild_lpm = wild_cluster_ols(spec.X, spec.y, case_groups, spec.columns,
+                                    executor=executor)
+
+    print(f"\n  Rademacher weights, {N_WILD_BOOT:,} replicates, "
+          f"{len(np.unique(case_groups))} case clusters")
+    print(f"\n  {'Variable':<45s} {'Naive p':>8s} {'CR1 p':>8s} {'Boot p':>8s} {'LPM boot p':>11s}")
+    print("  " + "-" * 84)
+    for var, res in wild_logit.items():
+        var_clean = var.replace(", Treatment(reference='OTHER')", "")
+        var_clean = var_clean.replace(", Treatment(reference='SEMANTIC')", "")
+        var_clean = var_clean.replace(", Treatment(reference='RULE_BASED')", "")
+        print(f"  {var_clean:<45s} {best_model['coefficients'][var]['p']:>8.4f} "
+              f"{res['p_cluster']:>8.4f} {res['p_boot']:>8.4f} {wild_lpm[var]['p_boot']:>11.4f}")
+
+    best_model['wild_cluster_bootstrap'] = {
+        'n_boot': N_WILD_BOOT,
+        'weights': 'rademacher',
+        'n_clusters': int(len(np.unique(case_groups))),
+        'logit_score_bootstrap': wild_logit,
+        'lpm_wcr_bootstrap': wild_lpm,
+    }
+
     # =========================================================================
     # MULTICOLLINEARITY CHECK
     # =========================================================================
@@ -334,30 +371,32 @@ def run_multivariate_analysis(df):
 
     if 'm6' in models and models['m6'] is not None:
         model = models['m6']
+        spec = get_spec(PARSIMONIOUS_FORMULA, df)
+        kept = df.iloc[spec.rows]
 
         # By dominant source
         print("\nPredicted P(Pro-DS) by Dominant Source:")
         for source in ['SEMANTIC', 'SYSTEMATIC', 'TELEOLOGICAL']:
-            subset = df[df['dominant_source'] == source]
+            subset = np.flatnonzero(kept['dominant_source'].values == source)
             if len(subset) > 0:
-                pred_prob = model.predict(subset).mean()
+                pred_prob = spec.predict(model.params, rows=subset).mean()
                 print(f"  {source}: {pred_prob*100:.1f}%")
 
         # By pro-DS purpose
         print("\nPredicted P(Pro-DS) by Pro-DS Purpose Invoked:")
         for val in [0, 1]:
-            subset = df[df['pro_ds_purpose'] == val]
+            subset = np.flatnonzero(kept['pro_ds_purpose'].values == val)
             if len(subset) > 0:
-                pred_prob = model.predict(subset).mean()
+                pred_prob = spec.predict(model.params, rows=subset).mean()
                 label = "Yes" if val == 1 else "No"
                 print(f"  {label}: {pred_prob*100:.1f}%")
 
         # By level shifting
         print("\nPredicted P(Pro-DS) by Level Shifting:")
         for val in [0, 1]:
-            subset = df[df['level_shifting'] == val]
+            subset = np.flatnonzero(kept['level_shifting'].values == val)
             if len(subset) > 0:
-                pred_prob = model.predict(subset).mean()
+                pred_prob = spec.predict(model.params, rows=subset).mean()
                 label = "Yes" if val == 1 else "No"
                 print(f"  {label}: {pred_prob*100:.1f}%")
 
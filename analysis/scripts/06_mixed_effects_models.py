@@ -5,7 +5,10 @@
 Implement mixed-effects logistic regression to properly handle
 non-independence of holdings within cases.
 
-Uses case-level random intercepts to account for clustering.
+Uses case-level random intercepts to account for clustering: a
+random-intercept logistic GLMM (Laplace and adaptive Gauss-Hermite
+quadrature, optionally with a rapporteur intercept), compared with GEE,
+cluster-robust and wild cluster bootstrap inference.
 """
 
 import pandas as pd
@@ -16,6 +19,14 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+from glmm import N_GLMM_BOOT, RandomInterceptLogit, case_bootstrap
+from model_specs import get_spec
+from resampling import ResamplingExecutor
+from wild_bootstrap import N_WILD_BOOT, wild_cluster_ols, wild_score_logit
+
+# Adaptive Gauss-Hermite nodes per case for the GLMM
+GLMM_QUAD_NODES = 9
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "analysis" / "output" / "holdings_prepared.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
@@ -48,7 +59,6 @@ def run_mixed_effects_analysis(df):
     print("-" * 70)
 
     import statsmodels.api as sm
-    import statsmodels.formula.api as smf
     from statsmodels.genmod.generalized_estimating_equations import GEE
     from statsmodels.genmod.families import Binomial
     from statsmodels.genmod.cov_struct import Exchangeable
@@ -60,14 +70,17 @@ def run_mixed_effects_analysis(df):
     # Sort by case for GEE
     df_gee = df_gee.sort_values('case_num')
 
+    # The same specification is fitted by GEE, cluster-robust and naive
+    # logit; compile its design matrix once
+    formula = "pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + pro_ds_purpose + level_shifting + C(chamber_grouped, Treatment(reference='OTHER'))"
+    spec = get_spec(formula, df_gee)
+    case_groups = df_gee['case_num'].values[spec.rows]
+
     # GEE Model
     try:
-        formula = "pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + pro_ds_purpose + level_shifting + C(chamber_grouped, Treatment(reference='OTHER'))"
-
-        gee_model = smf.gee(
-            formula,
-            groups="case_num",
-            data=df_gee,
+        gee_model = GEE(
+            *spec.endog_exog(),
+            groups=case_groups,
             family=Binomial(),
             cov_struct=Exchangeable()
         ).fit()
@@ -116,12 +129,9 @@ def run_mixed_effects_analysis(df):
 
     # Standard logistic with cluster-robust SEs
     try:
-        formula = "pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + pro_ds_purpose + level_shifting + C(chamber_grouped, Treatment(reference='OTHER'))"
-
-        logit_model = smf.logit(formula, data=df_gee).fit(
+        logit_model = spec.logit(
             cov_type='cluster',
-            cov_kwds={'groups': df_gee['case_num']},
-            disp=0
+            cov_kwds={'groups': case_groups}
         )
 
         print("\nCluster-Robust Logistic Regression:")
@@ -157,6 +167,43 @@ def run_mixed_effects_analysis(df):
         print(f"  Cluster-robust failed: {e}")
         cluster_results = None
 
+    # =========================================================================
+    # FEW-CLUSTER INFERENCE: WILD CLUSTER BOOTSTRAP
+    # =========================================================================
+    print("\n" + "-" * 70)
+    print("FEW-CLUSTER INFERENCE: WILD CLUSTER BOOTSTRAP")
+    print("-" * 70)
+
+    # With ~67 cases, CR1 Wald tests over-reject; impose each null and flip
+    # the signs of whole cases (score bootstrap for the logit, WCR
+    # bootstrap-t for the linear probability model)
+    with ResamplingExecutor() as executor:
+        wild_logit = wild_score_logit(spec.X, spec.y, case_groups, spec.columns,
+                                      executor=executor)
+        wild_lpm = wild_cluster_ols(spec.X, spec.y, case_groups, spec.columns,
+                                    executor=executor)
+
+    print(f"\n  Rademacher weights, {N_WILD_BOOT:,} replicates, "
+          f"{len(np.unique(case_groups))} case clusters")
+    print(f"\n  {'Variable':<28s} {'Logit p':>8s} {'Boot p':>8s} "
+          f"{'LPM coef':>9s} {'LPM p':>8s} {'Boot p':>8s}")
+    print("  " + "-" * 74)
+    for var in wild_logit:
+        var_clean = var.replace("C(dominant_source, Treatment(reference='SEMANTIC'))", "")
+        var_clean = var_clean.replace("C(chamber_grouped, Treatment(reference='OTHER'))", "")
+        var_clean = var_clean.replace("[T.", "").replace("]", "")
+        logit_res, lpm_res = wild_logit[var], wild_lpm[var]
+        print(f"  {var_clean:<28s} {logit_res['p_cluster']:>8.4f} {logit_res['p_boot']:>8.4f} "
+              f"{lpm_res['coef']:>+9.3f} {lpm_res['p_cluster']:>8.4f} {lpm_res['p_boot']:>8.4f}")
+
+    wild_results = {
+        'method': 'Wild cluster bootstrap (restricted, Rademacher)',
+        'n_boot': N_WILD_BOOT,
+        'n_clusters': int(len(np.unique(case_groups))),
+        'logit_score_bootstrap': wild_logit,
+        'lpm_wcr_bootstrap': wild_lpm,
+    }
+
     # =========================================================================
     # METHOD 3: COMPARE WITH NAIVE (NON-CLUSTERED) MODEL
     # =========================================================================
@@ -165,7 +212,7 @@ def run_mixed_effects_analysis(df):
     print("-" * 70)
 
     # Naive model
-    naive_model = smf.logit(formula, data=df_gee).fit(disp=0)
+    naive_model = spec.logit()
 
     print("\nKey predictors - Naive vs Cluster-Robust SEs:")
     print(f"{'Variable':<30s} {'Naive SE':>10s} {'Cluster SE':>12s} {'SE Ratio':>10s}")
@@ -203,7 +250,7 @@ def run_mixed_effects_analysis(df):
 
     # Case-level logistic
     case_formula = "pro_ds_majority ~ pro_ds_purpose + level_shifting + C(chamber_grouped, Treatment(reference='OTHER'))"
-    case_model = smf.logit(case_formula, data=case_level).fit(disp=0)
+    case_model = get_spec(case_formula, case_level).logit()
 
     print("\n  Case-level logistic regression:")
     print(f"  N = {int(case_model.nobs)}, Pseudo-R² = {case_model.prsquared:.4f}")
@@ -214,6 +261,75 @@ def run_mixed_effects_analysis(df):
         sig = '***' if p < 0.001 else ('**' if p < 0.01 else ('*' if p < 0.05 else ''))
         print(f"    {var}: OR={or_val:.3f}, p={p:.4f} {sig}")
 
+    # =========================================================================
+    # METHOD 5: RANDOM-INTERCEPT GLMM
+    # =========================================================================
+    print("\n" + "-" * 70)
+    print("METHOD 5: RANDOM-INTERCEPT LOGISTIC GLMM (LAPLACE / ADAPTIVE QUADRATURE)")
+    print("-" * 70)
+
+    # Each fit is warm-started from the previous one (parameters and case
+    # modes); so is every bootstrap replicate
+    laplace = RandomInterceptLogit(spec.X, spec.y, case_groups, columns=spec.columns).fit()
+    aghq_model = RandomInterceptLogit(spec.X, spec.y, case_groups, n_quad=GLMM_QUAD_NODES,
+                                      columns=spec.columns)
+    aghq = aghq_model.fit(start=laplace)
+    rapporteurs = df_gee['judge_rapporteur'].fillna('UNKNOWN').values[spec.rows]
+    nested = RandomInterceptLogit(spec.X, spec.y, [case_groups, rapporteurs],
+                                  columns=spec.columns).fit(start=aghq)
+
+    with ResamplingExecutor() as executor:
+        boot = case_bootstrap(aghq_model, aghq, n_boot=N_GLMM_BOOT, executor=executor)
+    boot_ok = boot[~np.isnan(boot[:, 0])]
+
+    print(f"\n  Random intercept SD (logit scale):")
+    print(f"    {'Case, Laplace:':<32s}{laplace['sigma'][0]:.4f}  (logLik = {laplace['llf']:.3f})")
+    print(f"    {f'Case, AGHQ ({GLMM_QUAD_NODES} nodes):':<32s}{aghq['sigma'][0]:.4f}  (logLik = {aghq['llf']:.3f})")
+    print(f"    {'Case + rapporteur, Laplace:':<32s}{nested['sigma'][0]:.4f} / {nested['sigma'][1]:.4f}  "
+          f"(logLik = {nested['llf']:.3f}, {nested['n_groups'][1]} rapporteurs)")
+    if aghq['at_boundary'][0]:
+        print("    → Case variance at the boundary (zero): no between-case variation")
+        print("      beyond the covariates; the GLMM reduces to the ordinary logit")
+    sigma_ci = np.sqrt(np.percentile(boot_ok[:, -1], [2.5, 97.5]))
+    print(f"    {'Case SD, bootstrap 95% CI:':<32s}[{sigma_ci[0]:.3f}, {sigma_ci[1]:.3f}]")
+
+    print(f"\n  Coefficients (Odds Ratios), AGHQ; Wald and case-bootstrap 95% CIs")
+    print(f"  ({len(boot_ok)} of {N_GLMM_BOOT} replicates; separated or non-estimable resamples dropped):")
+    glmm_coefficients = {}
+    for j, var in enumerate(spec.columns):
+        if var == 'Intercept':
+            continue
+        coef, se = aghq['params'][var], aghq['bse'][var]
+        p = 2 * stats.norm.sf(abs(coef / se))
+        boot_low, boot_high = np.exp(np.percentile(boot_ok[:, j], [2.5, 97.5]))
+        sig = '***' if p < 0.001 else ('**' if p < 0.01 else ('*' if p < 0.05 else ''))
+
+        var_clean = var.replace("C(dominant_source, Treatment(reference='SEMANTIC'))", "")
+        var_clean = var_clean.replace("C(chamber_grouped, Treatment(reference='OTHER'))", "")
+        var_clean = var_clean.replace("[T.", " ").replace("]", "")
+
+        print(f"    {var_clean:32s} OR={np.exp(coef):6.3f} [{np.exp(coef - 1.96 * se):5.2f}, "
+              f"{np.exp(coef + 1.96 * se):6.2f}] boot [{boot_low:5.2f}, {boot_high:6.2f}] p={p:.4f} {sig}")
+        glmm_coefficients[var] = {'or': np.exp(coef), 'se': se, 'p': p,
+                                  'boot_or_ci': [boot_low, boot_high]}
+
+    glmm_results = {
+        'method': f'Random-intercept logistic GLMM (AGHQ, {GLMM_QUAD_NODES} nodes)',
+        'n_obs': aghq['n_obs'],
+        'n_clusters': aghq['n_groups'][0],
+        'llf': aghq['llf'],
+        'case_sd': float(aghq['sigma'][0]),
+        'case_sd_at_boundary': bool(aghq['at_boundary'][0]),
+        'case_sd_boot_ci': sigma_ci.tolist(),
+        'latent_icc': aghq['icc'],
+        'laplace': {'case_sd': float(laplace['sigma'][0]), 'llf': laplace['llf']},
+        'case_rapporteur': {'case_sd': float(nested['sigma'][0]),
+                            'rapporteur_sd': float(nested['sigma'][1]),
+                            'llf': nested['llf']},
+        'n_boot': int(len(boot_ok)),
+        'coefficients': glmm_coefficients,
+    }
+
     # =========================================================================
     # INTRACLASS CORRELATION
     # =========================================================================
@@ -237,6 +353,7 @@ def run_mixed_effects_analysis(df):
 
     print(f"\n  Approximate ICC for pro_ds: {icc_approx:.3f}")
     print(f"  Interpretation: {icc_approx*100:.1f}% of variance in ruling direction is between cases")
+    print(f"  Model-based latent ICC (GLMM, given covariates): {glmm_results['latent_icc']:.3f}")
 
     if icc_approx > 0.1:
         print("  → ICC > 0.1 indicates meaningful clustering; mixed-effects models are appropriate")
@@ -261,8 +378,12 @@ KEY FINDINGS:
    - Cluster-robust SEs are generally LARGER than naive SEs
    - This means naive analysis may overstate significance
    - Key findings (pro-DS purpose, level-shifting) remain significant
+   - Wild cluster bootstrap p-values correct CR1 over-rejection with
+     few (~67) case clusters
 
 3. SENSITIVITY:
+   - The random-intercept GLMM (Laplace / adaptive quadrature) gives the
+     between-case variance left after the covariates
    - Case-level aggregation confirms holding-level patterns
    - Results are robust to different analytical approaches
 
@@ -278,7 +399,9 @@ KEY FINDINGS:
         'n_holdings': int(len(df)),
         'n_cases': int(df['case_id'].nunique()),
         'gee': gee_results,
-        'cluster_robust': cluster_results
+        'cluster_robust': cluster_results,
+        'wild_cluster_bootstrap': wild_results,
+        'glmm': glmm_results
     }
 
     with open(OUTPUT_PATH / "mixed_effects_results.json", 'w') as f:
@@ -10,16 +10,25 @@ Builds citation networks from CJEU GDPR holdings data:
 3. Holding-level citation data
 
 Computes node attributes and exports network data for subsequent analysis.
+The case-level graph is also saved as citation_graph.bin (see citation_graph.py),
+which the later citation scripts memory-map instead of rebuilding from CSV.
 """
 
 import pandas as pd
 import numpy as np
-import networkx as nx
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
 from pathlib import Path
 from datetime import datetime
 import json
 from collections import defaultdict
 
+from citation_graph import CitationGraph, GRAPH_FILENAME
+from graph_centrality import (betweenness, centrality_snapshots, hits, inherited_scores,
+                              pagerank, pivots_for_error, snapshot_cutoffs,
+                              weighted_degrees)
+from resampling import ResamplingExecutor
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 # Fixed: Updated path from "parsed-coded" to "data/parsed"
@@ -27,6 +36,17 @@ DATA_PATH = PROJECT_ROOT / "data" / "parsed" / "holdings.csv"
 PREPARED_PATH = PROJECT_ROOT / "analysis" / "output" / "holdings_prepared.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_network"
 
+# Exact betweenness up to this many nodes; beyond it, sample enough pivot
+# sources that every score is within BETWEENNESS_EPSILON of exact (p=0.95)
+BETWEENNESS_EXACT_MAX_NODES = 5000
+BETWEENNESS_EPSILON = 0.05
+
+# Longitudinal centrality snapshots: 'year' or 'judgment'
+SNAPSHOT_GRANULARITY = 'year'
+
+# Per-hop continuation probability for inherited (multi-hop) precedent direction
+INHERITANCE_DECAY = 0.5
+
 def load_data():
     """Load holdings data, using prepared if available."""
     if PREPARED_PATH.exists():
@@ -52,38 +72,49 @@ def parse_cited_cases(cited_str):
         return []
     return [c.strip() for c in str(cited_str).split(';') if c.strip()]
 
+def explode_cited_cases(df):
+    """
+    Parse every holding's cited_cases at once (same rules as parse_cited_cases).
+
+    Returns:
+        Series of cited case IDs indexed by the citing holding's df index,
+        one entry per citation, in holding order
+    """
+    if 'cited_cases' not in df.columns:
+        return pd.Series([], dtype=object)
+    cited = df['cited_cases'].where(df['cited_cases'].notna(), '').astype(str).str.split(';')
+    exploded = cited.explode().str.strip()
+    return exploded[exploded != '']
+
 def build_citation_edges(df):
     """
     Extract all citation edges from holdings data.
 
     Returns:
-        List of tuples: (citing_case, citing_holding_id, cited_case, citing_date)
+        DataFrame with one row per (citing holding, cited case), in holding order
     """
-    edges = []
-
-    for _, row in df.iterrows():
-        citing_case = row['case_id']
-        holding_id = row['holding_id']
-        citing_date = row['judgment_date']
-
-        cited_cases = parse_cited_cases(row.get('cited_cases', ''))
-
-        for cited_case in cited_cases:
-            edges.append({
-                'citing_case': citing_case,
-                'citing_holding_id': holding_id,
-                'cited_case': cited_case,
-                'citing_date': citing_date,
-                'citing_direction': row['ruling_direction'],
-                'citing_pro_ds': row.get('pro_ds', None),
-                'citing_concept': row.get('primary_concept', None),
-                'citing_chamber': row.get('chamber', None),
-                'citing_pro_ds_purpose': row.get('pro_ds_purpose', None),
-                'citing_teleological': row.get('teleological_present', None),
-                'citing_level_shifting': row.get('level_shifting', None)
-            })
-
-    return pd.DataFrame(edges)
+    if 'cited_cases' not in df.columns:
+        return pd.DataFrame()
+
+    exploded = explode_cited_cases(df)
+    rows = df.loc[exploded.index]
+
+    def column(name):
+        return rows[name].to_numpy() if name in rows.columns else None
+
+    return pd.DataFrame({
+        'citing_case': rows['case_id'].to_numpy(),
+        'citing_holding_id': rows['holding_id'].to_numpy(),
+        'cited_case': exploded.to_numpy(),
+        'citing_date': rows['judgment_date'].to_numpy(),
+        'citing_direction': rows['ruling_direction'].to_numpy(),
+        'citing_pro_ds': column('pro_ds'),
+        'citing_concept': column('primary_concept'),
+        'citing_chamber': column('chamber'),
+        'citing_pro_ds_purpose': column('pro_ds_purpose'),
+        'citing_teleological': column('teleological_present'),
+        'citing_level_shifting': column('level_shifting')
+    })
 
 def identify_internal_cases(df, edge_df):
     """
@@ -141,29 +172,13 @@ def build_case_level_graph(edge_df, case_attrs, corpus_cases):
     """
     Build case-level directed citation graph.
 
-    Nodes: All cases (corpus + external cited)
+    Nodes: All cases (corpus + external cited), interned to integers
     Edges: Citation relationships (aggregated from holdings)
+
+    Returns the sparse CitationGraph and the case-level edge table with the
+    aggregated citing-side attributes.
     """
-    G = nx.DiGraph()
-
-    # Add corpus nodes with attributes
-    for _, row in case_attrs.iterrows():
-        G.add_node(row['case_id'],
-                   is_gdpr_corpus=True,
-                   judgment_date=str(row['judgment_date']),
-                   chamber=row['chamber'],
-                   year=int(row['year']),
-                   pro_ds_rate=float(row['pro_ds_rate']),
-                   pro_ds_count=int(row['pro_ds_count']),
-                   holding_count=int(row['holding_count']),
-                   dominant_direction=row['dominant_direction'],
-                   teleological_rate=float(row['teleological_rate']) if pd.notna(row['teleological_rate']) else 0.0,
-                   pro_ds_purpose_rate=float(row['pro_ds_purpose_rate']) if pd.notna(row['pro_ds_purpose_rate']) else 0.0)
-
-    # Add external cited cases (limited attributes)
-    external_cases = set(edge_df['cited_case'].unique()) - corpus_cases
-    for case_id in external_cases:
-        G.add_node(case_id, is_gdpr_corpus=False)
+    graph = CitationGraph.from_edges(edge_df, corpus_cases)
 
     # Aggregate edges at case level
     case_edges = edge_df.groupby(['citing_case', 'cited_case']).agg({
@@ -175,178 +190,229 @@ def build_case_level_graph(edge_df, case_attrs, corpus_cases):
     case_edges.columns = ['citing_case', 'cited_case', 'citation_weight',
                           'citing_dominant_direction', 'citing_pro_ds_rate']
 
-    # Add edges
-    for _, row in case_edges.iterrows():
-        G.add_edge(row['citing_case'], row['cited_case'],
-                   weight=int(row['citation_weight']),
-                   citing_dominant_direction=row['citing_dominant_direction'],
-                   citing_pro_ds_rate=float(row['citing_pro_ds_rate']) if pd.notna(row['citing_pro_ds_rate']) else None)
+    return graph, case_edges
 
-    return G, case_edges
-
-def build_internal_graph(G_case, corpus_cases):
+def build_internal_graph(graph):
     """
     Extract subgraph of internal citations only.
     """
-    internal_nodes = [n for n in G_case.nodes() if G_case.nodes[n].get('is_gdpr_corpus', False)]
-    G_internal = G_case.subgraph(internal_nodes).copy()
-    return G_internal
+    return graph.internal()
 
-def compute_network_metrics(G, name=""):
+def compute_network_metrics(graph, name=""):
     """Compute basic network metrics."""
+    n = graph.n_nodes
     metrics = {
         'name': name,
-        'n_nodes': G.number_of_nodes(),
-        'n_edges': G.number_of_edges(),
-        'density': nx.density(G),
-        'is_dag': nx.is_directed_acyclic_graph(G),
+        'n_nodes': n,
+        'n_edges': graph.n_edges,
+        'density': graph.n_edges / (n * (n - 1)) if n > 1 else 0,
+        'is_dag': graph.topological_order() is not None,
     }
 
     # Only compute for DAGs (should always be true for citation networks)
-    if metrics['is_dag'] and G.number_of_nodes() > 0:
+    if metrics['is_dag'] and n > 0:
         # Weakly connected components
-        wcc = list(nx.weakly_connected_components(G))
-        metrics['n_weakly_connected_components'] = len(wcc)
-        metrics['largest_wcc_size'] = max(len(c) for c in wcc) if wcc else 0
+        n_wcc, labels = connected_components(graph.adjacency(weighted=False),
+                                              directed=True, connection='weak')
+        metrics['n_weakly_connected_components'] = int(n_wcc)
+        metrics['largest_wcc_size'] = int(np.bincount(labels).max())
 
     # Degree statistics
-    if G.number_of_nodes() > 0:
-        in_degrees = [d for n, d in G.in_degree()]
-        out_degrees = [d for n, d in G.out_degree()]
+    if n > 0:
+        in_degrees = graph.in_degree()
+        out_degrees = graph.out_degree()
 
-        metrics['avg_in_degree'] = np.mean(in_degrees)
-        metrics['max_in_degree'] = max(in_degrees)
-        metrics['avg_out_degree'] = np.mean(out_degrees)
-        metrics['max_out_degree'] = max(out_degrees)
+        metrics['avg_in_degree'] = float(np.mean(in_degrees))
+        metrics['max_in_degree'] = int(in_degrees.max())
+        metrics['avg_out_degree'] = float(np.mean(out_degrees))
+        metrics['max_out_degree'] = int(out_degrees.max())
 
     return metrics
 
-def compute_node_centralities(G):
-    """Compute centrality metrics for each node."""
-    centralities = {}
+def compute_node_centralities(graph, executor=None):
+    """
+    Compute centrality metrics for each node.
 
-    if G.number_of_nodes() == 0:
-        return centralities
+    Betweenness is exact for graphs up to BETWEENNESS_EXACT_MAX_NODES nodes
+    and estimated beyond that from the pivot sources needed to bound every
+    score's error by BETWEENNESS_EPSILON (with a per-case standard error);
+    either way the sources are split across the executor's workers.
+
+    Returns:
+        (centralities, diagnostics): per-case scores, and the convergence
+        diagnostics of the iterative methods
+    """
+    centralities = {}
+    diagnostics = {}
 
-    # In-degree (citation count - how often cited)
-    in_degree = dict(G.in_degree())
+    if graph.n_nodes == 0:
+        return centralities, diagnostics
 
-    # Out-degree (how many cases cited)
-    out_degree = dict(G.out_degree())
+    # In/out-degree (distinct cases) and weighted by citing holdings
+    degrees = weighted_degrees(graph)
 
-    # PageRank
-    try:
-        pagerank = nx.pagerank(G, alpha=0.85)
-    except:
-        pagerank = {n: 0 for n in G.nodes()}
+    # PageRank (holding-weighted, dangling cases teleport uniformly)
+    pagerank_scores, diagnostics['pagerank'] = pagerank(graph, alpha=0.85)
 
     # Betweenness (for DAGs)
-    try:
-        betweenness = nx.betweenness_centrality(G)
-    except:
-        betweenness = {n: 0 for n in G.nodes()}
+    k = None
+    if graph.n_nodes > BETWEENNESS_EXACT_MAX_NODES:
+        k = pivots_for_error(graph.n_nodes, BETWEENNESS_EPSILON)
+    betweenness_scores, betweenness_info = betweenness(graph, k=k, executor=executor)
+    betweenness_se = betweenness_info.pop('standard_error', None)
+    diagnostics['betweenness'] = betweenness_info
 
     # HITS (hubs and authorities)
-    try:
-        hubs, authorities = nx.hits(G, max_iter=100)
-    except:
-        hubs = {n: 0 for n in G.nodes()}
-        authorities = {n: 0 for n in G.nodes()}
+    hubs, authorities, diagnostics['hits'] = hits(graph)
+
+    for method, info in diagnostics.items():
+        if not info.get('converged', True):
+            print(f"  WARNING: {method} did not converge after {info['iterations']} "
+                  f"iterations (residual {info['residual']:.2e}, tol {info['tol']:.0e})")
 
-    for node in G.nodes():
+    for i, node in enumerate(graph.case_ids):
         centralities[node] = {
-            'in_degree': in_degree.get(node, 0),
-            'out_degree': out_degree.get(node, 0),
-            'pagerank': pagerank.get(node, 0),
-            'betweenness': betweenness.get(node, 0),
-            'hub_score': hubs.get(node, 0),
-            'authority_score': authorities.get(node, 0)
+            'in_degree': int(degrees['in_degree'][i]),
+            'out_degree': int(degrees['out_degree'][i]),
+            'weighted_in_degree': int(degrees['weighted_in_degree'][i]),
+            'weighted_out_degree': int(degrees['weighted_out_degree'][i]),
+            'pagerank': float(pagerank_scores[i]),
+            'betweenness': float(betweenness_scores[i]),
+            'hub_score': float(hubs[i]),
+            'authority_score': float(authorities[i])
         }
+        if betweenness_se is not None:
+            centralities[node]['betweenness_se'] = float(betweenness_se[i])
+
+    return centralities, diagnostics
+
+def compute_centrality_snapshots(graph, case_attrs, by=SNAPSHOT_GRANULARITY):
+    """
+    Centrality of each case as the network stood at the end of each year
+    (or after each judgment date), warm-starting every snapshot from the
+    previous one.
+
+    Returns:
+        (snapshot table, per-snapshot diagnostics)
+    """
+    judgment_dates = pd.to_datetime(case_attrs.set_index('case_id')['judgment_date'])
+    node_dates = judgment_dates.reindex(graph.case_ids).to_numpy()
+    cutoffs, labels = snapshot_cutoffs(judgment_dates, by=by)
+    return centrality_snapshots(graph, node_dates, cutoffs, labels)
+
+def holding_case_incidence(df, case_ids):
+    """
+    Sparse holding x case incidence matrix.
 
-    return centralities
+    Entry (i, j) counts how often holding i cites case j (a case listed twice
+    counts twice, as in the per-holding averages). Citations of cases not in
+    case_ids are counted separately.
+
+    Returns:
+        (incidence CSR matrix, total citations per holding)
+    """
+    exploded = explode_cited_cases(df)
+    rows = df.index.get_indexer(exploded.index)
+    cols = pd.Index(case_ids).get_indexer(exploded.to_numpy())
+    total = np.bincount(rows, minlength=len(df))
+
+    known = cols >= 0
+    incidence = sp.csr_matrix((np.ones(known.sum()), (rows[known], cols[known])),
+                              shape=(len(df), len(case_ids)))
+    return incidence, total
+
+def row_mean(incidence, values):
+    """Mean of values over each row's entries (NaN for empty rows)."""
+    counts = np.asarray(incidence.sum(axis=1)).ravel()
+    sums = incidence @ values
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / (counts[:, None] if sums.ndim == 2 else counts)
+    means[counts == 0] = np.nan
+    return means
+
+def row_max(incidence, values):
+    """Max of values over each row's entries (NaN for empty rows)."""
+    result = np.full(incidence.shape[0], np.nan)
+    nonempty = np.flatnonzero(np.diff(incidence.indptr))
+    if len(nonempty):
+        result[nonempty] = np.maximum.reduceat(values[incidence.indices],
+                                               incidence.indptr[nonempty])
+    return result
+
+# Holding-level precedent means: new variable -> case-level attribute.
+# Adding a case attribute here adds a holding variable (one matrix product).
+PRECEDENT_MEANS = {
+    'precedent_direction_score': 'pro_ds_rate',
+    'inherited_direction_score': 'inherited_pro_ds_rate',
+    'precedent_purpose_rate': 'pro_ds_purpose_rate',
+    'avg_cited_pagerank': 'pagerank',
+}
 
 def compute_citation_derived_variables(df, edge_df, case_attrs, G_internal, centralities):
     """
     Compute citation-derived variables for each holding.
 
-    These variables will be used in regression analysis.
+    These variables will be used in regression analysis. All holdings are
+    processed at once: a sparse holding x case incidence matrix (internal
+    cases only) is multiplied against the case attribute vectors.
     """
-    # Create case-level lookup for cited case attributes
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
-    corpus_cases = set(case_attrs['case_id'])
-
-    # New columns to add
-    new_vars = []
-
-    for idx, row in df.iterrows():
-        citing_case = row['case_id']
-        cited_cases_list = parse_cited_cases(row.get('cited_cases', ''))
-
-        # Basic citation counts
-        total_citations = len(cited_cases_list)
-        internal_citations = [c for c in cited_cases_list if c in corpus_cases]
-        n_internal = len(internal_citations)
-
-        # Precedent direction score (weighted avg pro-DS rate of cited internal cases)
-        if n_internal > 0:
-            pro_ds_rates = [case_lookup.get(c, {}).get('pro_ds_rate', 0.5)
-                          for c in internal_citations]
-            precedent_direction_score = np.mean(pro_ds_rates)
-            predominantly_pro_ds_precedents = 1 if precedent_direction_score > 0.5 else 0
-        else:
-            precedent_direction_score = np.nan
-            predominantly_pro_ds_precedents = np.nan
-
-        # Cites Grand Chamber precedent
-        cites_gc = any(case_lookup.get(c, {}).get('chamber') == 'GRAND_CHAMBER'
-                      for c in internal_citations)
-
-        # Precedent purpose invocation rate
-        if n_internal > 0:
-            purpose_rates = [case_lookup.get(c, {}).get('pro_ds_purpose_rate', 0)
-                           for c in internal_citations]
-            precedent_purpose_rate = np.mean(purpose_rates)
-        else:
-            precedent_purpose_rate = np.nan
-
-        # Average centrality of cited cases
-        if n_internal > 0:
-            cited_pageranks = [centralities.get(c, {}).get('pagerank', 0)
-                             for c in internal_citations]
-            avg_cited_pagerank = np.mean(cited_pageranks)
-            max_cited_pagerank = max(cited_pageranks)
-        else:
-            avg_cited_pagerank = np.nan
-            max_cited_pagerank = np.nan
-
-        # Citing case centrality
-        citing_centrality = centralities.get(citing_case, {})
-
-        new_vars.append({
-            'case_id': citing_case,
-            'holding_id': row['holding_id'],
-            'total_citations': total_citations,
-            'internal_citations': n_internal,
-            'external_citations': total_citations - n_internal,
-            'precedent_direction_score': precedent_direction_score,
-            'predominantly_pro_ds_precedents': predominantly_pro_ds_precedents,
-            'cites_gc_precedent': int(cites_gc),
-            'precedent_purpose_rate': precedent_purpose_rate,
-            'avg_cited_pagerank': avg_cited_pagerank,
-            'max_cited_pagerank': max_cited_pagerank,
-            'citing_case_pagerank': citing_centrality.get('pagerank', np.nan),
-            'citing_case_in_degree': citing_centrality.get('in_degree', 0),
-            'citing_case_authority': citing_centrality.get('authority_score', np.nan)
-        })
-
-    return pd.DataFrame(new_vars)
+    case_ids = case_attrs['case_id'].to_numpy()
+    incidence, total_citations = holding_case_incidence(df, case_ids)
+    n_internal = np.asarray(incidence.sum(axis=1)).ravel().astype(int)
+
+    # Pro-DS rate inherited down chains of internal precedent (decay per hop)
+    rates = case_attrs.set_index('case_id')['pro_ds_rate'].reindex(G_internal.case_ids)
+    inherited_pro_ds_rate = pd.Series(
+        inherited_scores(G_internal, rates.to_numpy(), decay=INHERITANCE_DECAY),
+        index=G_internal.case_ids)
+
+    # Case-level attribute matrix (corpus cases, in case_attrs order)
+    cent = pd.DataFrame.from_dict(centralities, orient='index')
+    case_values = case_attrs.set_index('case_id')
+    case_values = case_values.assign(
+        pagerank=cent['pagerank'].reindex(case_ids).fillna(0).to_numpy(),
+        inherited_pro_ds_rate=inherited_pro_ds_rate.reindex(case_ids).to_numpy(),
+        is_grand_chamber=(case_values['chamber'] == 'GRAND_CHAMBER').astype(float))
+
+    attrs = list(PRECEDENT_MEANS.values())
+    means = row_mean(incidence, case_values[attrs].to_numpy(dtype=float))
+    precedent = dict(zip(PRECEDENT_MEANS, means.T))
+
+    # Predominantly pro-DS precedents (NaN without internal citations)
+    score = precedent['precedent_direction_score']
+    predominantly = np.where(np.isnan(score), np.nan, (score > 0.5).astype(float))
+
+    cites_gc = (incidence @ case_values['is_grand_chamber'].to_numpy()) > 0
+    max_cited_pagerank = row_max(incidence, case_values['pagerank'].to_numpy())
+
+    # Citing case centrality
+    citing = cent.reindex(df['case_id'].to_numpy())
+
+    return pd.DataFrame({
+        'case_id': df['case_id'].to_numpy(),
+        'holding_id': df['holding_id'].to_numpy(),
+        'total_citations': total_citations,
+        'internal_citations': n_internal,
+        'external_citations': total_citations - n_internal,
+        'precedent_direction_score': score,
+        'inherited_direction_score': precedent['inherited_direction_score'],
+        'predominantly_pro_ds_precedents': predominantly,
+        'cites_gc_precedent': cites_gc.astype(int),
+        'precedent_purpose_rate': precedent['precedent_purpose_rate'],
+        'avg_cited_pagerank': precedent['avg_cited_pagerank'],
+        'max_cited_pagerank': max_cited_pagerank,
+        'citing_case_pagerank': citing['pagerank'].to_numpy(),
+        'citing_case_in_degree': citing['in_degree'].fillna(0).astype(int).to_numpy(),
+        'citing_case_authority': citing['authority_score'].to_numpy()
+    })
 
 def find_most_cited_cases(G_internal, case_attrs, n=15):
     """Find the most frequently cited cases within the corpus."""
-    in_degrees = dict(G_internal.in_degree())
+    in_degrees = G_internal.in_degree()
 
     # Sort by in-degree
-    sorted_cases = sorted(in_degrees.items(), key=lambda x: -x[1])[:n]
+    top = np.argsort(-in_degrees, kind='stable')[:n]
+    sorted_cases = zip(G_internal.case_ids[top], in_degrees[top].tolist())
 
     results = []
     case_lookup = case_attrs.set_index('case_id').to_dict('index')
@@ -366,9 +432,10 @@ def find_most_cited_cases(G_internal, case_attrs, n=15):
 
 def find_most_citing_cases(G_internal, case_attrs, n=15):
     """Find cases that cite the most other cases."""
-    out_degrees = dict(G_internal.out_degree())
+    out_degrees = G_internal.out_degree()
 
-    sorted_cases = sorted(out_degrees.items(), key=lambda x: -x[1])[:n]
+    top = np.argsort(-out_degrees, kind='stable')[:n]
+    sorted_cases = zip(G_internal.case_ids[top], out_degrees[top].tolist())
 
     results = []
     case_lookup = case_attrs.set_index('case_id').to_dict('index')
@@ -386,8 +453,8 @@ def find_most_citing_cases(G_internal, case_attrs, n=15):
 
     return pd.DataFrame(results)
 
-def export_network_data(G_case, G_internal, edge_df, case_attrs,
-                        citation_vars, centralities, metrics):
+def export_network_data(G_case, case_edges, edge_df, case_attrs,
+                        citation_vars, centralities, metrics, snapshots):
     """Export all network data to files."""
     OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
 
@@ -415,21 +482,27 @@ def export_network_data(G_case, G_internal, edge_df, case_attrs,
 
     # 5. Graph objects (edge lists for reconstruction)
     # Internal graph edges
-    internal_edges = []
-    for u, v, data in G_internal.edges(data=True):
-        internal_edges.append({
-            'citing_case': u,
-            'cited_case': v,
-            **data
-        })
-    pd.DataFrame(internal_edges).to_csv(OUTPUT_PATH / "internal_citation_edges.csv", index=False)
+    internal_edges = case_edges[case_edges['cited_case'].isin(case_attrs['case_id'])]
+    internal_edges = internal_edges.rename(columns={'citation_weight': 'weight'})
+    internal_edges.to_csv(OUTPUT_PATH / "internal_citation_edges.csv", index=False)
     print(f"  Saved: internal_citation_edges.csv ({len(internal_edges)} edges)")
 
+    # Graph bundle: sparse graph, case attributes and holding variables
+    # (memory-mapped by the later citation scripts)
+    G_case.attach_tables(case_full, citation_vars)
+    G_case.save(OUTPUT_PATH / GRAPH_FILENAME)
+    print(f"  Saved: {GRAPH_FILENAME} ({G_case.n_nodes} nodes, {G_case.n_edges} edges, "
+          f"{len(case_full)} case records, {len(citation_vars)} holding records)")
+
     # 6. Node centralities (JSON for easy lookup)
     with open(OUTPUT_PATH / "node_centralities.json", 'w') as f:
         json.dump(centralities, f, indent=2)
     print(f"  Saved: node_centralities.json")
 
+    # 7. Longitudinal centralities (one row per snapshot x case)
+    snapshots.to_csv(OUTPUT_PATH / "centrality_snapshots.csv", index=False)
+    print(f"  Saved: centrality_snapshots.csv ({snapshots['snapshot'].nunique()} snapshots)")
+
 def main():
     print("=" * 70)
     print("PHASE 1: CITATION NETWORK CONSTRUCTION")
@@ -464,10 +537,10 @@ def main():
     # 5. Build graphs
     print("\n[5/8] Building citation graphs...")
     G_case, case_edges = build_case_level_graph(edge_df, case_attrs, corpus_cases)
-    G_internal = build_internal_graph(G_case, corpus_cases)
+    G_internal = build_internal_graph(G_case)
 
-    print(f"  G_case: {G_case.number_of_nodes()} nodes, {G_case.number_of_edges()} edges")
-    print(f"  G_internal: {G_internal.number_of_nodes()} nodes, {G_internal.number_of_edges()} edges")
+    print(f"  G_case: {G_case.n_nodes} nodes, {G_case.n_edges} edges")
+    print(f"  G_internal: {G_internal.n_nodes} nodes, {G_internal.n_edges} edges")
 
     # 6. Compute network metrics
     print("\n[6/8] Computing network metrics...")
@@ -482,7 +555,7 @@ def main():
             'total_citation_edges': len(edge_df),
             'internal_citations': len(edge_df[edge_df['cited_case'].isin(corpus_cases)]),
             'external_citations': len(edge_df[~edge_df['cited_case'].isin(corpus_cases)]),
-            'cases_with_internal_citations': G_internal.number_of_edges()
+            'cases_with_internal_citations': G_internal.n_edges
         }
     }
 
@@ -496,8 +569,17 @@ def main():
 
     # 7. Compute centralities
     print("\n[7/8] Computing node centralities...")
-    centralities = compute_node_centralities(G_internal)
+    with ResamplingExecutor() as executor:
+        centralities, centrality_diagnostics = compute_node_centralities(G_internal, executor)
     print(f"  Computed centralities for {len(centralities)} nodes")
+    for method, info in centrality_diagnostics.items():
+        if method == 'betweenness':
+            detail = f"{info['mode']}, {info['n_sources']} sources"
+            if 'epsilon' in info:
+                detail += f", max error {info['epsilon']:.3f} (p={1 - info['delta']:.2f})"
+            print(f"    {method}: {detail}")
+        else:
+            print(f"    {method}: {info['iterations']} iterations, residual {info['residual']:.1e}")
 
     # Most cited cases
     print("\n  Top 10 Most-Cited Cases (within corpus):")
@@ -511,6 +593,13 @@ def main():
     # Add to metrics
     metrics['most_cited_cases'] = most_cited.to_dict('records')
     metrics['most_citing_cases'] = most_citing.to_dict('records')
+    metrics['centrality_convergence'] = centrality_diagnostics
+
+    # Centrality over time
+    snapshots, snapshot_diagnostics = compute_centrality_snapshots(G_internal, case_attrs)
+    metrics['snapshot_convergence'] = snapshot_diagnostics
+    print(f"\n  Centrality snapshots ({SNAPSHOT_GRANULARITY}): {len(snapshot_diagnostics)}, "
+          f"{sum(d['pagerank_iterations'] for d in snapshot_diagnostics)} warm-started PageRank iterations")
 
     # 8. Compute citation-derived variables
     print("\n[8/8] Computing citation-derived variables for holdings...")
@@ -531,8 +620,8 @@ def main():
     print("\n" + "=" * 70)
     print("EXPORTING NETWORK DATA")
     print("=" * 70)
-    export_network_data(G_case, G_internal, edge_df, case_attrs,
-                       citation_vars, centralities, metrics)
+    export_network_data(G_case, case_edges, edge_df, case_attrs,
+                       citation_vars, centralities, metrics, snapshots)
 
     # Final summary
     print("\n" + "=" * 70)
@@ -543,7 +632,7 @@ def main():
     print(f"  Total citation edges: {len(edge_df)}")
     print(f"  Internal citations: {metrics['summary']['internal_citations']}")
     print(f"  External citations: {metrics['summary']['external_citations']}")
-    print(f"  Cases in internal network: {G_internal.number_of_nodes()}")
+    print(f"  Cases in internal network: {G_internal.n_nodes}")
     print(f"  Internal network density: {metrics_internal['density']:.4f}")
     print(f"  Network is DAG: {metrics_internal['is_dag']}")
 
@@ -8,7 +8,8 @@ This script:
 1. Merges judge/rapporteur data into the holdings dataset
 2. Creates rapporteur grouping variables (HIGH/MEDIUM/LOW volume)
 3. Generates individual judge exposure indicators
-4. Builds judge co-occurrence matrix for network analysis
+4. Builds the judge co-occurrence network (per case, per holding and per
+   year) from the case x judge incidence matrix
 5. Saves prepared dataset for subsequent analysis phases
 """
 
@@ -18,6 +19,9 @@ from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 
+from judge_network import (COOCCURRENCE_FILENAME, cooccurrence_network, network_statistics,
+                           panel_incidence, save_cooccurrence)
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 CASES_JSON = PROJECT_ROOT / "data" / "parsed" / "cases.json"  # FIXED: was "parsed-coded"
@@ -93,25 +97,23 @@ def get_all_unique_judges(cases):
     return sorted(all_judges)
 
 def build_cooccurrence_matrix(cases, all_judges):
-    """Build judge co-occurrence matrix."""
-    # Initialize matrix
-    judge_to_idx = {j: i for i, j in enumerate(all_judges)}
-    n = len(all_judges)
-    matrix = [[0] * n for _ in range(n)]
-
-    # Count co-occurrences
+    """
+    Build judge co-occurrence matrices as sparse incidence products (BᵀB).
+
+    Besides the case counts, co-sitting is weighted by holdings per case
+    and split into one layer per judgment year.
+    """
+    judges, B = panel_incidence(cases, all_judges)
+    n_holdings = [len(case.get('holdings', [])) for case in cases]
+    years = []
     for case in cases:
-        judges = case.get('judges', []) or []
-        for i, j1 in enumerate(judges):
-            for j2 in judges[i:]:
-                idx1 = judge_to_idx.get(j1)
-                idx2 = judge_to_idx.get(j2)
-                if idx1 is not None and idx2 is not None:
-                    matrix[idx1][idx2] += 1
-                    if idx1 != idx2:
-                        matrix[idx2][idx1] += 1
+        date_str = case.get('judgment_date', '') or ''
+        years.append(int(date_str[:4]) if date_str[:4].isdigit() else 0)
 
-    return matrix, judge_to_idx
+    network = cooccurrence_network(B, judges, case_weights={'holdings': n_holdings},
+                                   case_years=years)
+    judge_to_idx = {j: i for i, j in enumerate(judges)}
+    return network, judge_to_idx
 
 def analyze_judge_participation(cases):
     """Analyze individual judge participation statistics."""
@@ -205,15 +207,9 @@ def save_enhanced_holdings(holdings, output_path):
         writer.writeheader()
         writer.writerows(holdings)
 
-def save_cooccurrence_matrix(matrix, judges, output_path):
-    """Save co-occurrence matrix to CSV."""
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        # Header row
-        writer.writerow([''] + judges)
-        # Data rows
-        for i, judge in enumerate(judges):
-            writer.writerow([judge] + matrix[i])
+def save_cooccurrence_matrix(network, output_path):
+    """Save the co-occurrence matrices (sparse, binary .npz)."""
+    save_cooccurrence(network, output_path)
 
 def save_judge_stats(judge_stats, output_path):
     """Save judge statistics to JSON."""
@@ -225,7 +221,7 @@ def save_rapporteur_groupings(groupings, output_path):
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(groupings, f, indent=2, ensure_ascii=False)
 
-def print_summary_report(cases, rapporteur_groupings, judge_stats, all_judges):
+def print_summary_report(cases, rapporteur_groupings, judge_stats, all_judges, network):
     """Print summary of data preparation."""
     print("=" * 70)
     print("PHASE 1: JUDICIAL DATA PREPARATION - SUMMARY REPORT")
@@ -296,26 +292,22 @@ def print_summary_report(cases, rapporteur_groupings, judge_stats, all_judges):
     print("6. CO-OCCURRENCE NETWORK SUMMARY")
     print("=" * 70)
 
-    # Calculate network density
+    # Network density from the case co-occurrence matrix
     n_judges = len(all_judges)
     max_edges = n_judges * (n_judges - 1) / 2
 
-    # Count actual edges (co-occurrences)
-    judge_pairs = set()
-    for case in cases:
-        judges = case.get('judges', []) or []
-        for i, j1 in enumerate(judges):
-            for j2 in judges[i+1:]:
-                pair = tuple(sorted([j1, j2]))
-                judge_pairs.add(pair)
-
-    actual_edges = len(judge_pairs)
-    density = actual_edges / max_edges if max_edges > 0 else 0
+    network_stats = network_statistics(network['matrices']['cases'])
+    actual_edges = network_stats['n_edges']
+    density = network_stats['density']
 
     print(f"\n  Nodes (judges): {n_judges}")
     print(f"  Possible edges: {int(max_edges)}")
     print(f"  Actual edges (co-occurrences): {actual_edges}")
     print(f"  Network density: {density:.3f}")
+    print(f"  Triangles: {network_stats['n_triangles']}")
+    years = sorted(name for name in network['matrices'] if name.startswith('year_'))
+    if years:
+        print(f"  Yearly layers: {', '.join(name[5:] for name in years)}")
 
     if density > 0.5:
         print("\n  WARNING: High network density suggests substantial confounding")
@@ -325,7 +317,7 @@ def print_summary_report(cases, rapporteur_groupings, judge_stats, all_judges):
     print("7. OUTPUT FILES CREATED")
     print("=" * 70)
     print(f"\n  - holdings_judicial.csv: Enhanced holdings with judge data")
-    print(f"  - judge_cooccurrence_matrix.csv: Judge co-occurrence matrix")
+    print(f"  - {COOCCURRENCE_FILENAME}: Judge co-occurrence matrices (sparse; cases, holdings, per year)")
     print(f"  - judge_statistics.json: Individual judge participation stats")
     print(f"  - rapporteur_groupings.json: Rapporteur volume groupings")
 
@@ -347,7 +339,7 @@ def main():
     judge_stats = analyze_judge_participation(cases)
 
     print("Building co-occurrence matrix...")
-    cooccurrence_matrix, judge_to_idx = build_cooccurrence_matrix(cases, all_judges)
+    network, judge_to_idx = build_cooccurrence_matrix(cases, all_judges)
 
     print("Merging judge data into holdings...")
     enhanced_holdings = merge_judge_data_into_holdings(
@@ -361,7 +353,7 @@ def main():
     save_enhanced_holdings(enhanced_holdings, OUTPUT_PATH / "holdings_judicial.csv")
 
     print("Saving co-occurrence matrix...")
-    save_cooccurrence_matrix(cooccurrence_matrix, all_judges, OUTPUT_PATH / "judge_cooccurrence_matrix.csv")
+    save_cooccurrence_matrix(network, OUTPUT_PATH / COOCCURRENCE_FILENAME)
 
     print("Saving judge statistics...")
     save_judge_stats(judge_stats, OUTPUT_PATH / "judge_statistics.json")
@@ -370,7 +362,7 @@ def main():
     save_rapporteur_groupings(rapporteur_groupings, OUTPUT_PATH / "rapporteur_groupings.json")
 
     # Print summary report
-    print_summary_report(cases, rapporteur_groupings, judge_stats, all_judges)
+    print_summary_report(cases, rapporteur_groupings, judge_stats, all_judges, network)
 
     print(f"\n{'='*70}")
     print("PHASE 1 COMPLETE: Data preparation finished successfully!")
@@ -21,6 +21,8 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+from citation_graph import load_graph, GRAPH_FILENAME
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
@@ -32,7 +34,7 @@ def load_data():
     holdings = pd.read_csv(OUTPUT_PATH / "holdings_prepared.csv")
 
     # Load citation-derived variables
-    citation_vars = pd.read_csv(NETWORK_PATH / "holding_citation_vars.csv")
+    citation_vars = load_graph(NETWORK_PATH / GRAPH_FILENAME).holding_table()
 
     # Merge
     df = holdings.merge(citation_vars, on=['case_id', 'holding_id'], how='left')
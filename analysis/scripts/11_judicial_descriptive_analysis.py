@@ -7,7 +7,7 @@ Phase 2: Descriptive Analysis for Judicial Effects
 This script:
 1. Creates rapporteur profiles (pro-DS rate, topics, chambers, temporal)
 2. Creates chamber profiles (pro-DS rate, rapporteurs, topics)
-3. Creates individual judge exposure summaries
+3. Creates individual judge exposure summaries (absent = eligible, in office)
 4. Performs network diagnostics on co-occurrence structure
 5. Generates tables and preliminary visualizations
 """
@@ -18,12 +18,18 @@ import math
 from pathlib import Path
 from collections import defaultdict
 
+import numpy as np
+
+from judge_network import (COOCCURRENCE_FILENAME, load_cooccurrence, network_statistics,
+                           panel_incidence, strongest_pairs)
+from judge_tenure import judge_tenure, load_sittings
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 HOLDINGS_JUDICIAL = PROJECT_ROOT / "analysis" / "output" / "holdings_judicial.csv"
 JUDGE_STATS = PROJECT_ROOT / "analysis" / "output" / "judge_statistics.json"
 RAPPORTEUR_GROUPINGS = PROJECT_ROOT / "analysis" / "output" / "rapporteur_groupings.json"
-COOCCURRENCE_MATRIX = PROJECT_ROOT / "analysis" / "output" / "judge_cooccurrence_matrix.csv"
+COOCCURRENCE_MATRIX = PROJECT_ROOT / "analysis" / "output" / COOCCURRENCE_FILENAME
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
 
 def wilson_score_interval(successes, n, confidence=0.95):
@@ -65,18 +71,9 @@ def load_rapporteur_groupings():
         return json.load(f)
 
 def load_cooccurrence_matrix():
-    """Load co-occurrence matrix."""
-    matrix = []
-    judges = []
-    with open(COOCCURRENCE_MATRIX, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        judges = header[1:]  # Skip first empty column
-        for row in reader:
-            judge = row[0]
-            values = [int(x) for x in row[1:]]
-            matrix.append(values)
-    return matrix, judges
+    """Load the co-occurrence matrices (sparse; 'cases', 'holdings', 'year_YYYY')."""
+    network = load_cooccurrence(COOCCURRENCE_MATRIX)
+    return network['matrices'], network['judges']
 
 # =============================================================================
 # RAPPORTEUR PROFILES
@@ -298,80 +295,66 @@ def print_chamber_profiles(profiles):
 # INDIVIDUAL JUDGE EXPOSURE ANALYSIS
 # =============================================================================
 
-def analyze_judge_exposure(holdings, judge_stats):
-    """Analyze outcomes when each judge is present vs. absent."""
-    results = {}
+def analyze_judge_exposure(holdings, judge_stats, tenure, min_absent=10):
+    """
+    Analyze outcomes when each judge is present vs. absent.
+
+    Absent counts only the holdings decided while the judge was at the Court
+    (their observed tenure, judge_tenure), so a judge is not compared with
+    cases from before they joined or after they left. Presence, eligibility
+    and pro-DS counts for all judges come from one (holdings x judges) pass.
+
+    Tenure is observed from this corpus only, so a judge who sat on most
+    cases of their tenure has few eligible absent holdings; with fewer than
+    min_absent the rate difference and odds ratio are not estimable (None).
+    """
+    panels = [{'judges': [j for j in (h.get('judges', '') or '').split(';') if j]}
+              for h in holdings]
+    in_data = {judge for panel in panels for judge in panel['judges']}
+    judges, B = panel_incidence(panels, sorted(in_data | set(tenure.keys)))
+
+    present = B.toarray().astype(bool)
+    dates = [h.get('judgment_date', '') for h in holdings]
+    eligible = present | tenure.active(dates, keys=judges)
+    absent = eligible & ~present
+
+    pro_ds = np.array([h['pro_ds'] for h in holdings], dtype=np.int64)
+    present_total, absent_total = present.sum(axis=0), absent.sum(axis=0)
+    present_pro_ds, absent_pro_ds = pro_ds @ present, pro_ds @ absent
 
-    # Get all judge columns from holdings
-    sample_holding = holdings[0] if holdings else {}
-    judge_columns = [c for c in sample_holding.keys() if c.startswith('judge_')]
-
-    # Also track by original judge names
-    judge_name_mapping = {}
-    for col in judge_columns:
-        # Reverse the column name transformation
-        name = col.replace('judge_', '').replace('_', ' ').replace('  ', '. ').replace(' ', '.')
-        judge_name_mapping[col] = col  # Keep column name for now
-
-    for col in judge_columns:
-        present_pro_ds = 0
-        present_total = 0
-        absent_pro_ds = 0
-        absent_total = 0
-
-        for h in holdings:
-            try:
-                is_present = int(h.get(col, 0))
-            except:
-                is_present = 0
-
-            if is_present:
-                present_total += 1
-                present_pro_ds += h['pro_ds']
-            else:
-                absent_total += 1
-                absent_pro_ds += h['pro_ds']
+    results = {}
+    for i, judge in enumerate(judges):
+        if judge not in in_data:
+            continue
+        n_present, n_absent = int(present_total[i]), int(absent_total[i])
+        a, c = int(present_pro_ds[i]), int(absent_pro_ds[i])
 
         # Calculate rates and CIs
-        if present_total > 0:
-            present_rate, present_ci_low, present_ci_high = wilson_score_interval(present_pro_ds, present_total)
-        else:
-            present_rate, present_ci_low, present_ci_high = 0, 0, 0
-
-        if absent_total > 0:
-            absent_rate, absent_ci_low, absent_ci_high = wilson_score_interval(absent_pro_ds, absent_total)
-        else:
-            absent_rate, absent_ci_low, absent_ci_high = 0, 0, 0
+        present_rate, present_ci_low, present_ci_high = wilson_score_interval(a, n_present)
+        absent_rate, absent_ci_low, absent_ci_high = wilson_score_interval(c, n_absent)
 
-        # Calculate difference
-        diff = present_rate - absent_rate if present_total > 0 and absent_total > 0 else 0
+        # Calculate difference (only with enough eligible absent holdings)
+        estimable = n_present > 0 and n_absent >= min_absent
+        diff = present_rate - absent_rate if estimable else None
 
         # Calculate odds ratio
-        if present_total > 0 and absent_total > 0 and present_pro_ds > 0 and absent_pro_ds > 0:
-            # Avoid division by zero
-            a = present_pro_ds
-            b = present_total - present_pro_ds
-            c = absent_pro_ds
-            d = absent_total - absent_pro_ds
-
-            if b > 0 and c > 0:
-                odds_ratio = (a * d) / (b * c)
-            else:
-                odds_ratio = None
-        else:
-            odds_ratio = None
-
-        results[col] = {
-            'present_n': present_total,
-            'present_pro_ds': present_pro_ds,
+        b, d = n_present - a, n_absent - c
+        odds_ratio = (a * d) / (b * c) if estimable and a > 0 and c > 0 and b > 0 else None
+
+        results[judge] = {
+            'present_n': n_present,
+            'present_pro_ds': a,
             'present_rate': present_rate,
             'present_ci': (present_ci_low, present_ci_high),
-            'absent_n': absent_total,
-            'absent_pro_ds': absent_pro_ds,
+            'absent_n': n_absent,
+            'absent_pro_ds': c,
             'absent_rate': absent_rate,
             'absent_ci': (absent_ci_low, absent_ci_high),
             'rate_diff': diff,
-            'odds_ratio': odds_ratio
+            'odds_ratio': odds_ratio,
+            'eligible_n': int(eligible[:, i].sum()),
+            'not_in_office_n': int(len(holdings) - eligible[:, i].sum()),
+            'tenure': tuple(str(day) for day in tenure.interval(judge)) if judge in tenure else None
         }
 
     return results
@@ -381,23 +364,23 @@ def print_judge_exposure(exposure_results, min_cases=10):
     print("\n" + "=" * 80)
     print("INDIVIDUAL JUDGE EXPOSURE ANALYSIS")
     print("=" * 80)
-    print(f"(Showing judges with ≥{min_cases} cases when present)")
+    print(f"(Showing judges with ≥{min_cases} cases when present; absent = decided while in office;")
+    print(" N/A: too few absent holdings within the judge's tenure)")
 
-    # Filter and sort by rate difference
+    # Filter and sort by rate difference; non-estimable judges go last
     filtered = {k: v for k, v in exposure_results.items() if v['present_n'] >= min_cases}
-    sorted_judges = sorted(filtered.items(), key=lambda x: -x[1]['rate_diff'])
+    estimable = {k: v for k, v in filtered.items() if v['rate_diff'] is not None}
+    sorted_judges = (sorted(estimable.items(), key=lambda x: -x[1]['rate_diff'])
+                     + sorted((k, v) for k, v in filtered.items() if k not in estimable))
 
     print(f"\n{'Judge':<30} {'When Present':>20} {'When Absent':>20} {'Diff':>8} {'OR':>8}")
     print(f"{'':30} {'n':>6} {'Pro-DS':>12} {'n':>6} {'Pro-DS':>12}")
     print("-" * 90)
 
-    for judge_col, data in sorted_judges:
-        # Clean up judge name for display
-        judge_name = judge_col.replace('judge_', '').replace('_', ' ')
-
+    for judge_name, data in sorted_judges:
         present_str = f"{data['present_rate']:.1%}"
-        absent_str = f"{data['absent_rate']:.1%}"
-        diff_str = f"{data['rate_diff']:+.1%}"
+        absent_str = f"{data['absent_rate']:.1%}" if data['absent_n'] > 0 else "N/A"
+        diff_str = f"{data['rate_diff']:+.1%}" if data['rate_diff'] is not None else "N/A"
         or_str = f"{data['odds_ratio']:.2f}" if data['odds_ratio'] else "N/A"
 
         print(f"{judge_name:<30} {data['present_n']:>6} {present_str:>12} {data['absent_n']:>6} {absent_str:>12} {diff_str:>8} {or_str:>8}")
@@ -409,16 +392,16 @@ def print_judge_exposure(exposure_results, min_cases=10):
     print("JUDGES WITH NOTABLE EFFECTS (|diff| > 15pp, n≥10):")
     print("-" * 80)
 
-    notable = [(k, v) for k, v in filtered.items() if abs(v['rate_diff']) > 0.15]
+    notable = [(k, v) for k, v in estimable.items() if abs(v['rate_diff']) > 0.15]
     notable_sorted = sorted(notable, key=lambda x: abs(x[1]['rate_diff']), reverse=True)
 
     if notable:
-        for judge_col, data in notable_sorted:
-            judge_name = judge_col.replace('judge_', '').replace('_', ' ')
+        for judge_name, data in notable_sorted:
             direction = "MORE pro-DS" if data['rate_diff'] > 0 else "LESS pro-DS"
             print(f"  {judge_name}: {direction} by {abs(data['rate_diff']):.1%} when present")
             print(f"    Present: {data['present_rate']:.1%} ({data['present_n']} holdings)")
-            print(f"    Absent:  {data['absent_rate']:.1%} ({data['absent_n']} holdings)")
+            print(f"    Absent:  {data['absent_rate']:.1%} ({data['absent_n']} holdings, "
+                  f"{data['not_in_office_n']} more decided outside their tenure)")
     else:
         print("  No judges show differences exceeding 15 percentage points.")
 
@@ -426,8 +409,16 @@ def print_judge_exposure(exposure_results, min_cases=10):
 # NETWORK DIAGNOSTICS
 # =============================================================================
 
-def analyze_network(matrix, judges):
-    """Analyze co-occurrence network structure."""
+def analyze_network(matrices, judges):
+    """
+    Analyze co-occurrence network structure.
+
+    Degrees, strengths, triangles and clustering come from sparse matrix
+    products over the case co-occurrence matrix (see judge_network); the
+    holding-weighted and per-year matrices add weighted pair counts and
+    the network's evolution.
+    """
+    matrix = matrices['cases']
     n = len(judges)
 
     print("\n" + "=" * 80)
@@ -435,81 +426,67 @@ def analyze_network(matrix, judges):
     print("=" * 80)
 
     # Basic stats
-    total_cooccurrences = sum(sum(row) for row in matrix) // 2  # Divide by 2 for symmetry
-    diagonal_sum = sum(matrix[i][i] for i in range(n))
-
-    # Count edges (non-zero off-diagonal)
-    edges = 0
-    for i in range(n):
-        for j in range(i+1, n):
-            if matrix[i][j] > 0:
-                edges += 1
-
+    total_cooccurrences = int(matrix.sum()) // 2  # Divide by 2 for symmetry
+    stats = network_statistics(matrix)
+    edges = stats['n_edges']
     max_edges = n * (n - 1) // 2
-    density = edges / max_edges if max_edges > 0 else 0
+    density = stats['density']
 
     print(f"\n  Network size: {n} judges")
     print(f"  Total co-occurrences: {total_cooccurrences}")
     print(f"  Edges (unique pairs): {edges}")
     print(f"  Max possible edges: {max_edges}")
     print(f"  Density: {density:.3f}")
+    print(f"  Triangles: {stats['n_triangles']}")
 
     # Degree distribution
-    degrees = []
-    for i in range(n):
-        deg = sum(1 for j in range(n) if i != j and matrix[i][j] > 0)
-        degrees.append((judges[i], deg, sum(matrix[i][j] for j in range(n) if i != j)))
-
-    degrees_sorted = sorted(degrees, key=lambda x: -x[1])
-
+    degree, strength = stats['degree'], stats['strength']
     print(f"\n  Degree statistics:")
-    print(f"    Mean degree: {sum(d[1] for d in degrees) / n:.1f}")
-    print(f"    Max degree: {max(d[1] for d in degrees)}")
-    print(f"    Min degree: {min(d[1] for d in degrees)}")
+    print(f"    Mean degree: {degree.mean():.1f}")
+    print(f"    Max degree: {degree.max()}")
+    print(f"    Min degree: {degree.min()}")
 
     print(f"\n  Top 10 judges by connectivity:")
-    for judge, deg, weight in degrees_sorted[:10]:
-        print(f"    {judge}: {deg} connections, {weight} total co-occurrences")
+    for i in np.argsort(-degree, kind='stable')[:10]:
+        print(f"    {judges[i]}: {degree[i]} connections, {strength[i]} total co-occurrences")
 
     # Find strongest pairs
     print(f"\n  Strongest judge pairs (most co-occurrences):")
-    pairs = []
-    for i in range(n):
-        for j in range(i+1, n):
-            if matrix[i][j] > 0:
-                pairs.append((judges[i], judges[j], matrix[i][j]))
-
-    pairs_sorted = sorted(pairs, key=lambda x: -x[2])[:10]
-    for j1, j2, count in pairs_sorted:
-        print(f"    {j1} - {j2}: {count} cases together")
-
-    # Clustering coefficient (simplified)
-    # For each node, what fraction of its neighbors are connected to each other?
-    clustering_coeffs = []
-    for i in range(n):
-        neighbors = [j for j in range(n) if i != j and matrix[i][j] > 0]
-        k = len(neighbors)
-        if k < 2:
-            continue
-
-        # Count edges among neighbors
-        neighbor_edges = 0
-        for ni in range(len(neighbors)):
-            for nj in range(ni+1, len(neighbors)):
-                if matrix[neighbors[ni]][neighbors[nj]] > 0:
-                    neighbor_edges += 1
+    for i, j, count in zip(*strongest_pairs(matrix, k=10)):
+        print(f"    {judges[i]} - {judges[j]}: {count} cases together")
 
-        max_neighbor_edges = k * (k - 1) // 2
-        cc = neighbor_edges / max_neighbor_edges if max_neighbor_edges > 0 else 0
-        clustering_coeffs.append(cc)
-
-    avg_clustering = sum(clustering_coeffs) / len(clustering_coeffs) if clustering_coeffs else 0
+    if 'holdings' in matrices:
+        print(f"\n  Strongest judge pairs (holdings decided together):")
+        for i, j, count in zip(*strongest_pairs(matrices['holdings'], k=5)):
+            print(f"    {judges[i]} - {judges[j]}: {count} holdings together")
 
+    # Clustering coefficient: share of each judge's co-panelists who have
+    # also sat together (judges with at least two co-panelists)
+    avg_clustering = stats['avg_clustering']
     print(f"\n  Average clustering coefficient: {avg_clustering:.3f}")
     if avg_clustering > 0.5:
         print("    → High clustering indicates judges form tight-knit groups")
         print("    → This increases confounding in individual judge analysis")
 
+    # Network by judgment year
+    yearly = {}
+    year_names = sorted(name for name in matrices if name.startswith('year_'))
+    if year_names:
+        print(f"\n  Network by year:")
+        print(f"    {'Year':>6} {'Judges':>7} {'Edges':>6} {'Density':>8} {'Clustering':>11}")
+        for name in year_names:
+            layer = matrices[name]
+            active = np.flatnonzero(layer.diagonal() > 0)
+            layer_stats = network_statistics(layer[active][:, active])
+            yearly[int(name[5:])] = {
+                'n_judges': int(len(active)),
+                'n_edges': layer_stats['n_edges'],
+                'density': layer_stats['density'],
+                'avg_clustering': layer_stats['avg_clustering'],
+            }
+            print(f"    {name[5:]:>6} {len(active):>7} {layer_stats['n_edges']:>6} "
+                  f"{layer_stats['density']:>8.3f} {layer_stats['avg_clustering']:>11.3f}")
+
     # Interpretation
     print("\n" + "-" * 80)
     print("NETWORK INTERPRETATION:")
@@ -531,7 +508,9 @@ def analyze_network(matrix, judges):
         'n_edges': edges,
         'density': density,
         'avg_clustering': avg_clustering,
-        'avg_degree': sum(d[1] for d in degrees) / n
+        'avg_degree': float(degree.mean()),
+        'n_triangles': stats['n_triangles'],
+        'by_year': yearly,
     }
 
 # =============================================================================
@@ -565,7 +544,8 @@ def main():
     holdings = load_holdings()
     judge_stats = load_judge_stats()
     rapporteur_groupings = load_rapporteur_groupings()
-    cooccurrence_matrix, judges = load_cooccurrence_matrix()
+    cooccurrence_matrices, judges = load_cooccurrence_matrix()
+    tenure = judge_tenure(load_sittings())
 
     print(f"Loaded {len(holdings)} holdings")
 
@@ -585,12 +565,12 @@ def main():
 
     # 3. Judge exposure analysis
     print("\nAnalyzing individual judge exposure...")
-    judge_exposure = analyze_judge_exposure(holdings, judge_stats)
+    judge_exposure = analyze_judge_exposure(holdings, judge_stats, tenure)
     print_judge_exposure(judge_exposure, min_cases=10)
 
     # 4. Network diagnostics
     print("\nAnalyzing co-occurrence network...")
-    network_stats = analyze_network(cooccurrence_matrix, judges)
+    network_stats = analyze_network(cooccurrence_matrices, judges)
 
     # Save results
     save_descriptive_results(rapporteur_profiles, chamber_profiles, judge_exposure, network_stats)
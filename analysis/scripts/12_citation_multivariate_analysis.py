@@ -8,7 +8,8 @@ Tests whether citation effects persist after controlling for case characteristic
   H2.1: Precedent direction effect persists after controls
   H2.2: Network position independently associated with outcomes
 
-Uses hierarchical logistic regression with cluster-robust standard errors.
+Uses hierarchical logistic regression with cluster-robust standard errors,
+and wild cluster bootstrap p-values (few case clusters).
 """
 
 import pandas as pd
@@ -23,6 +24,11 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+from citation_graph import load_graph, GRAPH_FILENAME
+from model_specs import get_spec
+from resampling import ResamplingExecutor
+from wild_bootstrap import N_WILD_BOOT, wild_cluster_ols, wild_score_logit
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
@@ -34,7 +40,7 @@ def load_data():
     holdings = pd.read_csv(OUTPUT_PATH / "holdings_prepared.csv")
 
     # Load citation-derived variables
-    citation_vars = pd.read_csv(NETWORK_PATH / "holding_citation_vars.csv")
+    citation_vars = load_graph(NETWORK_PATH / GRAPH_FILENAME).holding_table()
 
     # Merge
     df = holdings.merge(citation_vars, on=['case_id', 'holding_id'], how='left')
@@ -121,6 +127,30 @@ def extract_model_results(model, model_name):
 
     return results
 
+def add_wild_bootstrap(results, formula, df, executor=None):
+    """
+    Add wild cluster bootstrap p-values (clustered by case) to every
+    coefficient: p_wild from the logit score bootstrap, p_wild_lpm from the
+    WCR bootstrap-t of the linear probability model.
+    """
+    if results is None:
+        return results
+
+    spec = get_spec(formula, df)
+    case_groups = df['case_id'].values[spec.rows]
+    wild_logit = wild_score_logit(spec.X, spec.y, case_groups, spec.columns,
+                                  executor=executor)
+    wild_lpm = wild_cluster_ols(spec.X, spec.y, case_groups, spec.columns,
+                                executor=executor)
+
+    for var, coef in results['coefficients'].items():
+        if var in wild_logit:
+            coef['p_wild'] = wild_logit[var]['p_boot']
+            coef['p_wild_lpm'] = wild_lpm[var]['p_boot']
+    results['n_clusters'] = int(len(np.unique(case_groups)))
+    results['n_wild_boot'] = N_WILD_BOOT
+    return results
+
 def print_model_summary(results, title):
     """Print model results in formatted table."""
     if results is None:
@@ -132,15 +162,16 @@ def print_model_summary(results, title):
     print(f"N = {results['n_obs']}, Pseudo R² = {results['pseudo_r2']:.4f}, "
           f"AIC = {results['aic']:.1f}, BIC = {results['bic']:.1f}")
     print("-" * 80)
-    print(f"{'Variable':<40} {'OR':>8} {'95% CI':>16} {'p-value':>10}")
+    print(f"{'Variable':<40} {'OR':>8} {'95% CI':>16} {'p-value':>10} {'WCB p':>8}")
     print("-" * 80)
 
     for var, coef in results['coefficients'].items():
         ci = f"[{coef['ci_lower']:.2f}, {coef['ci_upper']:.2f}]"
         sig = "***" if coef['p_value'] < 0.001 else "**" if coef['p_value'] < 0.01 else "*" if coef['p_value'] < 0.05 else ""
-        print(f"{var:<40} {coef['odds_ratio']:>8.2f} {ci:>16} {coef['p_value']:>8.4f} {sig}")
+        wild = f"{coef['p_wild']:>8.4f}" if 'p_wild' in coef else f"{'':>8}"
+        print(f"{var:<40} {coef['odds_ratio']:>8.2f} {ci:>16} {coef['p_value']:>8.4f} {sig:<3} {wild}".rstrip())
 
-def run_hierarchical_models(df):
+def run_hierarchical_models(df, executor=None):
     """
     Run hierarchical logistic regression models.
 
@@ -148,6 +179,8 @@ def run_hierarchical_models(df):
     Model 1: + Pro-DS purpose (established predictor)
     Model 2: + Citation variables
     Model 3: + Network position variables
+
+    Every coefficient also gets wild cluster bootstrap p-values.
     """
     print("\n" + "=" * 80)
     print("HIERARCHICAL LOGISTIC REGRESSION MODELS")
@@ -159,6 +192,7 @@ def run_hierarchical_models(df):
     formula_0 = "pro_ds ~ C(chamber_grouped) + year + C(concept_cluster)"
     model_0_robust, model_0 = fit_model(formula_0, df, "Model 0: Baseline")
     results_0 = extract_model_results(model_0_robust, "Model 0: Baseline (Institutional + Concept)")
+    results_0 = add_wild_bootstrap(results_0, formula_0, df, executor)
     all_results['model_0'] = results_0
     print_model_summary(results_0, "Model 0: Baseline (Institutional + Concept)")
 
@@ -166,6 +200,7 @@ def run_hierarchical_models(df):
     formula_1 = "pro_ds ~ C(chamber_grouped) + year + C(concept_cluster) + pro_ds_purpose"
     model_1_robust, model_1 = fit_model(formula_1, df, "Model 1: + Purpose")
     results_1 = extract_model_results(model_1_robust, "Model 1: + Pro-DS Purpose")
+    results_1 = add_wild_bootstrap(results_1, formula_1, df, executor)
     all_results['model_1'] = results_1
     print_model_summary(results_1, "Model 1: + Pro-DS Purpose")
 
@@ -174,6 +209,7 @@ def run_hierarchical_models(df):
                  "precedent_direction_score + cites_gc_precedent")
     model_2_robust, model_2 = fit_model(formula_2, df, "Model 2: + Citations")
     results_2 = extract_model_results(model_2_robust, "Model 2: + Citation Variables")
+    results_2 = add_wild_bootstrap(results_2, formula_2, df, executor)
     all_results['model_2'] = results_2
     print_model_summary(results_2, "Model 2: + Citation Variables")
 
@@ -190,6 +226,7 @@ def run_hierarchical_models(df):
                      "precedent_direction_score + cites_gc_precedent + avg_cited_pagerank_std")
         model_3_robust, model_3 = fit_model(formula_3, df_m3, "Model 3: + Network Position")
         results_3 = extract_model_results(model_3_robust, "Model 3: + Network Position")
+        results_3 = add_wild_bootstrap(results_3, formula_3, df_m3, executor)
         all_results['model_3'] = results_3
         print_model_summary(results_3, "Model 3: + Network Position (standardized PageRank)")
 
@@ -256,6 +293,34 @@ def test_precedent_effect_robustness(df):
             'p': float(model.pvalues['predominantly_pro_ds_precedents'])
         }
 
+    # Test 5: Multi-hop precedent direction (inherited through citation chains)
+    print("\nTest 5: Inherited direction (multi-hop, discounted per hop)")
+    formula = "pro_ds ~ inherited_direction_score + C(chamber_grouped) + C(concept_cluster)"
+    model, _ = fit_model(formula, df, "Inherited direction")
+    if model:
+        print(f"  Inherited direction OR: {np.exp(model.params['inherited_direction_score']):.2f}")
+        print(f"  p-value: {model.pvalues['inherited_direction_score']:.4f}")
+        results['inherited'] = {
+            'or': float(np.exp(model.params['inherited_direction_score'])),
+            'p': float(model.pvalues['inherited_direction_score'])
+        }
+
+    # Test 6: Deeper precedent beyond the directly cited cases
+    print("\nTest 6: Inherited direction controlling for direct precedent direction")
+    formula = "pro_ds ~ precedent_direction_score + inherited_direction_score"
+    model, _ = fit_model(formula, df, "Direct + inherited")
+    if model:
+        print(f"  Direct precedent OR: {np.exp(model.params['precedent_direction_score']):.2f}, "
+              f"p = {model.pvalues['precedent_direction_score']:.4f}")
+        print(f"  Inherited direction OR: {np.exp(model.params['inherited_direction_score']):.2f}, "
+              f"p = {model.pvalues['inherited_direction_score']:.4f}")
+        results['direct_and_inherited'] = {
+            'precedent_or': float(np.exp(model.params['precedent_direction_score'])),
+            'precedent_p': float(model.pvalues['precedent_direction_score']),
+            'inherited_or': float(np.exp(model.params['inherited_direction_score'])),
+            'inherited_p': float(model.pvalues['inherited_direction_score'])
+        }
+
     return results
 
 def test_purpose_propagation_multivariate(df):
@@ -332,7 +397,9 @@ def analyze_key_predictors(all_results):
             if results and var in results['coefficients']:
                 coef = results['coefficients'][var]
                 sig = "***" if coef['p_value'] < 0.001 else "**" if coef['p_value'] < 0.01 else "*" if coef['p_value'] < 0.05 else ""
-                print(f"  {model_name}: OR={coef['odds_ratio']:.2f} [{coef['ci_lower']:.2f}, {coef['ci_upper']:.2f}], p={coef['p_value']:.4f} {sig}")
+                wild = f", WCB p={coef['p_wild']:.4f}" if 'p_wild' in coef else ""
+                line = f"  {model_name}: OR={coef['odds_ratio']:.2f} [{coef['ci_lower']:.2f}, {coef['ci_upper']:.2f}], p={coef['p_value']:.4f} {sig}"
+                print(line.rstrip() + wild)
 
 def main():
     print("=" * 80)
@@ -356,7 +423,8 @@ def main():
 
     # Run hierarchical models
     print("\n[3/6] Running hierarchical models...")
-    all_results = run_hierarchical_models(df_analysis)
+    with ResamplingExecutor() as executor:
+        all_results = run_hierarchical_models(df_analysis, executor)
 
     # Test robustness
     print("\n[4/6] Testing robustness of precedent effect...")
@@ -392,6 +460,10 @@ def main():
                 findings.append(f"H2.1 NOT SUPPORTED: Precedent direction score not significant after controls")
                 findings.append(f"  OR={pds['odds_ratio']:.2f}, p={pds['p_value']:.4f}")
 
+        if 'p_wild' in coefs.get('precedent_direction_score', {}):
+            findings.append(f"  Wild cluster bootstrap p={coefs['precedent_direction_score']['p_wild']:.4f} "
+                            f"({all_results['model_2']['n_clusters']} case clusters)")
+
         if 'cites_gc_precedent' in coefs:
             gc = coefs['cites_gc_precedent']
             if gc['p_value'] < 0.05:
@@ -406,6 +478,11 @@ def main():
             findings.append(f"\nPro-DS purpose effect:")
             findings.append(f"  OR={purpose['odds_ratio']:.2f} [{purpose['ci_lower']:.2f}, {purpose['ci_upper']:.2f}], p={purpose['p_value']:.4f}")
 
+    if 'inherited' in robustness:
+        inherited = robustness['inherited']
+        findings.append(f"\nMulti-hop (inherited) precedent direction:")
+        findings.append(f"  OR={inherited['or']:.2f}, p={inherited['p']:.4f}")
+
     for f in findings:
         print(f)
 
@@ -10,6 +10,8 @@ This script:
 3. Applies Benjamini-Hochberg FDR correction
 4. Calculates effect sizes (phi, Cramér's V, odds ratios)
 5. Uses Fisher's exact test for small cell counts
+6. Randomization inference: chamber and rapporteur labels permuted across
+   cases (unstratified, within year, within concept cluster)
 """
 
 import json
@@ -19,11 +21,23 @@ from pathlib import Path
 from collections import defaultdict
 from functools import reduce
 
+from resampling import ResamplingExecutor, case_randomization_test
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 HOLDINGS_JUDICIAL = PROJECT_ROOT / "analysis" / "output" / "holdings_judicial.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
 
+# Case-level relabelings per randomization test
+N_RANDOMIZATIONS = 10000
+
+# Strata within which case labels are exchanged
+RANDOMIZATION_STRATA = {
+    'none': None,
+    'year': 'year',
+    'concept': 'concept_cluster',
+}
+
 # =============================================================================
 # STATISTICAL FUNCTIONS
 # =============================================================================
@@ -690,11 +704,73 @@ def pairwise_judge_tests(holdings, min_holdings=10):
 
     return results
 
+# =============================================================================
+# RANDOMIZATION INFERENCE
+# =============================================================================
+
+def randomization_tests(holdings, dimension, executor=None, n_perm=N_RANDOMIZATIONS,
+                        min_holdings=5):
+    """
+    Case-level randomization inference for one case label (chamber or rapporteur).
+
+    The chi-square, Fisher and pairwise tests above treat holdings as
+    independent, but whole cases are assigned to a chamber and rapporteur.
+    Here the label is permuted across cases (unstratified, within year and
+    within concept cluster) and each level's rate difference vs. rest and
+    the omnibus chi-square are recomputed per relabeling.
+    """
+    title = 'RAPPORTEUR' if dimension == 'judge_rapporteur' else dimension.upper()
+    print("\n" + "=" * 80)
+    print(f"RANDOMIZATION INFERENCE: {title} (CASE-LEVEL)")
+    print("=" * 80)
+    print(f"({n_perm} relabelings of cases; p = two-sided share of |diff| at least as large)")
+
+    case_ids = [h.get('case_id', '') for h in holdings]
+    y = [h['pro_ds'] for h in holdings]
+    labels = [h.get(dimension, '') for h in holdings]
+
+    runs = {}
+    for name, column in RANDOMIZATION_STRATA.items():
+        strata = [h.get(column, '') for h in holdings] if column else None
+        runs[name] = case_randomization_test(case_ids, y, labels, strata=strata,
+                                             n_perm=n_perm, executor=executor)
+
+    base = runs['none']
+    omnibus = {name: {'chi2': run['chi2'], 'p_value': run['chi2_p_value'],
+                      'n_strata': run['n_strata']}
+               for name, run in runs.items()}
+
+    levels = {}
+    for k, level in enumerate(base['levels']):
+        if base['n_holdings'][k] < min_holdings:
+            continue
+        levels[level] = {
+            'n_cases': int(base['n_cases'][k]),
+            'n': int(base['n_holdings'][k]),
+            'diff': float(base['observed'][k]),
+            'null_sd': float(base['null_sd'][k]),
+        }
+        for name, run in runs.items():
+            levels[level][f'p_{name}'] = float(run['p_values'][k])
+
+    print(f"\n  Omnibus chi-square = {base['chi2']:.2f}; randomization p: "
+          + ", ".join(f"{name} {result['p_value']:.4f}" for name, result in omnibus.items()))
+
+    print(f"\n{'Level':<22} {'Cases':>5} {'N':>4} {'Diff':>8} {'p(none)':>8} {'p(year)':>8} {'p(concept)':>10}")
+    print("-" * 75)
+    for level, data in sorted(levels.items(), key=lambda x: -abs(x[1]['diff'])):
+        print(f"{level:<22} {data['n_cases']:>5} {data['n']:>4} {data['diff']:>+7.1%} "
+              f"{data['p_none']:>8.4f} {data['p_year']:>8.4f} {data['p_concept']:>10.4f}")
+    print("-" * 75)
+
+    return {'omnibus': omnibus, 'levels': levels}
+
 # =============================================================================
 # SUMMARY
 # =============================================================================
 
-def print_summary(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge):
+def print_summary(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge,
+                  randomization):
     """Print summary of all bivariate findings."""
     print("\n" + "=" * 80)
     print("BIVARIATE ANALYSIS SUMMARY")
@@ -752,11 +828,22 @@ def print_summary(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber,
             print(f"     - {judge_name}: {direction} by {abs(data['diff']):.1%}")
     print("   ⚠ CAUTION: Individual judge effects heavily confounded by co-occurrence")
 
+    print("\n5. CASE-LEVEL RANDOMIZATION (within-year p < 0.05):")
+    for dimension, result in randomization.items():
+        sig = [(level, d) for level, d in result['levels'].items() if d['p_year'] < 0.05]
+        omnibus = result['omnibus']['year']
+        print(f"   {dimension}: omnibus p = {omnibus['p_value']:.4f} (within {omnibus['n_strata']} years)")
+        for level, data in sorted(sig, key=lambda x: x[1]['diff']):
+            direction = "MORE" if data['diff'] > 0 else "LESS"
+            print(f"     - {level}: {direction} by {abs(data['diff']):.1%} "
+                  f"({data['n_cases']} cases, p = {data['p_year']:.4f})")
+
 # =============================================================================
 # SAVE RESULTS
 # =============================================================================
 
-def save_results(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge):
+def save_results(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge,
+                 randomization):
     """Save all bivariate analysis results."""
     results = {
         'omnibus_tests': {
@@ -768,11 +855,14 @@ def save_results(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, p
             'chamber': pairwise_chamber,
             'judge': pairwise_judge
         },
+        'randomization_tests': randomization,
         'metadata': {
             'fdr_alpha': 0.10,
             'min_holdings_rapporteur': 5,
             'min_holdings_chamber': 5,
-            'min_holdings_judge': 10
+            'min_holdings_judge': 10,
+            'n_randomizations': N_RANDOMIZATIONS,
+            'randomization_strata': RANDOMIZATION_STRATA
         }
     }
 
@@ -803,11 +893,20 @@ def main():
     pairwise_chamber = pairwise_chamber_tests(holdings, min_holdings=5)
     pairwise_judge = pairwise_judge_tests(holdings, min_holdings=10)
 
+    # Case-level randomization inference
+    with ResamplingExecutor() as executor:
+        randomization = {
+            dimension: randomization_tests(holdings, dimension, executor=executor)
+            for dimension in ('chamber', 'judge_rapporteur')
+        }
+
     # Summary
-    print_summary(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge)
+    print_summary(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge,
+                  randomization)
 
     # Save results
-    save_results(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge)
+    save_results(omnibus_rap, omnibus_chamber, pairwise_rap, pairwise_chamber, pairwise_judge,
+                 randomization)
 
     print("\n" + "=" * 80)
     print("PHASE 3 COMPLETE: Bivariate analysis finished!")
@@ -818,7 +917,8 @@ def main():
         'omnibus_chamber': omnibus_chamber,
         'pairwise_rapporteur': pairwise_rap,
         'pairwise_chamber': pairwise_chamber,
-        'pairwise_judge': pairwise_judge
+        'pairwise_judge': pairwise_judge,
+        'randomization': randomization
     }
 
 if __name__ == "__main__":
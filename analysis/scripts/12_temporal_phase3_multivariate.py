@@ -18,11 +18,12 @@ import json
 from datetime import datetime
 from scipy import stats
 import statsmodels.api as sm
-import statsmodels.formula.api as smf
 from statsmodels.stats.outliers_influence import variance_inflation_factor
 import warnings
 warnings.filterwarnings('ignore')
 
+from model_specs import get_spec
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -117,14 +118,14 @@ def run_time_as_covariate_models(df):
 
     # Model 1: Year only (baseline)
     print("\n--- Model M-T1: Year Only (Baseline) ---")
-    model1 = smf.logit('pro_ds ~ year_centered', data=df).fit(disp=0)
+    model1 = get_spec('pro_ds ~ year_centered', df).logit()
     results['models']['M_T1_year_only'] = extract_model_results(model1, 'year_centered')
     print(f"Year effect: OR = {np.exp(model1.params['year_centered']):.3f}, p = {model1.pvalues['year_centered']:.4f}")
     print(f"AIC = {model1.aic:.1f}, Pseudo-R² = {model1.prsquared:.4f}")
 
     # Model 2: Year + Compensation
     print("\n--- Model M-T2: Year + Compensation ---")
-    model2 = smf.logit('pro_ds ~ year_centered + is_compensation', data=df).fit(disp=0)
+    model2 = get_spec('pro_ds ~ year_centered + is_compensation', df).logit()
     results['models']['M_T2_year_compensation'] = extract_model_results(model2, 'year_centered')
     print(f"Year effect: OR = {np.exp(model2.params['year_centered']):.3f}, p = {model2.pvalues['year_centered']:.4f}")
     print(f"Compensation effect: OR = {np.exp(model2.params['is_compensation']):.3f}, p = {model2.pvalues['is_compensation']:.4f}")
@@ -132,7 +133,7 @@ def run_time_as_covariate_models(df):
 
     # Model 3: Year + Pro-DS Purpose
     print("\n--- Model M-T3: Year + Pro-DS Purpose ---")
-    model3 = smf.logit('pro_ds ~ year_centered + pro_ds_purpose', data=df).fit(disp=0)
+    model3 = get_spec('pro_ds ~ year_centered + pro_ds_purpose', df).logit()
     results['models']['M_T3_year_purpose'] = extract_model_results(model3, 'year_centered')
     print(f"Year effect: OR = {np.exp(model3.params['year_centered']):.3f}, p = {model3.pvalues['year_centered']:.4f}")
     print(f"Purpose effect: OR = {np.exp(model3.params['pro_ds_purpose']):.3f}, p = {model3.pvalues['pro_ds_purpose']:.4f}")
@@ -140,7 +141,7 @@ def run_time_as_covariate_models(df):
 
     # Model 4: Year + Chamber
     print("\n--- Model M-T4: Year + Third Chamber ---")
-    model4 = smf.logit('pro_ds ~ year_centered + is_third_chamber', data=df).fit(disp=0)
+    model4 = get_spec('pro_ds ~ year_centered + is_third_chamber', df).logit()
     results['models']['M_T4_year_chamber'] = extract_model_results(model4, 'year_centered')
     print(f"Year effect: OR = {np.exp(model4.params['year_centered']):.3f}, p = {model4.pvalues['year_centered']:.4f}")
     print(f"Third Chamber effect: OR = {np.exp(model4.params['is_third_chamber']):.3f}, p = {model4.pvalues['is_third_chamber']:.4f}")
@@ -148,15 +149,13 @@ def run_time_as_covariate_models(df):
 
     # Model 5: Full model
     print("\n--- Model M-T5: Full Model (Year + Compensation + Purpose + Chamber) ---")
-    model5 = smf.logit('pro_ds ~ year_centered + is_compensation + pro_ds_purpose + is_third_chamber',
-                       data=df).fit(disp=0)
+    model5 = get_spec('pro_ds ~ year_centered + is_compensation + pro_ds_purpose + is_third_chamber', df).logit()
     results['models']['M_T5_full'] = extract_model_results(model5, 'year_centered')
     print_model_summary(model5)
 
     # Model 6: Without year (to compare)
     print("\n--- Model M-T6: Without Year (Comparison) ---")
-    model6 = smf.logit('pro_ds ~ is_compensation + pro_ds_purpose + is_third_chamber',
-                       data=df).fit(disp=0)
+    model6 = get_spec('pro_ds ~ is_compensation + pro_ds_purpose + is_third_chamber', df).logit()
     results['models']['M_T6_no_year'] = {
         'aic': model6.aic,
         'pseudo_r2': model6.prsquared,
@@ -230,7 +229,7 @@ def run_interaction_models(df):
 
     # Interaction 1: Purpose × Year
     print("\n--- Interaction: Pro-DS Purpose × Year ---")
-    model_int1 = smf.logit('pro_ds ~ pro_ds_purpose * year_centered', data=df).fit(disp=0)
+    model_int1 = get_spec('pro_ds ~ pro_ds_purpose * year_centered', df).logit()
     int_coef = model_int1.params.get('pro_ds_purpose:year_centered', np.nan)
     int_p = model_int1.pvalues.get('pro_ds_purpose:year_centered', np.nan)
 
@@ -254,7 +253,7 @@ def run_interaction_models(df):
 
     # Interaction 2: Third Chamber × Year
     print("\n--- Interaction: Third Chamber × Year ---")
-    model_int2 = smf.logit('pro_ds ~ is_third_chamber * year_centered', data=df).fit(disp=0)
+    model_int2 = get_spec('pro_ds ~ is_third_chamber * year_centered', df).logit()
     int_coef2 = model_int2.params.get('is_third_chamber:year_centered', np.nan)
     int_p2 = model_int2.pvalues.get('is_third_chamber:year_centered', np.nan)
 
@@ -271,7 +270,7 @@ def run_interaction_models(df):
 
     # Interaction 3: Compensation × Year
     print("\n--- Interaction: Compensation × Year ---")
-    model_int3 = smf.logit('pro_ds ~ is_compensation * year_centered', data=df).fit(disp=0)
+    model_int3 = get_spec('pro_ds ~ is_compensation * year_centered', df).logit()
     int_coef3 = model_int3.params.get('is_compensation:year_centered', np.nan)
     int_p3 = model_int3.pvalues.get('is_compensation:year_centered', np.nan)
 
@@ -304,9 +303,9 @@ def run_temporal_confounding_analysis(df):
     # Third Chamber effect: with and without year control
     print("\n--- Third Chamber Effect: Temporal Confounding ---")
 
-    model_no_year = smf.logit('pro_ds ~ is_third_chamber', data=df).fit(disp=0)
-    model_with_year = smf.logit('pro_ds ~ is_third_chamber + year_centered', data=df).fit(disp=0)
-    model_with_year_cat = smf.logit('pro_ds ~ is_third_chamber + C(year)', data=df).fit(disp=0)
+    model_no_year = get_spec('pro_ds ~ is_third_chamber', df).logit()
+    model_with_year = get_spec('pro_ds ~ is_third_chamber + year_centered', df).logit()
+    model_with_year_cat = get_spec('pro_ds ~ is_third_chamber + C(year)', df).logit()
 
     results['third_chamber_confounding'] = {
         'no_year_control': {
@@ -338,8 +337,8 @@ def run_temporal_confounding_analysis(df):
     # Third Chamber effect: controlling for compensation
     print("\n--- Third Chamber Effect: Controlling for Compensation ---")
 
-    model_comp = smf.logit('pro_ds ~ is_third_chamber + is_compensation', data=df).fit(disp=0)
-    model_full = smf.logit('pro_ds ~ is_third_chamber + is_compensation + year_centered', data=df).fit(disp=0)
+    model_comp = get_spec('pro_ds ~ is_third_chamber + is_compensation', df).logit()
+    model_full = get_spec('pro_ds ~ is_third_chamber + is_compensation + year_centered', df).logit()
 
     results['third_chamber_compensation_control'] = {
         'controlling_compensation': {
@@ -379,15 +378,19 @@ def run_split_sample_analysis(df):
     # Pro-DS Purpose effect by period
     print("\n--- Pro-DS Purpose Effect by Period ---")
 
+    # Period subsets slice the full-sample design instead of recompiling
+    purpose_spec = get_spec('pro_ds ~ pro_ds_purpose', df)
+    period = df['period_binary'].values[purpose_spec.rows]
+
     try:
-        model_early = smf.logit('pro_ds ~ pro_ds_purpose', data=df_early).fit(disp=0)
+        model_early = purpose_spec.logit(rows=np.flatnonzero(period == 0))
         early_or = np.exp(model_early.params['pro_ds_purpose'])
         early_p = model_early.pvalues['pro_ds_purpose']
     except:
         early_or, early_p = np.nan, np.nan
 
     try:
-        model_late = smf.logit('pro_ds ~ pro_ds_purpose', data=df_late).fit(disp=0)
+        model_late = purpose_spec.logit(rows=np.flatnonzero(period == 1))
         late_or = np.exp(model_late.params['pro_ds_purpose'])
         late_p = model_late.pvalues['pro_ds_purpose']
     except:
@@ -404,7 +407,7 @@ def run_split_sample_analysis(df):
     print(f"Late period:  OR = {late_or:.3f}, p = {late_p:.4f}")
 
     # Test for difference (interaction model)
-    model_interaction = smf.logit('pro_ds ~ pro_ds_purpose * period_binary', data=df).fit(disp=0)
+    model_interaction = get_spec('pro_ds ~ pro_ds_purpose * period_binary', df).logit()
     int_p = model_interaction.pvalues.get('pro_ds_purpose:period_binary', np.nan)
     results['purpose_by_period']['interaction_p'] = float(int_p)
     print(f"Interaction test: p = {int_p:.4f}")
@@ -463,7 +466,7 @@ def run_model_comparison(df):
 
     for name, formula in models_spec:
         try:
-            model = smf.logit(formula, data=df).fit(disp=0)
+            model = get_spec(formula, df).logit()
             year_p = model.pvalues.get('year_centered', np.nan)
             year_p_str = f"{year_p:.4f}" if not np.isnan(year_p) else "N/A"
 
@@ -4,11 +4,15 @@
 =====================================
 Phase 4: Multivariate Analysis for Judicial Effects
 
-This script implements multivariate analysis using pure Python:
-1. Stratified analysis (Mantel-Haenszel OR) controlling for confounders
-2. Simple logistic regression via Newton-Raphson
+This script implements:
+1. Stratified analysis (Mantel-Haenszel OR, RBG CIs, Breslow-Day tests)
+   controlling for confounders, on the vectorized numpy/scipy kernel in
+   mantel_haenszel.py
+2. Simple logistic regression by gradient descent (pure Python)
 3. Hierarchical model building for rapporteur and chamber effects
 4. Mediation analysis: Do effects operate through interpretive methods?
+5. Panel overlap: does a panel that repeats an earlier panel rule differently?
+   (statsmodels Logit, Newton MLE with a convergence check)
 """
 
 import json
@@ -18,11 +22,21 @@ from pathlib import Path
 from collections import defaultdict
 from copy import deepcopy
 
+import numpy as np
+import statsmodels.api as sm
+
+from mantel_haenszel import mantel_haenszel_tests
+from panel_index import PanelIndex
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 HOLDINGS_JUDICIAL = PROJECT_ROOT / "analysis" / "output" / "holdings_judicial.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
 
+# Chambers with fewer holdings are pooled in the panel-overlap model (the
+# Second and Ninth Chambers' few holdings are all pro-DS and separate the fit)
+MIN_CHAMBER_HOLDINGS = 5
+
 # =============================================================================
 # DATA LOADING
 # =============================================================================
@@ -42,92 +56,68 @@ def load_holdings():
             holdings.append(row)
     return holdings
 
-# =============================================================================
-# STRATIFIED ANALYSIS (MANTEL-HAENSZEL)
-# =============================================================================
-
-def mantel_haenszel_or(holdings, exposure_col, exposure_value, stratify_by):
+def panel_overlap_by_case(holdings):
     """
-    Calculate Mantel-Haenszel pooled odds ratio, controlling for stratification variable.
+    Panel overlap per case: the maximum Jaccard similarity of the case's
+    panel with the panel of any earlier case (0 when none shares a judge,
+    1 when the same bench has sat before).
 
-    Returns: (pooled_or, ci_low, ci_high, p_value, n_strata)
+    Returns: {case_id: overlap}
     """
-    # Group holdings by stratum
-    strata = defaultdict(list)
+    index = PanelIndex.from_holdings(holdings)
+    case_dates = {}
     for h in holdings:
-        stratum = h.get(stratify_by, 'UNKNOWN')
-        strata[stratum].append(h)
-
-    # Calculate MH components for each stratum
-    numerator = 0
-    denominator = 0
-    variance_sum = 0
-
-    valid_strata = 0
-
-    for stratum, stratum_holdings in strata.items():
-        # 2x2 table for this stratum
-        # Exposure (1/0) × Outcome (pro_ds 1/0)
-        a = sum(1 for h in stratum_holdings
-                if h.get(exposure_col) == exposure_value and h['pro_ds'] == 1)
-        b = sum(1 for h in stratum_holdings
-                if h.get(exposure_col) == exposure_value and h['pro_ds'] == 0)
-        c = sum(1 for h in stratum_holdings
-                if h.get(exposure_col) != exposure_value and h['pro_ds'] == 1)
-        d = sum(1 for h in stratum_holdings
-                if h.get(exposure_col) != exposure_value and h['pro_ds'] == 0)
-
-        n = a + b + c + d
-        if n == 0:
-            continue
-
-        valid_strata += 1
-
-        # MH numerator: a*d/n
-        numerator += (a * d) / n
-
-        # MH denominator: b*c/n
-        denominator += (b * c) / n
-
-        # Variance component (Robins-Breslow-Greenland)
-        if n > 1:
-            p = (a + d) / n
-            q = (b + c) / n
-            r = (a * d) / n
-            s = (b * c) / n
-
-            if r > 0:
-                variance_sum += (p * r) / (2 * n)
-            if r > 0 and s > 0:
-                variance_sum += (p * s + q * r) / (2 * n)
-            if s > 0:
-                variance_sum += (q * s) / (2 * n)
-
-    if denominator == 0 or numerator == 0:
-        return None, None, None, None, valid_strata
-
-    # Pooled OR
-    mh_or = numerator / denominator
+        case_dates.setdefault(h.get('case_id', ''), h.get('judgment_date', ''))
+    overlap = index.panel_overlap([case_dates[case_id] for case_id in index.case_ids])
+    by_case = {case_id: float(value) for case_id, value in zip(index.case_ids, overlap)}
 
-    # Log OR and SE
-    log_or = math.log(mh_or)
+    repeated = sum(1 for value in overlap if value == 1.0)
+    print(f"Panel overlap: mean {sum(overlap) / len(overlap):.3f} over {len(overlap)} cases, "
+          f"{repeated} cases with an identical earlier panel")
+    return by_case
 
-    # Variance of log OR
-    if numerator > 0 and denominator > 0:
-        var_log_or = variance_sum / (numerator * denominator) if numerator * denominator > 0 else 1
-        se_log_or = math.sqrt(var_log_or) if var_log_or > 0 else 0.5
-    else:
-        se_log_or = 0.5
-
-    # 95% CI
-    ci_low = math.exp(log_or - 1.96 * se_log_or)
-    ci_high = math.exp(log_or + 1.96 * se_log_or)
+# =============================================================================
+# STRATIFIED ANALYSIS (MANTEL-HAENSZEL)
+# =============================================================================
 
-    # Z-test p-value
-    z = log_or / se_log_or if se_log_or > 0 else 0
-    p_value = 2 * (1 - normal_cdf(abs(z)))
+def stratified_odds_ratios(holdings, exposure_col, strata_cols):
+    """
+    Mantel-Haenszel ORs of every level of exposure_col (vs. the rest) under
+    each stratification, from one vectorized pass (mantel_haenszel).
 
-    return mh_or, ci_low, ci_high, p_value, valid_strata
+    Returns: {level: {stratify_by: result}} where result has crude_or, mh_or
+    (None when undefined), Robins-Breslow-Greenland ci_low/ci_high, p_value,
+    n_strata and the Breslow-Day homogeneity test (bd_chi2, bd_df, bd_p_value)
+    """
+    tests = mantel_haenszel_tests(
+        [h.get(exposure_col, '') for h in holdings],
+        [h['pro_ds'] for h in holdings],
+        {col: [h.get(col, 'UNKNOWN') for h in holdings] for col in strata_cols}
+    )
+
+    results = defaultdict(dict)
+    for (level, stratify_by), result in tests.items():
+        results[level][stratify_by] = {
+            k: (None if isinstance(v, float) and math.isnan(v) else v)
+            for k, v in result.items()
+        }
+    return dict(results)
+
+def print_mantel_haenszel_detail(or_results, levels, strata_cols, label):
+    """Print MH ORs with RBG CIs and Breslow-Day p-values per stratification."""
+    print(f"\n  Mantel-Haenszel detail (95% RBG CI; BD = Breslow-Day homogeneity p)")
+    print(f"  {label:<18} {'Stratified by':<18} {'MH OR':>7} {'95% CI':>16} {'p':>8} {'BD p':>8}")
+    print("  " + "-" * 80)
+    for level in levels:
+        for col in strata_cols:
+            r = or_results[level][col]
+            if r['mh_or'] is None:
+                print(f"  {level:<18} {col:<18} {'N/A':>7}")
+                continue
+            ci = f"[{r['ci_low']:.2f}, {r['ci_high']:.2f}]"
+            bd = f"{r['bd_p_value']:.4f}" if r['bd_p_value'] is not None else "N/A"
+            print(f"  {level:<18} {col:<18} {r['mh_or']:>7.2f} {ci:>16} {r['p_value']:>8.4f} {bd:>8}")
+    print("  " + "-" * 80)
 
 def normal_cdf(z):
     """Standard normal CDF approximation."""
@@ -331,6 +321,50 @@ def run_logistic_model(holdings, feature_specs, model_name):
 
     return results
 
+def fit_logit_model(holdings, feature_specs, model_name):
+    """
+    Logistic regression by Newton MLE (statsmodels), with continuous features
+    centred. Returns the run_logistic_model result plus 'converged', or None
+    when the model is not estimable: no convergence (e.g. separation), a
+    singular Hessian or non-finite standard errors.
+    """
+    X, y, feature_names = encode_features(holdings, feature_specs)
+    X = np.array(X)
+    for col, ftype, ref in feature_specs:
+        if ftype == 'continuous':
+            j = feature_names.index(col)
+            X[:, j] -= X[:, j].mean()
+
+    try:
+        fit = sm.Logit(np.array(y), X).fit(disp=0, maxiter=100, warn_convergence=False)
+    except np.linalg.LinAlgError:
+        return None
+    if not fit.mle_retvals['converged'] or not np.all(np.isfinite(fit.bse)):
+        return None
+
+    ci = np.exp(fit.conf_int())
+    results = {
+        'model_name': model_name,
+        'n': len(y),
+        'log_likelihood': float(fit.llf),
+        'log_likelihood_null': float(fit.llnull),
+        'pseudo_r2': float(fit.prsquared),
+        'converged': True,
+        'coefficients': {}
+    }
+    for j, name in enumerate(feature_names):
+        results['coefficients'][name] = {
+            'coef': float(fit.params[j]),
+            'se': float(fit.bse[j]),
+            'z': float(fit.tvalues[j]),
+            'p': float(fit.pvalues[j]),
+            'or': float(np.exp(fit.params[j])),
+            'ci_low': float(ci[j, 0]),
+            'ci_high': float(ci[j, 1])
+        }
+
+    return results
+
 # =============================================================================
 # MAIN ANALYSES
 # =============================================================================
@@ -366,31 +400,18 @@ def analyze_rapporteur_effects(holdings):
     # 3. Concept-adjusted OR (Mantel-Haenszel)
     # 4. Fully adjusted OR
 
-    print(f"\n{'Rapporteur':<20} {'N':>4} {'Crude OR':>10} {'Year-Adj':>10} {'Concept-Adj':>12} {'Change':>8}")
-    print("-" * 75)
-
-    for rap in sorted(eligible_raps, key=lambda r: -rap_counts[r]):
-        # Create binary exposure
-        for h in holdings:
-            h['_exposure'] = h.get('judge_rapporteur', '') == rap
+    strata_cols = ['year', 'concept_cluster', 'chamber']
+    or_results = stratified_odds_ratios(holdings, 'judge_rapporteur', strata_cols)
 
-        # Crude 2x2
-        a = sum(1 for h in holdings if h['_exposure'] and h['pro_ds'])
-        b = sum(1 for h in holdings if h['_exposure'] and not h['pro_ds'])
-        c = sum(1 for h in holdings if not h['_exposure'] and h['pro_ds'])
-        d = sum(1 for h in holdings if not h['_exposure'] and not h['pro_ds'])
+    print(f"\n{'Rapporteur':<20} {'N':>4} {'Crude OR':>10} {'Year-Adj':>10} {'Concept-Adj':>12} {'Chamber-Adj':>12} {'Change':>8}")
+    print("-" * 88)
 
-        crude_or = (a * d) / (b * c) if b * c > 0 else float('inf')
-
-        # Year-adjusted
-        year_or, _, _, year_p, _ = mantel_haenszel_or(
-            holdings, 'judge_rapporteur', rap, 'year'
-        )
-
-        # Concept-adjusted
-        concept_or, _, _, concept_p, _ = mantel_haenszel_or(
-            holdings, 'judge_rapporteur', rap, 'concept_cluster'
-        )
+    eligible_raps = sorted(eligible_raps, key=lambda r: -rap_counts[r])
+    for rap in eligible_raps:
+        crude_or = or_results[rap]['year']['crude_or']
+        year_or = or_results[rap]['year']['mh_or']
+        concept_or = or_results[rap]['concept_cluster']['mh_or']
+        chamber_or = or_results[rap]['chamber']['mh_or']
 
         # Calculate change (attenuation)
         if crude_or and year_or and crude_or != 1 and crude_or != float('inf'):
@@ -406,16 +427,20 @@ def analyze_rapporteur_effects(holdings):
             'crude_or': crude_or,
             'year_adjusted_or': year_or,
             'concept_adjusted_or': concept_or,
-            'change_pct': pct_change
+            'chamber_adjusted_or': chamber_or,
+            'change_pct': pct_change,
+            'mantel_haenszel': or_results[rap]
         }
 
         crude_str = f"{crude_or:.2f}" if crude_or < 100 else ">100"
         year_str = f"{year_or:.2f}" if year_or else "N/A"
         concept_str = f"{concept_or:.2f}" if concept_or else "N/A"
+        chamber_str = f"{chamber_or:.2f}" if chamber_or else "N/A"
 
-        print(f"{rap:<20} {rap_counts[rap]:>4} {crude_str:>10} {year_str:>10} {concept_str:>12} {pct_change:>+7.0f}%")
+        print(f"{rap:<20} {rap_counts[rap]:>4} {crude_str:>10} {year_str:>10} {concept_str:>12} {chamber_str:>12} {pct_change:>+7.0f}%")
 
-    print("-" * 75)
+    print("-" * 88)
+    print_mantel_haenszel_detail(or_results, eligible_raps, strata_cols, 'Rapporteur')
 
     # Interpretation
     print("\nINTERPRETATION:")
@@ -453,34 +478,26 @@ def analyze_chamber_effects(holdings):
     print(f"\n{'Chamber':<18} {'N':>5} {'Crude OR':>10} {'Year-Adj':>10} {'Concept-Adj':>12} {'Rapp-Adj':>10}")
     print("-" * 75)
 
+    strata_cols = ['year', 'concept_cluster', 'judge_rapporteur']
+    or_results = stratified_odds_ratios(holdings, 'chamber', strata_cols)
+
     for chamber in key_chambers:
         n = sum(1 for h in holdings if h.get('chamber') == chamber)
         if n < 5:
             continue
 
-        # Crude
-        a = sum(1 for h in holdings if h.get('chamber') == chamber and h['pro_ds'])
-        b = sum(1 for h in holdings if h.get('chamber') == chamber and not h['pro_ds'])
-        c = sum(1 for h in holdings if h.get('chamber') != chamber and h['pro_ds'])
-        d = sum(1 for h in holdings if h.get('chamber') != chamber and not h['pro_ds'])
-
-        crude_or = (a * d) / (b * c) if b * c > 0 else float('inf')
-
-        # Year-adjusted
-        year_or, _, _, _, _ = mantel_haenszel_or(holdings, 'chamber', chamber, 'year')
-
-        # Concept-adjusted
-        concept_or, _, _, _, _ = mantel_haenszel_or(holdings, 'chamber', chamber, 'concept_cluster')
-
-        # Rapporteur-adjusted
-        rap_or, _, _, _, _ = mantel_haenszel_or(holdings, 'chamber', chamber, 'judge_rapporteur')
+        crude_or = or_results[chamber]['year']['crude_or']
+        year_or = or_results[chamber]['year']['mh_or']
+        concept_or = or_results[chamber]['concept_cluster']['mh_or']
+        rap_or = or_results[chamber]['judge_rapporteur']['mh_or']
 
         results[chamber] = {
             'n': n,
             'crude_or': crude_or,
             'year_adjusted_or': year_or,
             'concept_adjusted_or': concept_or,
-            'rapporteur_adjusted_or': rap_or
+            'rapporteur_adjusted_or': rap_or,
+            'mantel_haenszel': or_results[chamber]
         }
 
         crude_str = f"{crude_or:.2f}" if crude_or and crude_or < 100 else ">100" if crude_or else "N/A"
@@ -491,6 +508,7 @@ def analyze_chamber_effects(holdings):
         print(f"{chamber:<18} {n:>5} {crude_str:>10} {year_str:>10} {concept_str:>12} {rap_str:>10}")
 
     print("-" * 75)
+    print_mantel_haenszel_detail(or_results, list(results), strata_cols, 'Chamber')
 
     # Focus analysis on Third Chamber
     print("\n" + "-" * 80)
@@ -534,8 +552,12 @@ def analyze_chamber_effects(holdings):
 
     return results
 
-def analyze_hierarchical_models(holdings):
-    """Build hierarchical logistic regression models."""
+def analyze_hierarchical_models(holdings, panel_overlap):
+    """
+    Build hierarchical logistic regression models.
+
+    panel_overlap: {case_id: overlap} from panel_overlap_by_case (Model 5)
+    """
     print("\n" + "=" * 80)
     print("HIERARCHICAL MODEL BUILDING")
     print("=" * 80)
@@ -629,6 +651,51 @@ def analyze_hierarchical_models(holdings):
                 or_str = f"{stats['or']:.2f}" if stats['or'] < 100 else ">100"
                 print(f"    {name}: OR={or_str}, p={stats['p']:.4f} {sig}")
 
+    # Model 5: Add panel overlap (how closely the bench repeats an earlier one).
+    # The gradient-descent fit above does not converge once year enters, so
+    # this model is fitted by Newton MLE with sparse chambers pooled, and
+    # panel_overlap gets a likelihood-ratio test against the same model
+    # without it
+    print("\nModel 5: + Panel overlap")
+    chamber_sizes = defaultdict(int)
+    for h in holdings:
+        chamber_sizes[h.get('chamber', '')] += 1
+    model_holdings = [
+        {**h,
+         'chamber_grouped': (h.get('chamber', '') if chamber_sizes[h.get('chamber', '')] >= MIN_CHAMBER_HOLDINGS
+                             else 'OTHER'),
+         'panel_overlap': panel_overlap.get(h.get('case_id', ''), 0.0)}
+        for h in holdings
+    ]
+
+    base_specs = [
+        ('chamber_grouped', 'categorical', 'FIRST'),
+        ('year', 'continuous', None),
+        ('concept_cluster', 'categorical', 'OTHER'),
+        ('rapporteur_grouped', 'categorical', 'OTHER')
+    ]
+    m5 = fit_logit_model(model_holdings, base_specs + [('panel_overlap', 'continuous', None)],
+                         "Full Model + Panel Overlap")
+    m5_base = fit_logit_model(model_holdings, base_specs, "Full Model (pooled chambers)")
+    if m5 and m5_base:
+        lr = max(2 * (m5['log_likelihood'] - m5_base['log_likelihood']), 0.0)
+        m5['panel_overlap_lr_test'] = {'lr': lr, 'df': 1, 'p': math.erfc(math.sqrt(lr / 2))}
+
+        print(f"  Log-likelihood: {m5['log_likelihood']:.2f} "
+              f"(without panel overlap: {m5_base['log_likelihood']:.2f})")
+        print(f"  Pseudo R²: {m5['pseudo_r2']:.4f}")
+        print(f"  Chambers with < {MIN_CHAMBER_HOLDINGS} holdings pooled as OTHER")
+        models.append(m5)
+
+        stats = m5['coefficients']['panel_overlap']
+        test = m5['panel_overlap_lr_test']
+        sig = '*' if test['p'] < 0.05 else ''
+        print(f"    panel_overlap: OR={stats['or']:.2f} [{stats['ci_low']:.2f}, {stats['ci_high']:.2f}], "
+              f"Wald p={stats['p']:.4f}, LR={test['lr']:.2f}, p={test['p']:.4f} {sig}")
+    else:
+        m5 = None
+        print("  Not estimable (Newton MLE did not converge)")
+
     # Model comparison
     print("\n" + "-" * 80)
     print("MODEL COMPARISON")
@@ -760,6 +827,12 @@ def save_results(rap_results, chamber_results, models, mediation):
             }
             for m in models
         ],
+        'panel_overlap_model': next(
+            ({'coefficient': m['coefficients']['panel_overlap'],
+              'lr_test': m['panel_overlap_lr_test']}
+             for m in models if 'panel_overlap_lr_test' in m),
+            None
+        ),
         'mediation_analysis': mediation
     }
 
@@ -776,6 +849,7 @@ def main():
     print("Loading data...")
     holdings = load_holdings()
     print(f"Loaded {len(holdings)} holdings")
+    panel_overlap = panel_overlap_by_case(holdings)
 
     print("\n" + "=" * 80)
     print("PHASE 4: MULTIVARIATE ANALYSIS FOR JUDICIAL EFFECTS")
@@ -788,7 +862,7 @@ def main():
     chamber_results = analyze_chamber_effects(holdings)
 
     # Hierarchical models
-    models = analyze_hierarchical_models(holdings)
+    models = analyze_hierarchical_models(holdings, panel_overlap)
 
     # Mediation analysis
     mediation = analyze_mediation(holdings)
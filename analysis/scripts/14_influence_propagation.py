@@ -14,7 +14,6 @@ Includes doctrinal lineage tracing and counterfactual analysis.
 
 import pandas as pd
 import numpy as np
-import networkx as nx
 from scipy import stats
 import statsmodels.formula.api as smf
 from pathlib import Path
@@ -24,51 +23,38 @@ from collections import defaultdict
 import warnings
 warnings.filterwarnings('ignore')
 
+from citation_graph import load_graph, GRAPH_FILENAME
+from reachability import ReachabilityIndex
+from influence_cascades import edge_transmission_probabilities, simulate_cascades, MODELS
+from resampling import ResamplingExecutor
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
 NETWORK_PATH = OUTPUT_PATH / "citation_network"
 
+N_CASCADE_SIMULATIONS = 10000
+CASCADE_PRIOR_STRENGTH = 2.0
+
 def load_data():
     """Load all required data."""
     holdings = pd.read_csv(OUTPUT_PATH / "holdings_prepared.csv")
-    citation_vars = pd.read_csv(NETWORK_PATH / "holding_citation_vars.csv")
-    case_attrs = pd.read_csv(NETWORK_PATH / "case_attributes.csv")
-    edges = pd.read_csv(NETWORK_PATH / "citation_edges.csv")
+    graph = load_graph(NETWORK_PATH / GRAPH_FILENAME)
+    citation_vars = graph.holding_table()
+    case_attrs = graph.case_table()
+    edges = graph.edge_table()
 
     # Merge holdings with citation vars
     df = holdings.merge(citation_vars, on=['case_id', 'holding_id'], how='left')
     df['judgment_date'] = pd.to_datetime(df['judgment_date'])
 
-    return df, case_attrs, edges
+    return df, case_attrs, edges, graph
 
-def build_internal_network(case_attrs, edges):
-    """Build internal citation network."""
-    corpus_cases = set(case_attrs['case_id'])
+def build_internal_network(graph):
+    """Internal citation network (corpus cases citing corpus cases)."""
+    return graph.internal()
 
-    G = nx.DiGraph()
-
-    # Add nodes
-    for _, row in case_attrs.iterrows():
-        G.add_node(row['case_id'],
-                   judgment_date=row['judgment_date'],
-                   year=int(row['year']),
-                   chamber=row['chamber'],
-                   pro_ds_rate=row['pro_ds_rate'],
-                   pro_ds_count=int(row['pro_ds_count']),
-                   teleological_rate=float(row['teleological_rate']) if pd.notna(row['teleological_rate']) else 0,
-                   pro_ds_purpose_rate=float(row['pro_ds_purpose_rate']) if pd.notna(row['pro_ds_purpose_rate']) else 0)
-
-    # Add edges (only internal)
-    internal_edges = edges[edges['cited_case'].isin(corpus_cases)]
-    for _, row in internal_edges.iterrows():
-        if row['citing_case'] in corpus_cases:
-            if not G.has_edge(row['citing_case'], row['cited_case']):
-                G.add_edge(row['citing_case'], row['cited_case'])
-
-    return G
-
-def trace_doctrinal_lineage(G, case_attrs, concept_filter=None):
+def trace_doctrinal_lineage(G, case_attrs, concept_filter=None, index=None):
     """
     Trace doctrinal development paths through the citation network.
 
@@ -81,10 +67,12 @@ def trace_doctrinal_lineage(G, case_attrs, concept_filter=None):
     print("DOCTRINAL LINEAGE ANALYSIS")
     print("=" * 70)
 
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
+    case_lookup = G.case_records()
+    index = index or ReachabilityIndex(G)
 
     # Identify foundational cases (cited by many, early)
-    in_degrees = dict(G.in_degree())
+    in_degrees = dict(zip(G.case_ids, G.in_degree().tolist()))
+    cascade_sizes = dict(zip(G.case_ids, index.cascade_sizes().tolist()))
     foundational = []
 
     for case_id, in_deg in sorted(in_degrees.items(), key=lambda x: -x[1])[:15]:
@@ -92,6 +80,8 @@ def trace_doctrinal_lineage(G, case_attrs, concept_filter=None):
         foundational.append({
             'case_id': case_id,
             'in_degree': in_deg,
+            'cascade_size': cascade_sizes[case_id],
+            'lineage_depth': index.lineage_depth(case_id),
             'year': info.get('year', 'Unknown'),
             'chamber': info.get('chamber', 'Unknown'),
             'pro_ds_rate': info.get('pro_ds_rate', 0),
@@ -101,12 +91,12 @@ def trace_doctrinal_lineage(G, case_attrs, concept_filter=None):
     print("\nFoundational Cases (Top 15 by Citation Count):")
     print("-" * 70)
     for f in foundational:
-        print(f"  {f['case_id']}: cited {f['in_degree']}x, {f['year']}, "
-              f"pro-DS={f['pro_ds_rate']:.0%}, purpose={f['pro_ds_purpose_rate']:.0%}")
+        print(f"  {f['case_id']}: cited {f['in_degree']}x (cascade {f['cascade_size']} cases), "
+              f"{f['year']}, pro-DS={f['pro_ds_rate']:.0%}, purpose={f['pro_ds_purpose_rate']:.0%}")
 
     return foundational
 
-def analyze_teleological_propagation(df, G, case_attrs):
+def analyze_teleological_propagation(df, G, case_attrs, index=None):
     """
     H4.1: Test whether teleological interpretation propagates through citations.
 
@@ -117,13 +107,18 @@ def analyze_teleological_propagation(df, G, case_attrs):
     print("H4.1: TELEOLOGICAL INTERPRETATION PROPAGATION")
     print("=" * 70)
 
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
+    case_lookup = G.case_records()
     corpus_cases = set(case_attrs['case_id'])
+    index = index or ReachabilityIndex(G)
+
+    # Teleological rate per node, for averaging over transitive foundations
+    tele_rates = np.array([case_lookup.get(c, {}).get('teleological_rate', 0)
+                           for c in G.case_ids], dtype=float)
 
     # For each case, compute proportion of cited cases that used teleological
     case_teleological = []
 
-    for case_id in G.nodes():
+    for case_id in G.case_ids:
         info = case_lookup.get(case_id, {})
         cited_cases = list(G.successors(case_id))  # Cases this case cites
         cited_internal = [c for c in cited_cases if c in corpus_cases]
@@ -135,11 +130,17 @@ def analyze_teleological_propagation(df, G, case_attrs):
         else:
             avg_cited_tele = np.nan
 
+        # Every case it ultimately rests on, not just those cited directly
+        foundations = index.foundation_nodes(G.node(case_id))
+        ancestral_tele = np.mean(tele_rates[foundations]) if len(foundations) else np.nan
+
         case_teleological.append({
             'case_id': case_id,
             'own_teleological_rate': info.get('teleological_rate', 0),
             'cited_teleological_rate': avg_cited_tele,
+            'ancestral_teleological_rate': ancestral_tele,
             'n_cited_internal': len(cited_internal),
+            'n_foundations': len(foundations),
             'year': info.get('year', 0)
         })
 
@@ -153,6 +154,12 @@ def analyze_teleological_propagation(df, G, case_attrs):
     print(f"\nCorrelation: Cited teleological rate ↔ Own teleological rate")
     print(f"  Pearson r = {r:.3f}, p = {p:.4f}")
 
+    # Transitive version: all foundations, however many hops back
+    r_anc, p_anc = stats.pearsonr(tele_df['ancestral_teleological_rate'], tele_df['own_teleological_rate'])
+    print(f"\nCorrelation: Ancestral teleological rate (all foundations) ↔ Own teleological rate")
+    print(f"  Pearson r = {r_anc:.3f}, p = {p_anc:.4f}, "
+          f"median foundations = {tele_df['n_foundations'].median():.0f}")
+
     # Regression
     if len(tele_df) > 20:
         model = smf.ols("own_teleological_rate ~ cited_teleological_rate + year", data=tele_df).fit()
@@ -164,6 +171,8 @@ def analyze_teleological_propagation(df, G, case_attrs):
     return {
         'correlation_r': float(r),
         'correlation_p': float(p),
+        'ancestral_correlation_r': float(r_anc),
+        'ancestral_correlation_p': float(p_anc),
         'n_cases': int(len(tele_df)),
         'interpretation': 'Teleological interpretation shows propagation' if p < 0.05 and r > 0 else 'No significant propagation'
     }
@@ -176,12 +185,12 @@ def analyze_purpose_propagation(df, G, case_attrs):
     print("PURPOSE INVOCATION PROPAGATION")
     print("=" * 70)
 
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
+    case_lookup = G.case_records()
     corpus_cases = set(case_attrs['case_id'])
 
     case_purpose = []
 
-    for case_id in G.nodes():
+    for case_id in G.case_ids:
         info = case_lookup.get(case_id, {})
         cited_cases = list(G.successors(case_id))
         cited_internal = [c for c in cited_cases if c in corpus_cases]
@@ -245,7 +254,7 @@ def trace_compensation_gap(df, G, case_attrs, edges):
     print(f"\nArticle 82 compensation cases: {len(compensation_cases)}")
 
     # Get their pro-DS rates and years
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
+    case_lookup = G.case_records()
 
     comp_timeline = []
     for case_id in compensation_cases:
@@ -300,7 +309,7 @@ def trace_compensation_gap(df, G, case_attrs, edges):
 
     # Compare with non-compensation citers
     all_citers = set()
-    for node in G.nodes():
+    for node in G.case_ids:
         all_citers.update(G.predecessors(node))
 
     non_comp_citers = all_citers - citing_comp
@@ -326,7 +335,7 @@ def analyze_third_chamber_citations(df, G, case_attrs):
     print("THIRD CHAMBER CITATION PATTERNS")
     print("=" * 70)
 
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
+    case_lookup = G.case_records()
 
     # Third chamber cases
     third_cases = case_attrs[case_attrs['chamber'] == 'THIRD']['case_id'].tolist()
@@ -381,32 +390,20 @@ def analyze_direction_concordance(df, edges, case_attrs):
     print("=" * 70)
 
     corpus_cases = set(case_attrs['case_id'])
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
+    pro_ds_rate = case_attrs.set_index('case_id')['pro_ds_rate']
 
     # For internal citations
     internal_edges = edges[
         (edges['citing_case'].isin(corpus_cases)) &
         (edges['cited_case'].isin(corpus_cases))
-    ].copy()
-
-    concordant = 0
-    discordant = 0
+    ]
 
-    for _, row in internal_edges.iterrows():
-        citing_info = case_lookup.get(row['citing_case'], {})
-        cited_info = case_lookup.get(row['cited_case'], {})
+    # Binarize at 0.5
+    citing_dir = internal_edges['citing_case'].map(pro_ds_rate) > 0.5
+    cited_dir = internal_edges['cited_case'].map(pro_ds_rate) > 0.5
 
-        citing_pro_ds = citing_info.get('pro_ds_rate', 0.5)
-        cited_pro_ds = cited_info.get('pro_ds_rate', 0.5)
-
-        # Binarize at 0.5
-        citing_dir = 1 if citing_pro_ds > 0.5 else 0
-        cited_dir = 1 if cited_pro_ds > 0.5 else 0
-
-        if citing_dir == cited_dir:
-            concordant += 1
-        else:
-            discordant += 1
+    concordant = int((citing_dir == cited_dir).sum())
+    discordant = int(len(internal_edges) - concordant)
 
     total = concordant + discordant
     concordance_rate = concordant / total if total > 0 else 0
@@ -429,6 +426,47 @@ def analyze_direction_concordance(df, edges, case_attrs):
         'p_value': float(p)
     }
 
+def simulate_influence_cascades(G, case_attrs, n_sims=N_CASCADE_SIMULATIONS, executor=None):
+    """
+    Monte Carlo cascades of pro-DS reasoning seeded at every case.
+
+    Edge transmission probabilities are the citation concordance rates
+    (pro-DS holdings among holdings citing a pro-DS case), per edge and
+    shrunk towards the pooled rate. Runs both the independent-cascade and
+    linear-threshold models on the same simulated worlds.
+    """
+    print("\n" + "=" * 70)
+    print("INFLUENCE CASCADE SIMULATION")
+    print("=" * 70)
+
+    pro_ds_rate = case_attrs.set_index('case_id')['pro_ds_rate'].reindex(G.case_ids).values
+    probabilities, edge_info = edge_transmission_probabilities(
+        G, pro_ds_rate, prior_strength=CASCADE_PRIOR_STRENGTH)
+
+    print(f"\nTransmission estimated from {edge_info['n_pairs']} holdings citing pro-DS cases")
+    print(f"  Pooled transmission rate: {edge_info['pooled_rate']:.1%} "
+          f"({edge_info['n_edges_observed']}/{edge_info['n_edges']} edges observed)")
+
+    tables = []
+    results = {'edge_probabilities': edge_info}
+    for model in MODELS:
+        table, info = simulate_cascades(G, probabilities, model=model,
+                                        n_sims=n_sims, executor=executor)
+        table.insert(0, 'model', model)
+        tables.append(table)
+
+        print(f"\n{model.replace('_', ' ').title()} ({n_sims} worlds), top 10 seeds:")
+        print("-" * 70)
+        for _, row in table.head(10).iterrows():
+            print(f"  {row['case_id']}: {row['expected_cascade_size']:.1f} cases "
+                  f"(± {row['cascade_se']:.2f}, reachable {row['reachable']}), "
+                  f"P(spread) = {row['p_spread']:.2f}")
+
+        info['top_seeds'] = table.head(10).drop(columns='model').to_dict('records')
+        results[model] = info
+
+    return pd.concat(tables, ignore_index=True), results
+
 def main():
     print("=" * 70)
     print("PHASE 5: INFLUENCE PROPAGATION ANALYSIS")
@@ -436,36 +474,42 @@ def main():
     print(f"Timestamp: {datetime.now().isoformat()}")
 
     # Load data
-    print("\n[1/7] Loading data...")
-    df, case_attrs, edges = load_data()
+    print("\n[1/8] Loading data...")
+    df, case_attrs, edges, graph = load_data()
     print(f"  Loaded {len(df)} holdings, {len(case_attrs)} cases, {len(edges)} citation edges")
 
     # Build network
-    print("\n[2/7] Building citation network...")
-    G = build_internal_network(case_attrs, edges)
-    print(f"  Internal network: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+    print("\n[2/8] Building citation network...")
+    G = build_internal_network(graph)
+    print(f"  Internal network: {G.n_nodes} nodes, {G.n_edges} edges")
+    index = ReachabilityIndex(G)
 
     # Doctrinal lineage
-    print("\n[3/7] Tracing doctrinal lineage...")
-    foundational = trace_doctrinal_lineage(G, case_attrs)
+    print("\n[3/8] Tracing doctrinal lineage...")
+    foundational = trace_doctrinal_lineage(G, case_attrs, index=index)
 
     # H4.1: Teleological propagation
-    print("\n[4/7] Testing H4.1: Teleological propagation...")
-    tele_results = analyze_teleological_propagation(df, G, case_attrs)
+    print("\n[4/8] Testing H4.1: Teleological propagation...")
+    tele_results = analyze_teleological_propagation(df, G, case_attrs, index=index)
 
     # Purpose propagation
-    print("\n[5/7] Analyzing purpose propagation...")
+    print("\n[5/8] Analyzing purpose propagation...")
     purpose_results = analyze_purpose_propagation(df, G, case_attrs)
 
     # H4.2: Compensation gap lineage
-    print("\n[6/7] Testing H4.2: Compensation gap lineage...")
+    print("\n[6/8] Testing H4.2: Compensation gap lineage...")
     comp_results = trace_compensation_gap(df, G, case_attrs, edges)
 
     # Additional analyses
-    print("\n[7/7] Additional analyses...")
+    print("\n[7/8] Additional analyses...")
     third_results = analyze_third_chamber_citations(df, G, case_attrs)
     concordance_results = analyze_direction_concordance(df, edges, case_attrs)
 
+    # Cascade simulation
+    print("\n[8/8] Simulating influence cascades...")
+    with ResamplingExecutor() as executor:
+        cascades, cascade_results = simulate_influence_cascades(G, case_attrs, executor=executor)
+
     # Summary
     print("\n" + "=" * 70)
     print("SUMMARY OF INFLUENCE PROPAGATION FINDINGS")
@@ -491,6 +535,13 @@ def main():
     findings.append(f"  {concordance_results['concordance_rate']:.1%} of citations are direction-concordant")
     findings.append(f"  Significantly above chance: p = {concordance_results['p_value']:.4f}")
 
+    # Cascades
+    top = cascade_results['independent_cascade']['top_seeds'][0]
+    findings.append(f"\nInfluence Cascades (independent cascade, "
+                    f"{cascade_results['edge_probabilities']['pooled_rate']:.1%} pooled transmission):")
+    findings.append(f"  Most influential seed: {top['case_id']} "
+                    f"({top['expected_cascade_size']:.1f} of {top['reachable']} reachable cases)")
+
     for f in findings:
         print(f)
 
@@ -508,6 +559,7 @@ def main():
         },
         'third_chamber_citations': third_results,
         'direction_concordance': concordance_results,
+        'influence_cascades': cascade_results,
         'summary': findings
     }
 
@@ -516,6 +568,10 @@ def main():
         json.dump(results, f, indent=2, default=str)
     print(f"\nResults saved to: {output_file}")
 
+    cascade_file = NETWORK_PATH / "influence_cascades.csv"
+    cascades.to_csv(cascade_file, index=False)
+    print(f"Cascade simulations saved to: {cascade_file}")
+
     print("\n" + "=" * 70)
     print("PHASE 5 COMPLETE: INFLUENCE PROPAGATION ANALYSIS")
     print("=" * 70)
@@ -6,7 +6,8 @@ Phase 5: Robustness Checks for Judicial Effects
 
 This script implements:
 1. Sensitivity analyses (exclude neutral, case-level, temporal splits)
-2. Specification curve analysis
+2. Specification curve analysis (multiverse of outcome, sample, weighting,
+   covariate and estimator choices)
 3. Bootstrap confidence intervals
 4. Inverse holding weighting
 5. Leave-one-out diagnostics
@@ -15,19 +16,27 @@ This script implements:
 import json
 import csv
 import math
-import random
 from pathlib import Path
-from collections import defaultdict
 from copy import deepcopy
 
+import numpy as np
+import pandas as pd
+
+from multiverse import ESTIMATORS, option_medians, run_multiverse, specification_summary
+from resampling import (
+    ResamplingExecutor,
+    bootstrap_rate_differences,
+    case_majority_tables,
+    case_sufficient_stats,
+    inverse_weighted_rates,
+    leave_one_case_out,
+)
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 HOLDINGS_JUDICIAL = PROJECT_ROOT / "analysis" / "output" / "holdings_judicial.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
 
-# Set seed for reproducibility
-random.seed(42)
-
 # =============================================================================
 # DATA LOADING
 # =============================================================================
@@ -82,6 +91,17 @@ def calculate_rate_and_ci(successes, total):
 
     return p, max(0, center - spread), min(1, center + spread)
 
+def holding_case_stats(holdings):
+    """Per-case sufficient statistics for every chamber and rapporteur."""
+    return case_sufficient_stats(
+        [h.get('case_id', '') for h in holdings],
+        [h['pro_ds'] for h in holdings],
+        {
+            'chamber': [h.get('chamber') for h in holdings],
+            'judge_rapporteur': [h.get('judge_rapporteur') for h in holdings],
+        }
+    )
+
 # =============================================================================
 # SENSITIVITY ANALYSIS 1: EXCLUDE NEUTRAL/MIXED
 # =============================================================================
@@ -153,83 +173,45 @@ def sensitivity_exclude_neutral(holdings):
 # SENSITIVITY ANALYSIS 2: CASE-LEVEL AGGREGATION
 # =============================================================================
 
-def sensitivity_case_level(holdings):
+def sensitivity_case_level(holdings, case_stats=None):
     """Re-analyze at case level (majority vote outcome)."""
     print("\n" + "=" * 80)
     print("SENSITIVITY 2: CASE-LEVEL AGGREGATION (MAJORITY VOTE)")
     print("=" * 80)
 
-    # Aggregate to case level
-    cases = defaultdict(lambda: {
-        'pro_ds': 0,
-        'total': 0,
-        'chamber': None,
-        'rapporteur': None
-    })
-
-    for h in holdings:
-        case_id = h.get('case_id', '')
-        cases[case_id]['pro_ds'] += h['pro_ds']
-        cases[case_id]['total'] += 1
-        cases[case_id]['chamber'] = h.get('chamber')
-        cases[case_id]['rapporteur'] = h.get('judge_rapporteur')
-
-    # Determine majority
-    case_outcomes = []
-    for case_id, data in cases.items():
-        majority_pro_ds = 1 if data['pro_ds'] > data['total'] / 2 else 0
-        case_outcomes.append({
-            'case_id': case_id,
-            'pro_ds': majority_pro_ds,
-            'chamber': data['chamber'],
-            'rapporteur': data['rapporteur']
-        })
-
-    print(f"\n  N cases: {len(case_outcomes)}")
-    overall_rate = sum(c['pro_ds'] for c in case_outcomes) / len(case_outcomes)
-    print(f"  Cases with majority pro-DS: {sum(c['pro_ds'] for c in case_outcomes)} ({overall_rate:.1%})")
-
-    results = {}
-
-    # Chamber effects at case level
-    print("\n  Chamber Effects (case level):")
-    for chamber in ['THIRD', 'GRAND_CHAMBER', 'FIRST']:
-        ch_cases = [c for c in case_outcomes if c['chamber'] == chamber]
-        other = [c for c in case_outcomes if c['chamber'] != chamber]
-
-        if len(ch_cases) < 3:
-            continue
-
-        a = sum(c['pro_ds'] for c in ch_cases)
-        b = len(ch_cases) - a
-        c_cnt = sum(c['pro_ds'] for c in other)
-        d = len(other) - c_cnt
+    # Case-level 2x2 tables for every entity, from per-case sufficient statistics
+    case_stats = case_stats or holding_case_stats(holdings)
+    a_all, b_all, c_all, d_all = case_majority_tables(case_stats)
+    key_index = {key: k for k, key in enumerate(case_stats['keys'])}
 
-        or_val, ci_low, ci_high = calculate_or_and_ci(a, b, c_cnt, d)
-        ch_rate = a / len(ch_cases) if ch_cases else 0
+    n_cases = len(case_stats['cases'])
+    n_majority = int((case_stats['s_case'] > case_stats['n_case'] / 2).sum())
+    print(f"\n  N cases: {n_cases}")
+    print(f"  Cases with majority pro-DS: {n_majority} ({n_majority / n_cases:.1%})")
 
-        results[f'{chamber}_case'] = {'or': or_val, 'rate': ch_rate, 'n': len(ch_cases)}
-        print(f"    {chamber}: {a}/{len(ch_cases)} ({ch_rate:.1%}), OR={or_val:.2f} [{ci_low:.2f}, {ci_high:.2f}]")
+    results = {}
 
-    # Rapporteur effects at case level
-    print("\n  Rapporteur Effects (case level):")
-    for rap in ['N. Jääskinen', 'L.S. Rossi']:
-        rap_cases = [c for c in case_outcomes if c['rapporteur'] == rap]
-        other = [c for c in case_outcomes if c['rapporteur'] != rap]
+    for label, column, entities in [
+        ('Chamber', 'chamber', ['THIRD', 'GRAND_CHAMBER', 'FIRST']),
+        ('Rapporteur', 'judge_rapporteur', ['N. Jääskinen', 'L.S. Rossi']),
+    ]:
+        print(f"\n  {label} Effects (case level):")
+        for entity in entities:
+            k = key_index.get((column, entity))
+            if k is None:
+                continue
 
-        if len(rap_cases) < 3:
-            continue
+            a, b, c_cnt, d = (int(t[k]) for t in (a_all, b_all, c_all, d_all))
+            n_entity = a + b
 
-        a = sum(c['pro_ds'] for c in rap_cases)
-        b = len(rap_cases) - a
-        c_cnt = sum(c['pro_ds'] for c in other)
-        d = len(other) - c_cnt
+            if n_entity < 3:
+                continue
 
-        or_val, ci_low, ci_high = calculate_or_and_ci(a, b, c_cnt, d)
-        rap_rate = a / len(rap_cases) if rap_cases else 0
+            or_val, ci_low, ci_high = calculate_or_and_ci(a, b, c_cnt, d)
+            rate = a / n_entity
 
-        results[f'{rap}_case'] = {'or': or_val, 'rate': rap_rate, 'n': len(rap_cases)}
-        print(f"    {rap}: {a}/{len(rap_cases)} ({rap_rate:.1%}), OR={or_val:.2f} [{ci_low:.2f}, {ci_high:.2f}]")
+            results[f'{entity}_case'] = {'or': or_val, 'rate': rate, 'n': n_entity}
+            print(f"    {entity}: {a}/{n_entity} ({rate:.1%}), OR={or_val:.2f} [{ci_low:.2f}, {ci_high:.2f}]")
 
     return results
 
@@ -308,79 +290,45 @@ def sensitivity_temporal_split(holdings):
 # SENSITIVITY ANALYSIS 4: INVERSE HOLDING WEIGHTING
 # =============================================================================
 
-def sensitivity_inverse_weighting(holdings):
+def sensitivity_inverse_weighting(holdings, case_stats=None):
     """Re-analyze with inverse holding weighting (each case contributes equally)."""
     print("\n" + "=" * 80)
     print("SENSITIVITY 4: INVERSE HOLDING WEIGHTING")
     print("=" * 80)
     print("  (Each case contributes weight = 1/holdings_per_case)")
 
-    # Calculate weights
-    case_holding_counts = defaultdict(int)
-    for h in holdings:
-        case_holding_counts[h.get('case_id', '')] += 1
-
-    # Apply weights
-    weighted_holdings = []
-    for h in holdings:
-        case_id = h.get('case_id', '')
-        weight = 1 / case_holding_counts[case_id] if case_holding_counts[case_id] > 0 else 1
-        weighted_holdings.append({**h, 'weight': weight})
+    # Weighted rates for every entity, from per-case sufficient statistics
+    case_stats = case_stats or holding_case_stats(holdings)
+    entity_rates, other_rates, entity_weights = inverse_weighted_rates(case_stats)
+    key_index = {key: k for k, key in enumerate(case_stats['keys'])}
 
-    total_weight = sum(h['weight'] for h in weighted_holdings)
+    total_weight = len(case_stats['cases'])
     print(f"\n  Total effective N: {total_weight:.1f} (from {len(holdings)} holdings)")
 
     results = {}
 
-    # Weighted analysis
-    print("\n  Weighted Chamber Effects:")
-    for chamber in ['THIRD', 'GRAND_CHAMBER', 'FIRST']:
-        ch_holdings = [h for h in weighted_holdings if h.get('chamber') == chamber]
-        other = [h for h in weighted_holdings if h.get('chamber') != chamber]
-
-        if not ch_holdings:
-            continue
-
-        weighted_pro_ds = sum(h['weight'] * h['pro_ds'] for h in ch_holdings)
-        weighted_total = sum(h['weight'] for h in ch_holdings)
-        weighted_rate = weighted_pro_ds / weighted_total if weighted_total > 0 else 0
-
-        other_pro_ds = sum(h['weight'] * h['pro_ds'] for h in other)
-        other_total = sum(h['weight'] for h in other)
-        other_rate = other_pro_ds / other_total if other_total > 0 else 0
-
-        # Approximate OR from weighted rates
-        if weighted_rate > 0 and weighted_rate < 1 and other_rate > 0 and other_rate < 1:
-            or_val = (weighted_rate / (1 - weighted_rate)) / (other_rate / (1 - other_rate))
-        else:
-            or_val = float('inf')
-
-        results[f'{chamber}_weighted'] = {'weighted_rate': weighted_rate, 'or': or_val, 'effective_n': weighted_total}
-        print(f"    {chamber}: {weighted_rate:.1%} (effective n={weighted_total:.1f}), approx OR={or_val:.2f}")
-
-    print("\n  Weighted Rapporteur Effects:")
-    for rap in ['N. Jääskinen', 'L.S. Rossi']:
-        rap_holdings = [h for h in weighted_holdings if h.get('judge_rapporteur') == rap]
-        other = [h for h in weighted_holdings if h.get('judge_rapporteur') != rap]
-
-        if not rap_holdings:
-            continue
-
-        weighted_pro_ds = sum(h['weight'] * h['pro_ds'] for h in rap_holdings)
-        weighted_total = sum(h['weight'] for h in rap_holdings)
-        weighted_rate = weighted_pro_ds / weighted_total if weighted_total > 0 else 0
+    for label, column, entities in [
+        ('Chamber', 'chamber', ['THIRD', 'GRAND_CHAMBER', 'FIRST']),
+        ('Rapporteur', 'judge_rapporteur', ['N. Jääskinen', 'L.S. Rossi']),
+    ]:
+        print(f"\n  Weighted {label} Effects:")
+        for entity in entities:
+            k = key_index.get((column, entity))
+            if k is None:
+                continue
 
-        other_pro_ds = sum(h['weight'] * h['pro_ds'] for h in other)
-        other_total = sum(h['weight'] for h in other)
-        other_rate = other_pro_ds / other_total if other_total > 0 else 0
+            weighted_rate = float(entity_rates[k])
+            other_rate = float(other_rates[k])
+            weighted_total = float(entity_weights[k])
 
-        if weighted_rate > 0 and weighted_rate < 1 and other_rate > 0 and other_rate < 1:
-            or_val = (weighted_rate / (1 - weighted_rate)) / (other_rate / (1 - other_rate))
-        else:
-            or_val = float('inf')
+            # Approximate OR from weighted rates
+            if 0 < weighted_rate < 1 and 0 < other_rate < 1:
+                or_val = (weighted_rate / (1 - weighted_rate)) / (other_rate / (1 - other_rate))
+            else:
+                or_val = float('inf')
 
-        results[f'{rap}_weighted'] = {'weighted_rate': weighted_rate, 'or': or_val, 'effective_n': weighted_total}
-        print(f"    {rap}: {weighted_rate:.1%} (effective n={weighted_total:.1f}), approx OR={or_val:.2f}")
+            results[f'{entity}_weighted'] = {'weighted_rate': weighted_rate, 'or': or_val, 'effective_n': weighted_total}
+            print(f"    {entity}: {weighted_rate:.1%} (effective n={weighted_total:.1f}), approx OR={or_val:.2f}")
 
     return results
 
@@ -388,26 +336,30 @@ def sensitivity_inverse_weighting(holdings):
 # BOOTSTRAP CONFIDENCE INTERVALS
 # =============================================================================
 
-def bootstrap_analysis(holdings, n_bootstrap=500):
-    """Bootstrap confidence intervals for key effects."""
+def bootstrap_analysis(holdings, n_bootstrap=10000, executor=None):
+    """
+    Bootstrap confidence intervals for chamber and rapporteur effects.
+
+    All chambers and rapporteurs are bootstrapped from one shared multinomial
+    count matrix (see resampling.bootstrap_rate_differences); the key effects
+    are reported with percentile, BCa and studentized intervals.
+
+    Returns: {'effects': {name: key-effect result}, 'all_entities':
+    {'column=entity': bootstrap result}}
+    """
     print("\n" + "=" * 80)
     print(f"BOOTSTRAP ANALYSIS ({n_bootstrap} resamples)")
     print("=" * 80)
 
-    def calculate_effect(data, entity_col, entity_val):
-        """Calculate pro-DS rate difference."""
-        entity_holdings = [h for h in data if h.get(entity_col) == entity_val]
-        other = [h for h in data if h.get(entity_col) != entity_val]
-
-        if not entity_holdings or not other:
-            return None
-
-        entity_rate = sum(h['pro_ds'] for h in entity_holdings) / len(entity_holdings)
-        other_rate = sum(h['pro_ds'] for h in other) / len(other)
-
-        return entity_rate - other_rate
+    y = [h['pro_ds'] for h in holdings]
+    groupings = {
+        'chamber': [h.get('chamber') for h in holdings],
+        'judge_rapporteur': [h.get('judge_rapporteur') for h in holdings],
+    }
+    boot = bootstrap_rate_differences(y, groupings, n_boot=n_bootstrap, seed=42,
+                                      executor=executor)
 
-    # Bootstrap for key effects
+    # Key effects (reported in the summary)
     effects_to_test = [
         ('chamber', 'THIRD', 'Third Chamber'),
         ('chamber', 'GRAND_CHAMBER', 'Grand Chamber'),
@@ -415,202 +367,204 @@ def bootstrap_analysis(holdings, n_bootstrap=500):
         ('judge_rapporteur', 'L.S. Rossi', 'L.S. Rossi'),
     ]
 
-    results = {}
+    effects = {}
 
     for col, val, name in effects_to_test:
-        # Observed effect
-        observed = calculate_effect(holdings, col, val)
-        if observed is None:
-            continue
-
-        # Bootstrap
-        boot_effects = []
-        for _ in range(n_bootstrap):
-            # Resample with replacement
-            boot_sample = random.choices(holdings, k=len(holdings))
-            boot_effect = calculate_effect(boot_sample, col, val)
-            if boot_effect is not None:
-                boot_effects.append(boot_effect)
-
-        if len(boot_effects) < n_bootstrap * 0.9:
+        if (col, val) not in boot:
             continue
 
-        # Calculate CI (percentile method)
-        boot_effects.sort()
-        ci_low = boot_effects[int(0.025 * len(boot_effects))]
-        ci_high = boot_effects[int(0.975 * len(boot_effects))]
+        b = boot[(col, val)]
+        ci_low, ci_high = b['ci_percentile']
 
-        # Standard error
-        se = (sum((x - observed)**2 for x in boot_effects) / len(boot_effects)) ** 0.5
-
-        results[name] = {
-            'observed': observed,
+        effects[name] = {
+            'observed': b['observed'],
             'ci_low': ci_low,
             'ci_high': ci_high,
-            'se': se,
+            'ci_bca': b['ci_bca'],
+            'ci_studentized': b['ci_studentized'],
+            'se': b['se'],
             'significant': ci_low > 0 or ci_high < 0  # CI excludes zero
         }
 
         sig = "***" if ci_low > 0 or ci_high < 0 else ""
         print(f"\n  {name}:")
-        print(f"    Observed effect: {observed:+.1%}")
-        print(f"    95% Bootstrap CI: [{ci_low:+.1%}, {ci_high:+.1%}] {sig}")
-        print(f"    Bootstrap SE: {se:.3f}")
+        print(f"    Observed effect: {b['observed']:+.1%}")
+        print(f"    95% Bootstrap CI (percentile): [{ci_low:+.1%}, {ci_high:+.1%}] {sig}")
+        print(f"    95% Bootstrap CI (BCa): [{b['ci_bca'][0]:+.1%}, {b['ci_bca'][1]:+.1%}]")
+        print(f"    95% Bootstrap CI (studentized): [{b['ci_studentized'][0]:+.1%}, {b['ci_studentized'][1]:+.1%}]")
+        print(f"    Bootstrap SE: {b['se']:.3f}")
+
+    # All chambers and rapporteurs
+    print(f"\n  All entities with n >= 5 (BCa 95% CI):")
+    print(f"  {'Entity':<30} {'n':>4} {'Effect':>9} {'CI':>20}")
+    print("  " + "-" * 66)
+
+    all_entities = {}
+    for (col, val), b in sorted(boot.items(), key=lambda item: item[1]['observed']):
+        all_entities[f'{col}={val}'] = b
+        if b['n_entity'] < 5:
+            continue
 
-    return results
+        low, high = b['ci_bca']
+        sig = "*" if low > 0 or high < 0 else ""
+        print(f"  {val:<30} {b['n_entity']:>4} {b['observed']:>+8.1%} [{low:+.1%}, {high:+.1%}] {sig}")
+
+    return {'effects': effects, 'all_entities': all_entities}
 
 # =============================================================================
 # SPECIFICATION CURVE
 # =============================================================================
 
-def specification_curve(holdings):
-    """Run multiple specifications and report consistency."""
+def multiverse_axes(holdings):
+    """
+    Declarative multiverse grid: outcome codings, sample restrictions and
+    weighting schemes, encoded once as arrays over the holdings.
+    """
+    n = len(holdings)
+    direction = np.array([h.get('ruling_direction', '') for h in holdings], dtype=object)
+    year = np.array([h['year'] for h in holdings])
+    pro_ds = np.array([h['pro_ds'] for h in holdings], dtype=float)
+    clear = np.isin(direction, ['PRO_DATA_SUBJECT', 'PRO_CONTROLLER'])
+
+    def flag(col):
+        return np.array([str(h.get(col, '0')) == '1' for h in holdings])
+
+    outcomes = {
+        'binary': pro_ds,                                   # Pro-DS vs. everything else
+        'graded': np.where(clear, pro_ds, 0.5),             # Mixed/neutral count as half
+        'clear_only': np.where(clear, pro_ds, np.nan),      # Pro-DS vs. pro-controller
+    }
+    samples = {
+        'period': {'all': np.ones(n, dtype=bool), '2019-2022': year <= 2022, '2023+': year >= 2023},
+        'quality': {'all': np.ones(n, dtype=bool), 'no_dq_issues': ~flag('dq_any_issue')},
+        'topic': {'all': np.ones(n, dtype=bool),
+                  'excl_compensation': ~flag('is_compensation'),
+                  'excl_enforcement': ~(flag('is_compensation') | flag('is_enforcement_non_comp'))},
+    }
+    # Exponent of the case's in-sample holding count: 1 = inverse holding weight
+    weights = {'unweighted': 0.0, 'inverse_sqrt': 0.5, 'inverse': 1.0}
+    return outcomes, samples, weights
+
+def specification_curve(holdings, executor=None):
+    """
+    Multiverse specification curve for chamber, rapporteur and teleology effects.
+
+    Every effect is estimated under the Cartesian product of outcome codings,
+    sample restrictions, weightings, covariate sets and estimators
+    (multiverse.run_multiverse); the full curve is returned as a table.
+    """
     print("\n" + "=" * 80)
     print("SPECIFICATION CURVE ANALYSIS")
     print("=" * 80)
     print("  Testing effect consistency across analytical choices")
 
-    specifications = []
-
-    # Define specification dimensions
-    # 1. Outcome coding
-    outcome_specs = [
-        ('pro_ds', 'Binary (Pro-DS vs Other)'),
-    ]
-
-    # 2. Sample restriction
-    sample_specs = [
-        (lambda h: True, 'All holdings'),
-        (lambda h: h.get('ruling_direction') in ['PRO_DATA_SUBJECT', 'PRO_CONTROLLER'], 'Clear only'),
-        (lambda h: h['year'] >= 2023, '2023+ only'),
-    ]
-
-    # 3. Weighting
-    weight_specs = [
-        ('unweighted', 'Unweighted'),
-        ('inverse', 'Inverse holding weight'),
+    outcomes, samples, weights = multiverse_axes(holdings)
+    case_ids = [h.get('case_id', '') for h in holdings]
+    column = {col: np.array([h.get(col, '') for h in holdings], dtype=object)
+              for col in ('chamber', 'judge_rapporteur', 'concept_cluster', 'dominant_source')}
+    year = np.array([h['year'] for h in holdings])
+
+    def covariate_sets(other):
+        return {'none': [], 'year': [year], 'concept': [column['concept_cluster']],
+                'year+concept': [year, column['concept_cluster']], other: [column[other]]}
+
+    families = [
+        ({'Third Chamber': column['chamber'] == 'THIRD',
+          'Grand Chamber': column['chamber'] == 'GRAND_CHAMBER'},
+         covariate_sets('judge_rapporteur')),
+        ({'N. Jääskinen': column['judge_rapporteur'] == 'N. Jääskinen',
+          'L.S. Rossi': column['judge_rapporteur'] == 'L.S. Rossi'},
+         covariate_sets('chamber')),
+        ({'Teleological reasoning': column['dominant_source'] == 'TELEOLOGICAL'},
+         covariate_sets('chamber')),
     ]
 
-    # Calculate effects for each specification
-    print("\n  Running specifications for THIRD CHAMBER effect...")
-
-    third_effects = []
-
-    for outcome_col, outcome_name in outcome_specs:
-        for sample_filter, sample_name in sample_specs:
-            for weight_type, weight_name in weight_specs:
-                # Apply sample filter
-                filtered = [h for h in holdings if sample_filter(h)]
-
-                if len(filtered) < 50:
-                    continue
-
-                # Calculate weights
-                if weight_type == 'inverse':
-                    case_counts = defaultdict(int)
-                    for h in filtered:
-                        case_counts[h.get('case_id', '')] += 1
-
-                    for h in filtered:
-                        h['_weight'] = 1 / case_counts[h.get('case_id', '')]
-                else:
-                    for h in filtered:
-                        h['_weight'] = 1
-
-                # Calculate effect
-                third = [h for h in filtered if h.get('chamber') == 'THIRD']
-                other = [h for h in filtered if h.get('chamber') != 'THIRD']
-
-                if len(third) < 5 or len(other) < 5:
-                    continue
-
-                if weight_type == 'inverse':
-                    third_rate = sum(h['_weight'] * h['pro_ds'] for h in third) / sum(h['_weight'] for h in third)
-                    other_rate = sum(h['_weight'] * h['pro_ds'] for h in other) / sum(h['_weight'] for h in other)
-                else:
-                    third_rate = sum(h['pro_ds'] for h in third) / len(third)
-                    other_rate = sum(h['pro_ds'] for h in other) / len(other)
-
-                effect = third_rate - other_rate
-
-                spec_name = f"{sample_name} | {weight_name}"
-                third_effects.append({
-                    'spec': spec_name,
-                    'effect': effect,
-                    'n': len(filtered)
-                })
-
-    # Sort by effect size
-    third_effects.sort(key=lambda x: x['effect'])
-
-    print(f"\n  {'Specification':<40} {'Effect':>10} {'N':>6}")
-    print("  " + "-" * 60)
-
-    for spec in third_effects:
-        print(f"  {spec['spec']:<40} {spec['effect']:>+9.1%} {spec['n']:>6}")
-
-    # Summary
-    if third_effects:
-        effects = [s['effect'] for s in third_effects]
-        print("\n  SUMMARY:")
-        print(f"    Range of effects: [{min(effects):+.1%}, {max(effects):+.1%}]")
-        print(f"    Median effect: {sorted(effects)[len(effects)//2]:+.1%}")
-        print(f"    All negative: {all(e < 0 for e in effects)}")
-
-        if all(e < -0.15 for e in effects):
-            print("    → ROBUST: Third Chamber effect is consistently negative across specifications")
-        elif all(e < 0 for e in effects):
-            print("    → CONSISTENT: Effect is negative in all specifications (varying magnitude)")
-        else:
-            print("    → SENSITIVE: Effect sign varies across specifications")
+    tables = [run_multiverse(exposures, case_ids, outcomes, samples, weights, covariates,
+                             executor=executor)
+              for exposures, covariates in families]
+    table = pd.concat(tables, ignore_index=True)
+    summary = specification_summary(table)
+
+    n_specs = table.groupby('effect').size()
+    print(f"\n  {len(table)} estimates: {n_specs.iloc[0]} specifications per effect")
+    print("  (rate_difference: pro-DS rate vs. rest; mh_log_odds / logit: log odds ratio)")
+    print("  (Sig<0 / Sig>0: share of the Tested (unweighted) specifications; the SEs")
+    print("   treat case weights as frequency counts)")
+
+    print(f"\n  {'Effect':<24} {'Estimator':<16} {'Valid':>6} {'Median':>8} {'Range':>18} "
+          f"{'<0':>6} {'Tested':>7} {'Sig<0':>6} {'Sig>0':>6}")
+    print("  " + "-" * 104)
+    for row in summary.itertuples():
+        median, low, high = (f"{v:+.1%}" if row.estimator == 'rate_difference' else f"{v:+.2f}"
+                             for v in (row.median, row.min, row.max))
+        print(f"  {row.effect:<24} {row.estimator:<16} {row.n_valid:>6} {median:>8} "
+              f"{'[' + low + ', ' + high + ']':>18} {row.share_negative:>6.0%} "
+              f"{row.n_tested:>7} {row.share_sig_negative:>6.0%} {row.share_sig_positive:>6.0%}")
+    print("  " + "-" * 104)
+
+    # Which choices move the Third Chamber effect most
+    axes = ['outcome', *samples, 'weights', 'covariates']
+    medians = option_medians(table, 'Third Chamber', 'rate_difference', axes)
+    print("\n  Third Chamber rate difference: median by option")
+    for axis in axes:
+        options = ", ".join(f"{option} {value:+.1%}" if value == value else f"{option} n/a"
+                            for option, value in medians[axis].items())
+        print(f"    {axis:<11} {options}")
+
+    third = summary[(summary['effect'] == 'Third Chamber') &
+                    (summary['estimator'] == 'rate_difference')].iloc[0]
+    print("\n  SUMMARY:")
+    print(f"    Third Chamber: {third['share_negative']:.0%} of {third['n_valid']} estimable "
+          f"specifications negative; {third['share_sig_negative']:.0%} of {third['n_tested']} "
+          f"unweighted ones significantly")
+    if third['max'] < -0.15:
+        print("    → ROBUST: Third Chamber effect is consistently negative across specifications")
+    elif third['max'] < 0:
+        print("    → CONSISTENT: Effect is negative in all specifications (varying magnitude)")
+    else:
+        print("    → SENSITIVE: Effect sign varies across specifications")
 
-    return third_effects
+    return {
+        'n_specifications': int(n_specs.iloc[0]),
+        'axes': {'outcome': list(outcomes), **{axis: list(options) for axis, options in samples.items()},
+                 'weights': weights, 'estimator': list(ESTIMATORS)},
+        'summary': summary.to_dict(orient='records'),
+        'third_chamber_option_medians': medians,
+        'table': table,
+    }
 
 # =============================================================================
 # LEAVE-ONE-OUT ANALYSIS
 # =============================================================================
 
-def leave_one_out_analysis(holdings):
-    """Check if any single case drives the results."""
+def leave_one_out_analysis(holdings, case_stats=None):
+    """
+    Check if any single case drives the results.
+
+    Every leave-one-case-out effect of every chamber and rapporteur is derived
+    by subtracting that case's sufficient statistics from the totals.
+    """
     print("\n" + "=" * 80)
     print("LEAVE-ONE-OUT ANALYSIS")
     print("=" * 80)
-    print("  Testing if any single case drives chamber effects")
-
-    # Get unique cases
-    cases = list(set(h.get('case_id') for h in holdings))
+    print("  Testing if any single case drives chamber and rapporteur effects")
 
-    # Full effect
-    third = [h for h in holdings if h.get('chamber') == 'THIRD']
-    other = [h for h in holdings if h.get('chamber') != 'THIRD']
+    case_stats = case_stats or holding_case_stats(holdings)
+    full_effects, loo_all = leave_one_case_out(case_stats, min_n=5)
+    cases = case_stats['cases']
+    key_index = {key: k for k, key in enumerate(case_stats['keys'])}
 
-    full_third_rate = sum(h['pro_ds'] for h in third) / len(third)
-    full_other_rate = sum(h['pro_ds'] for h in other) / len(other)
-    full_effect = full_third_rate - full_other_rate
+    # Third Chamber in detail
+    k = key_index[('chamber', 'THIRD')]
+    full_effect = float(full_effects[k])
 
     print(f"\n  Full sample effect (Third - Other): {full_effect:+.1%}")
 
-    # Leave one out
-    loo_effects = []
-    for case_id in cases:
-        remaining = [h for h in holdings if h.get('case_id') != case_id]
-
-        third_rem = [h for h in remaining if h.get('chamber') == 'THIRD']
-        other_rem = [h for h in remaining if h.get('chamber') != 'THIRD']
-
-        if len(third_rem) < 5 or len(other_rem) < 5:
-            continue
-
-        third_rate = sum(h['pro_ds'] for h in third_rem) / len(third_rem)
-        other_rate = sum(h['pro_ds'] for h in other_rem) / len(other_rem)
-        effect = third_rate - other_rate
-
-        change = effect - full_effect
-        loo_effects.append({
-            'case_id': case_id,
-            'effect': effect,
-            'change': change
-        })
+    loo_effects = [
+        {'case_id': case_id, 'effect': float(effect), 'change': float(effect - full_effect)}
+        for case_id, effect in zip(cases, loo_all[:, k])
+        if np.isfinite(effect)
+    ]
 
     # Find most influential cases
     loo_effects.sort(key=lambda x: abs(x['change']), reverse=True)
@@ -638,7 +592,34 @@ def leave_one_out_analysis(holdings):
             influential = [loo['case_id'] for loo in loo_effects if abs(loo['change']) > 0.10]
             print(f"  → POTENTIALLY INFLUENTIAL CASES: {', '.join(influential)}")
 
-    return loo_effects
+    # Every chamber and rapporteur
+    print(f"\n  All entities (max single-case influence):")
+    print(f"  {'Entity':<30} {'Effect':>9} {'Range w/o one case':>22} {'Max |change|':>13}  Most influential")
+    print("  " + "-" * 100)
+
+    by_entity = {}
+    for (column, entity), k in key_index.items():
+        valid = np.isfinite(loo_all[:, k])
+        if not valid.any():
+            continue
+
+        changes = loo_all[valid, k] - full_effects[k]
+        top = int(np.argmax(np.abs(changes)))
+        top_case = [c for c, v in zip(cases, valid) if v][top]
+
+        by_entity[f'{column}={entity}'] = {
+            'effect': float(full_effects[k]),
+            'loo_min': float(loo_all[valid, k].min()),
+            'loo_max': float(loo_all[valid, k].max()),
+            'max_abs_change': float(abs(changes[top])),
+            'most_influential_case': top_case,
+        }
+
+        e = by_entity[f'{column}={entity}']
+        print(f"  {entity:<30} {e['effect']:>+8.1%} [{e['loo_min']:+7.1%}, {e['loo_max']:+7.1%}] "
+              f"{e['max_abs_change']:>12.1%}   {top_case}")
+
+    return {'third_chamber': loo_effects, 'by_entity': by_entity}
 
 # =============================================================================
 # SUMMARY
@@ -681,24 +662,31 @@ def print_robustness_summary(sens1, sens2, sens3, sens4, bootstrap, spec_curve,
             else:
                 print("   → VARIABLE: Effect direction varies across specifications")
 
+    third_spec = [row for row in spec_curve['summary']
+                  if row['effect'] == 'Third Chamber' and row['estimator'] == 'rate_difference']
+    if third_spec:
+        row = third_spec[0]
+        print(f"\n   Specification curve: negative in {row['share_negative']:.0%} of "
+              f"{row['n_valid']} specifications (median {row['median']:+.1%})")
+
     # Bootstrap significance
-    if 'Third Chamber' in bootstrap:
-        boot = bootstrap['Third Chamber']
+    if 'Third Chamber' in bootstrap['effects']:
+        boot = bootstrap['effects']['Third Chamber']
         if boot['ci_high'] < 0:
             print(f"\n   Bootstrap 95% CI excludes zero: [{boot['ci_low']:+.1%}, {boot['ci_high']:+.1%}]")
             print("   → STATISTICALLY SIGNIFICANT")
 
     print("\n2. N. JÄÄSKINEN EFFECT:")
-    if 'N. Jääskinen' in bootstrap:
-        boot = bootstrap['N. Jääskinen']
+    if 'N. Jääskinen' in bootstrap['effects']:
+        boot = bootstrap['effects']['N. Jääskinen']
         print(f"   Observed: {boot['observed']:+.1%}")
         print(f"   Bootstrap CI: [{boot['ci_low']:+.1%}, {boot['ci_high']:+.1%}]")
         if boot['ci_high'] < 0:
             print("   → SIGNIFICANT negative effect")
 
     print("\n3. L.S. ROSSI EFFECT:")
-    if 'L.S. Rossi' in bootstrap:
-        boot = bootstrap['L.S. Rossi']
+    if 'L.S. Rossi' in bootstrap['effects']:
+        boot = bootstrap['effects']['L.S. Rossi']
         print(f"   Observed: {boot['observed']:+.1%}")
         print(f"   Bootstrap CI: [{boot['ci_low']:+.1%}, {boot['ci_high']:+.1%}]")
         if boot['ci_low'] > 0:
@@ -722,14 +710,20 @@ def save_results(sens1, sens2, sens3, sens4, bootstrap, spec_curve, loo):
         'sensitivity_temporal_split': sens3,
         'sensitivity_inverse_weighting': sens4,
         'bootstrap_analysis': bootstrap,
-        'specification_curve': spec_curve,
-        'leave_one_out': loo[:10]  # Just top 10
+        'specification_curve': {k: v for k, v in spec_curve.items() if k != 'table'},
+        'leave_one_out': {
+            'third_chamber': loo['third_chamber'][:10],  # Just top 10
+            'by_entity': loo['by_entity']
+        }
     }
 
     with open(OUTPUT_PATH / "robustness_judicial_analysis.json", 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, default=str)
 
+    spec_curve['table'].to_csv(OUTPUT_PATH / "specification_curve_judicial.csv", index=False)
+
     print(f"\nResults saved to: {OUTPUT_PATH / 'robustness_judicial_analysis.json'}")
+    print(f"Specification curve saved to: {OUTPUT_PATH / 'specification_curve_judicial.csv'}")
 
 # =============================================================================
 # MAIN
@@ -746,18 +740,19 @@ def main():
 
     # Sensitivity analyses
     sens1 = sensitivity_exclude_neutral(holdings)
-    sens2 = sensitivity_case_level(holdings)
+    case_stats = holding_case_stats(holdings)
+    sens2 = sensitivity_case_level(holdings, case_stats)
     sens3 = sensitivity_temporal_split(holdings)
-    sens4 = sensitivity_inverse_weighting(holdings)
-
-    # Bootstrap
-    bootstrap = bootstrap_analysis(holdings, n_bootstrap=500)
+    sens4 = sensitivity_inverse_weighting(holdings, case_stats)
 
-    # Specification curve
-    spec_curve = specification_curve(holdings)
+    # Bootstrap (replicates split across all cores, seeded per replicate) and
+    # specification curve (specifications split across cores)
+    with ResamplingExecutor() as executor:
+        bootstrap = bootstrap_analysis(holdings, n_bootstrap=10000, executor=executor)
+        spec_curve = specification_curve(holdings, executor=executor)
 
     # Leave-one-out
-    loo = leave_one_out_analysis(holdings)
+    loo = leave_one_out_analysis(holdings, case_stats)
 
     # Summary
     print_robustness_summary(sens1, sens2, sens3, sens4, bootstrap, spec_curve, loo)
@@ -22,6 +22,9 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+from citation_graph import load_graph, GRAPH_FILENAME
+from resampling import ResamplingExecutor, correlation_statistic, permutation_test
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
@@ -30,7 +33,7 @@ NETWORK_PATH = OUTPUT_PATH / "citation_network"
 def load_data():
     """Load all required data."""
     holdings = pd.read_csv(OUTPUT_PATH / "holdings_prepared.csv")
-    citation_vars = pd.read_csv(NETWORK_PATH / "holding_citation_vars.csv")
+    citation_vars = load_graph(NETWORK_PATH / GRAPH_FILENAME).holding_table()
 
     df = holdings.merge(citation_vars, on=['case_id', 'holding_id'], how='left')
     df['judgment_date'] = pd.to_datetime(df['judgment_date'])
@@ -240,7 +243,7 @@ def check_concept_heterogeneity(df):
 
     return results
 
-def run_placebo_tests(df):
+def run_placebo_tests(df, executor=None):
     """
     Test 6: Placebo tests - shuffled citations.
     """
@@ -255,29 +258,27 @@ def run_placebo_tests(df):
     r_observed, p_observed = stats.pearsonr(df_base['precedent_direction_score'], df_base['pro_ds'])
     print(f"\nObserved correlation: r={r_observed:.3f}, p={p_observed:.4f}")
 
-    # Placebo: shuffle precedent direction scores
-    np.random.seed(42)
-    n_permutations = 1000
-    placebo_rs = []
-
-    for _ in range(n_permutations):
-        shuffled = df_base['precedent_direction_score'].sample(frac=1).reset_index(drop=True)
-        r_placebo, _ = stats.pearsonr(shuffled, df_base['pro_ds'].reset_index(drop=True))
-        placebo_rs.append(r_placebo)
-
-    placebo_rs = np.array(placebo_rs)
-    placebo_p = (np.abs(placebo_rs) >= np.abs(r_observed)).mean()
+    # Placebo: shuffle precedent direction scores (block-vectorized; Besag-
+    # Clifford stopping ends the run early only once p is clearly above
+    # alpha, so a small p-value gets all 100,000 permutations)
+    n_permutations = 100000
+    _, stat_fn = correlation_statistic(df_base['precedent_direction_score'], df_base['pro_ds'])
+    perm = permutation_test(stat_fn, r_observed, len(df_base), n_perm=n_permutations,
+                            seed=42, executor=executor)
 
-    print(f"\nPermutation test ({n_permutations} permutations):")
+    print(f"\nPermutation test ({perm['n_permutations']} of {n_permutations} permutations, stop: {perm['stop_reason']}):")
     print(f"  Observed r: {r_observed:.3f}")
-    print(f"  Placebo mean r: {placebo_rs.mean():.3f}")
-    print(f"  Placebo SD: {placebo_rs.std():.3f}")
-    print(f"  Permutation p-value: {placebo_p:.4f}")
+    print(f"  Placebo mean r: {perm['null_mean']:.3f}")
+    print(f"  Placebo SD: {perm['null_sd']:.3f}")
+    print(f"  Permutation p-value: {perm['p_value']:.5f} (95% MC CI: [{perm['p_ci'][0]:.5f}, {perm['p_ci'][1]:.5f}])")
 
     results['observed_r'] = float(r_observed)
-    results['placebo_mean_r'] = float(placebo_rs.mean())
-    results['placebo_sd'] = float(placebo_rs.std())
-    results['permutation_p'] = float(placebo_p)
+    results['placebo_mean_r'] = perm['null_mean']
+    results['placebo_sd'] = perm['null_sd']
+    results['permutation_p'] = perm['p_value']
+    results['permutation_p_ci'] = perm['p_ci']
+    results['n_permutations'] = perm['n_permutations']
+    results['stop_reason'] = perm['stop_reason']
 
     # Placebo 2: Test with lagged outcome (shouldn't predict)
     # This is a conceptual check - outcomes shouldn't predict precedents
@@ -405,7 +406,8 @@ def main():
     concept_results = check_concept_heterogeneity(df)
 
     print("\n[7/8] Placebo tests...")
-    placebo_results = run_placebo_tests(df)
+    with ResamplingExecutor() as executor:
+        placebo_results = run_placebo_tests(df, executor=executor)
 
     print("\n[8/8] Multivariate robustness...")
     mv_results = multivariate_robustness(df)
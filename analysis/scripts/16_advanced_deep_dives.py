@@ -25,6 +25,10 @@ from collections import defaultdict
 import warnings
 warnings.filterwarnings('ignore')
 
+from citation_graph import load_graph, GRAPH_FILENAME
+from reachability import ReachabilityIndex
+from case_similarity import pair_similarity
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output"
@@ -33,14 +37,15 @@ NETWORK_PATH = OUTPUT_PATH / "citation_network"
 def load_all_data():
     """Load all required datasets."""
     holdings = pd.read_csv(OUTPUT_PATH / "holdings_prepared.csv")
-    citation_vars = pd.read_csv(NETWORK_PATH / "holding_citation_vars.csv")
-    case_attrs = pd.read_csv(NETWORK_PATH / "case_attributes.csv")
-    edges = pd.read_csv(NETWORK_PATH / "citation_edges.csv")
+    graph = load_graph(NETWORK_PATH / GRAPH_FILENAME)
+    citation_vars = graph.holding_table()
+    case_attrs = graph.case_table()
+    edges = graph.edge_table()
 
     df = holdings.merge(citation_vars, on=['case_id', 'holding_id'], how='left')
     df['judgment_date'] = pd.to_datetime(df['judgment_date'])
 
-    return df, case_attrs, edges
+    return df, case_attrs, edges, graph
 
 # =============================================================================
 # DEEP DIVE 1: THIRD CHAMBER ANOMALY
@@ -339,7 +344,7 @@ def formal_mediation_analysis(df):
 # DEEP DIVE 3: C-300/21 INFLUENCE CASCADE
 # =============================================================================
 
-def analyze_c300_21_cascade(df, case_attrs, edges):
+def analyze_c300_21_cascade(df, case_attrs, graph):
     """
     C-300/21 is the most-cited compensation case (11 citations) with only 33% pro-DS.
     Trace its specific influence on subsequent compensation jurisprudence.
@@ -349,12 +354,11 @@ def analyze_c300_21_cascade(df, case_attrs, edges):
     print("=" * 80)
 
     results = {}
-    case_lookup = case_attrs.set_index('case_id').to_dict('index')
-    corpus = set(case_attrs['case_id'])
+    case_lookup = graph.case_records()
+    internal = graph.internal()
 
     # Find all cases citing C-300/21
-    c300_citers = edges[edges['cited_case'] == 'C-300/21']['citing_case'].unique()
-    c300_citers = [c for c in c300_citers if c in corpus]
+    c300_citers = internal.predecessors('C-300/21') if 'C-300/21' in internal else []
 
     print(f"\nCases citing C-300/21: {len(c300_citers)}")
 
@@ -423,8 +427,7 @@ def analyze_c300_21_cascade(df, case_attrs, edges):
 
     second_order_citers = set()
     for citer in c300_citers:
-        indirect_citers = edges[edges['cited_case'] == citer]['citing_case'].unique()
-        second_order_citers.update([c for c in indirect_citers if c in corpus])
+        second_order_citers.update(internal.predecessors(citer))
 
     second_order_citers = second_order_citers - set(c300_citers) - {'C-300/21'}
     print(f"  Cases indirectly influenced by C-300/21: {len(second_order_citers)}")
@@ -439,6 +442,25 @@ def analyze_c300_21_cascade(df, case_attrs, edges):
         'cases': list(second_order_citers)
     }
 
+    # Full cascade: every case citing C-300/21 through any number of hops
+    print("\n[Full Cascade]:")
+    print("-" * 60)
+
+    cascade = ReachabilityIndex(internal).descendants('C-300/21') if 'C-300/21' in internal else []
+    deeper = set(cascade) - set(c300_citers) - second_order_citers
+    print(f"  Cases in full cascade: {len(cascade)} "
+          f"({len(c300_citers)} direct, {len(second_order_citers)} second-order, {len(deeper)} deeper)")
+    if cascade:
+        cascade_pro_ds = [case_lookup.get(c, {}).get('pro_ds_rate', 0.5) for c in cascade]
+        print(f"  Average pro-DS rate: {np.mean(cascade_pro_ds):.1%}")
+
+    results['full_cascade'] = {
+        'n_cases': len(cascade),
+        'n_beyond_second_order': len(deeper),
+        'avg_pro_ds': float(np.mean(cascade_pro_ds)) if cascade else None,
+        'cases': cascade
+    }
+
     return results
 
 # =============================================================================
@@ -606,7 +628,7 @@ def analyze_temporal_breaks(df):
 # DEEP DIVE 6: COUNTER-CITATION ANALYSIS
 # =============================================================================
 
-def analyze_counter_citations(df, edges, case_attrs):
+def analyze_counter_citations(df, edges, case_attrs, graph):
     """
     Analyze cases that cite precedents but rule in the opposite direction.
     What predicts divergence from cited precedent?
@@ -658,9 +680,34 @@ def analyze_counter_citations(df, edges, case_attrs):
         n = (df_cite['pro_ds_purpose'] == p).sum()
         print(f"    Purpose={p}: {rate:.1%} counter-citation rate (n={n})")
 
+    # Shared authorities with the cited precedents (bibliographic coupling)
+    internal = edges[edges['cited_case'].isin(case_attrs['case_id'])]
+    coupling = pair_similarity(graph, internal['citing_case'].map(graph.index),
+                               internal['cited_case'].map(graph.index), kind='coupling')
+    coupling = (internal.assign(precedent_coupling=coupling)
+                .groupby(['citing_case', 'citing_holding_id'])['precedent_coupling'].mean())
+    df_cite['precedent_coupling'] = coupling.reindex(
+        pd.MultiIndex.from_arrays([df_cite['case_id'], df_cite['holding_id']])).to_numpy()
+
+    counter = df_cite.loc[df_cite['counter_citation'] == 1, 'precedent_coupling'].dropna()
+    following = df_cite.loc[df_cite['counter_citation'] == 0, 'precedent_coupling'].dropna()
+    print("\n  By shared authorities with cited precedents (coupling cosine):")
+    print(f"    Counter-citations: mean {counter.mean():.3f} (n={len(counter)})")
+    print(f"    Following citations: mean {following.mean():.3f} (n={len(following)})")
+    if len(counter) and len(following):
+        _, p_coupling = stats.mannwhitneyu(counter, following, alternative='two-sided')
+        print(f"    Mann-Whitney p = {p_coupling:.4f}")
+    else:
+        p_coupling = np.nan
+
     results['counter_citation_rate'] = float(pct_counter)
     results['chamber_rates'] = chamber_counter.to_dict()
     results['concept_rates'] = concept_counter.to_dict()
+    results['precedent_coupling'] = {
+        'counter_mean': float(counter.mean()) if len(counter) else None,
+        'following_mean': float(following.mean()) if len(following) else None,
+        'mann_whitney_p': float(p_coupling),
+    }
 
     # Detailed look at counter-citations
     print("\n[Counter-Citation Examples]:")
@@ -687,7 +734,7 @@ def main():
 
     # Load data
     print("\n[Loading data...]")
-    df, case_attrs, edges = load_all_data()
+    df, case_attrs, edges, graph = load_all_data()
     print(f"  Loaded {len(df)} holdings, {len(case_attrs)} cases, {len(edges)} edges")
 
     all_results = {}
@@ -699,7 +746,7 @@ def main():
     all_results['mediation'] = formal_mediation_analysis(df)
 
     # Deep dive 3
-    all_results['c300_cascade'] = analyze_c300_21_cascade(df, case_attrs, edges)
+    all_results['c300_cascade'] = analyze_c300_21_cascade(df, case_attrs, graph)
 
     # Deep dive 4
     all_results['rapporteur'] = analyze_rapporteur_effects(df, case_attrs)
@@ -708,7 +755,7 @@ def main():
     all_results['temporal'] = analyze_temporal_breaks(df)
 
     # Deep dive 6
-    all_results['counter_citations'] = analyze_counter_citations(df, edges, case_attrs)
+    all_results['counter_citations'] = analyze_counter_citations(df, edges, case_attrs, graph)
 
     # Summary
     print("\n" + "=" * 80)
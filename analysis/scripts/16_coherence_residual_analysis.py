@@ -30,11 +30,19 @@ import statsmodels.api as sm
 import statsmodels.formula.api as smf
 from collections import Counter
 
+from model_specs import get_spec
+from resampling import ResamplingExecutor
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "analysis" / "output" / "holdings_prepared.csv"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output" / "coherence"
 
+# Parsimonious specification shared by every fit in this script (compiled
+# once per dataset through model_specs.get_spec)
+PARSIMONIOUS_FORMULA = ("pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + "
+                        "pro_ds_purpose + level_shifting + any_balancing")
+
 # =============================================================================
 # SECTION 1: DATA LOADING AND MODEL FITTING
 # =============================================================================
@@ -57,10 +65,7 @@ def fit_parsimonious_model(df):
     This has ~6 parameters for 181 observations (EPV ~12 for minority class),
     which avoids the overfitting problems of the full 22-parameter model.
     """
-    formula = ("pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + "
-               "pro_ds_purpose + level_shifting + any_balancing")
-
-    model = smf.logit(formula, data=df).fit(disp=0)
+    model = get_spec(PARSIMONIOUS_FORMULA, df).logit()
 
     print("\n" + "=" * 70)
     print("PARSIMONIOUS MODEL FIT")
@@ -109,37 +114,65 @@ def fit_full_model(df):
 # SECTION 2: LEAVE-ONE-OUT CROSS-VALIDATION
 # =============================================================================
 
-def loocv_predictions(df):
+def _require_all_rows(spec, df):
+    """
+    Per-holding arrays from spec are indexed against df, so every holding
+    must be in the model frame (patsy drops rows with missing covariates).
+    """
+    if spec.nobs != len(df):
+        raise ValueError(f"Parsimonious model dropped {len(df) - spec.nobs} of {len(df)} "
+                         "holdings with missing covariates; per-holding results would "
+                         "not align with the data")
+
+
+def _loocv_block(rep_ids, rngs, spec):
+    """
+    Executor block: leave-one-out predictions for the held-out rows rep_ids.
+
+    Refits slice the precompiled design matrix of spec. Returns
+    (probabilities, converged) for each held-out holding; the generators are
+    unused (jackknife replicates are deterministic).
+    """
+    probs = np.zeros(len(rep_ids))
+    converged = np.zeros(len(rep_ids), dtype=bool)
+
+    for r, i in enumerate(rep_ids):
+        train = np.delete(np.arange(spec.nobs), i)
+
+        try:
+            if not spec.estimable(train):
+                raise ValueError("held-out holding is the only one at its factor level")
+            model = spec.logit(rows=train, maxiter=100)
+            probs[r] = spec.predict(model.params, rows=[i])[0]
+            converged[r] = model.mle_retvals['converged']
+        except Exception:
+            # Fallback: use base rate from training set
+            probs[r] = spec.y[train].mean()
+            converged[r] = False
+
+    return probs, converged
+
+
+def loocv_predictions(df, executor=None):
     """
     Compute leave-one-out cross-validated predicted probabilities.
 
     For each holding, fits the parsimonious model on the remaining 180 holdings
     and predicts the held-out holding. This gives out-of-sample predictions
-    free of overfitting contamination.
+    free of overfitting contamination. The n refits are independent jackknife
+    replicates and are spread over the executor's workers.
     """
-    formula = ("pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + "
-               "pro_ds_purpose + level_shifting + any_balancing")
-
-    n = len(df)
-    loo_probs = np.zeros(n)
-    loo_converged = np.zeros(n, dtype=bool)
+    spec = get_spec(PARSIMONIOUS_FORMULA, df)
+    _require_all_rows(spec, df)
+    n = spec.nobs
+    executor = executor or ResamplingExecutor(n_workers=1)
 
     print("\n" + "=" * 70)
     print("LEAVE-ONE-OUT CROSS-VALIDATION")
     print("=" * 70)
 
-    for i in range(n):
-        train = df.drop(df.index[i])
-        test = df.iloc[[i]]
-
-        try:
-            model = smf.logit(formula, data=train).fit(disp=0, maxiter=100)
-            loo_probs[i] = model.predict(test).values[0]
-            loo_converged[i] = model.mle_retvals['converged']
-        except Exception:
-            # Fallback: use base rate from training set
-            loo_probs[i] = train['pro_ds'].mean()
-            loo_converged[i] = False
+    loo_probs, loo_converged = executor.map_blocks(
+        _loocv_block, n, args=(spec,), label='LOOCV')
 
     n_converged = loo_converged.sum()
     print(f"  LOOCV complete: {n_converged}/{n} models converged")
@@ -317,8 +350,9 @@ def compute_residuals(df, model, loo_probs):
     Uses in-sample model for Pearson/deviance residuals and Cook's distance,
     and LOOCV probabilities for the main incoherence flagging.
     """
+    _require_all_rows(get_spec(PARSIMONIOUS_FORMULA, df), df)
     y = df['pro_ds'].values
-    p_hat = model.predict(df)
+    p_hat = np.asarray(model.predict())
 
     # Pearson residuals: (y - p_hat) / sqrt(p_hat * (1 - p_hat))
     pearson_resid = (y - p_hat) / np.sqrt(p_hat * (1 - p_hat) + 1e-10)
@@ -782,49 +816,71 @@ def temporal_coherence(df, loo_probs):
 # SECTION 9: BOOTSTRAP STABILITY OF FLAGS
 # =============================================================================
 
-def bootstrap_flag_stability(df, n_boot=500, threshold=0.70):
+def _bootstrap_flag_block(rep_ids, rngs, spec, threshold):
     """
-    Test whether the same holdings are flagged across bootstrap resamples.
+    Executor block: refit on one bootstrap resample per generator and flag
+    the ORIGINAL holdings.
 
-    For each bootstrap sample, refits the model and identifies flagged holdings.
-    Holdings flagged in >50% of resamples are "stably incoherent."
+    Returns (type_a, type_b, valid) with one row per replicate.
     """
-    formula = ("pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + "
-               "pro_ds_purpose + level_shifting + any_balancing")
-    y = df['pro_ds'].values
-    n = len(df)
+    y = spec.y
+    n = spec.nobs
 
-    print("\n" + "=" * 70)
-    print(f"BOOTSTRAP STABILITY ANALYSIS (B={n_boot}, threshold={threshold})")
-    print("=" * 70)
+    type_a = np.zeros((len(rngs), n), dtype=bool)
+    type_b = np.zeros((len(rngs), n), dtype=bool)
+    valid = np.zeros(len(rngs), dtype=bool)
 
-    flag_counts_a = np.zeros(n)  # Type A flag count
-    flag_counts_b = np.zeros(n)  # Type B flag count
-    valid_boots = 0
-
-    for b in range(n_boot):
+    for r, rng in enumerate(rngs):
         # Bootstrap resample (with replacement)
-        boot_idx = np.random.choice(n, size=n, replace=True)
-        boot_df = df.iloc[boot_idx].copy()
+        boot_idx = rng.integers(0, n, size=n)
+
+        # A resample missing a factor level cannot predict that level
+        if not spec.estimable(boot_idx):
+            continue
 
         try:
-            model = smf.logit(formula, data=boot_df).fit(disp=0, maxiter=100)
+            model = spec.logit(rows=boot_idx, maxiter=100)
             if not model.mle_retvals['converged']:
                 continue
 
             # Predict on ORIGINAL (not bootstrap) data
-            probs = model.predict(df)
-            valid_boots += 1
+            probs = spec.predict(model.params)
+            valid[r] = True
 
             # Flag
-            type_a = (probs >= threshold) & (y == 0)
-            type_b = (probs <= (1 - threshold)) & (y == 1)
-            flag_counts_a += type_a.astype(int)
-            flag_counts_b += type_b.astype(int)
+            type_a[r] = (probs >= threshold) & (y == 0)
+            type_b[r] = (probs <= (1 - threshold)) & (y == 1)
 
         except Exception:
             continue
 
+    return type_a, type_b, valid
+
+
+def bootstrap_flag_stability(df, n_boot=500, threshold=0.70, executor=None):
+    """
+    Test whether the same holdings are flagged across bootstrap resamples.
+
+    For each bootstrap sample, refits the model and identifies flagged holdings.
+    Holdings flagged in >50% of resamples are "stably incoherent."
+    Resamples are seeded per replicate, so the flag rates are reproducible
+    whatever the executor's worker count.
+    """
+    spec = get_spec(PARSIMONIOUS_FORMULA, df)
+    executor = executor or ResamplingExecutor(n_workers=1)
+
+    print("\n" + "=" * 70)
+    print(f"BOOTSTRAP STABILITY ANALYSIS (B={n_boot}, threshold={threshold})")
+    print("=" * 70)
+
+    type_a, type_b, valid = executor.map_blocks(
+        _bootstrap_flag_block, n_boot, args=(spec, threshold),
+        seed=42, label='bootstrap refits')
+
+    flag_counts_a = type_a.sum(axis=0)  # Type A flag count
+    flag_counts_b = type_b.sum(axis=0)  # Type B flag count
+    valid_boots = int(valid.sum())
+
     if valid_boots == 0:
         print("  ERROR: No valid bootstrap models. Skipping stability analysis.")
         return {}
@@ -894,7 +950,7 @@ def bootstrap_flag_stability(df, n_boot=500, threshold=0.70):
 # SECTION 10: SENSITIVITY ANALYSES
 # =============================================================================
 
-def sensitivity_analyses(df, loo_probs):
+def sensitivity_analyses(df, loo_probs, executor=None):
     """
     Re-run key coherence metrics under alternative specifications.
 
@@ -907,9 +963,6 @@ def sensitivity_analyses(df, loo_probs):
     print("SENSITIVITY ANALYSES")
     print("=" * 70)
 
-    formula = ("pro_ds ~ C(dominant_source, Treatment(reference='SEMANTIC')) + "
-               "pro_ds_purpose + level_shifting + any_balancing")
-
     sensitivity_results = {}
 
     # --- Sensitivity 1: Exclude compensation ---
@@ -921,15 +974,10 @@ def sensitivity_analyses(df, loo_probs):
     n_nc = len(df_nocomp)
 
     # LOOCV on non-compensation subset
-    loo_nc = np.zeros(n_nc)
-    for i in range(n_nc):
-        train = df_nocomp.drop(df_nocomp.index[i])
-        test = df_nocomp.iloc[[i]]
-        try:
-            model = smf.logit(formula, data=train).fit(disp=0, maxiter=100)
-            loo_nc[i] = model.predict(test).values[0]
-        except Exception:
-            loo_nc[i] = train['pro_ds'].mean()
+    executor = executor or ResamplingExecutor(n_workers=1)
+    spec_nc = get_spec(PARSIMONIOUS_FORMULA, df_nocomp)
+    loo_nc, _ = executor.map_blocks(_loocv_block, n_nc, args=(spec_nc,),
+                                    label='LOOCV (excl. compensation)')
 
     mae_nc = np.mean(np.abs(loo_nc - y_nc))
     brier_nc = np.mean((loo_nc - y_nc) ** 2)
@@ -967,15 +1015,18 @@ def sensitivity_analyses(df, loo_probs):
     print("  " + "-" * 50)
 
     try:
-        model_wt = smf.logit(formula, data=df).fit(
-            disp=0, freq_weights=df['inverse_weight'].values)
+        # Logit.fit has no weights argument, so the weighted fit is a
+        # binomial GLM on the same compiled design
+        spec = get_spec(PARSIMONIOUS_FORMULA, df)
+        model_wt = spec.glm(freq_weights=df['inverse_weight'].values[spec.rows])
+        pseudo_r2_wt = 1 - model_wt.llf / model_wt.llnull
 
-        probs_wt = model_wt.predict(df)
+        probs_wt = spec.predict(model_wt.params)
         mae_wt = np.mean(np.abs(probs_wt - y))
         brier_wt = np.mean((probs_wt - y) ** 2)
         acc_wt = np.mean((probs_wt >= 0.5).astype(int) == y)
 
-        print(f"    Pseudo-R² (weighted): {model_wt.prsquared:.4f}")
+        print(f"    Pseudo-R² (weighted): {pseudo_r2_wt:.4f}")
         print(f"    MAE (weighted, in-sample): {mae_wt:.4f} (unweighted: {mae_full:.4f})")
         print(f"    Brier (weighted): {brier_wt:.4f}")
         print(f"    Accuracy: {acc_wt*100:.1f}%")
@@ -991,7 +1042,7 @@ def sensitivity_analyses(df, loo_probs):
             print(f"      {var}: OR={or_val:.3f}, p={p:.4f} ({sig})")
 
         sensitivity_results['inverse_weighted'] = {
-            'pseudo_r2': float(model_wt.prsquared),
+            'pseudo_r2': float(pseudo_r2_wt),
             'mae': float(mae_wt),
             'brier': float(brier_wt),
             'accuracy': float(acc_wt)
@@ -1141,8 +1192,6 @@ def main():
     print("CJEU GDPR Holdings (N=181)")
     print("=" * 70)
 
-    np.random.seed(42)
-
     # 1. Load data
     df = load_data()
 
@@ -1150,40 +1199,44 @@ def main():
     parsimonious_model = fit_parsimonious_model(df)
     full_model = fit_full_model(df)
 
-    # 3. LOOCV predictions
-    loo_probs = loocv_predictions(df)
+    # Shared process pool for the LOOCV and bootstrap refits (per-replicate
+    # seeds keep the results identical for any number of workers)
+    with ResamplingExecutor(progress=True) as executor:
+        # 3. LOOCV predictions
+        loo_probs = loocv_predictions(df, executor=executor)
 
-    # 4. Model performance and calibration
-    in_sample_probs = parsimonious_model.predict(df)
-    metrics = compute_performance_metrics(df, in_sample_probs, loo_probs)
-    cal_table, mean_cal_error = calibration_analysis(df, loo_probs)
+        # 4. Model performance and calibration
+        in_sample_probs = np.asarray(parsimonious_model.predict())
+        metrics = compute_performance_metrics(df, in_sample_probs, loo_probs)
+        cal_table, mean_cal_error = calibration_analysis(df, loo_probs)
 
-    # 5. Residuals
-    residuals = compute_residuals(df, parsimonious_model, loo_probs)
+        # 5. Residuals
+        residuals = compute_residuals(df, parsimonious_model, loo_probs)
 
-    # 6. Incoherence flagging
-    flags = flag_incoherence(df, loo_probs, thresholds=(0.65, 0.70, 0.75))
+        # 6. Incoherence flagging
+        flags = flag_incoherence(df, loo_probs, thresholds=(0.65, 0.70, 0.75))
 
-    # 7. Pattern analysis
-    pattern_results = analyze_incoherence_patterns(df, loo_probs, flags, threshold=0.70)
+        # 7. Pattern analysis
+        pattern_results = analyze_incoherence_patterns(df, loo_probs, flags, threshold=0.70)
 
-    # 8. Qualitative deep dive
-    deep_dive = qualitative_deep_dive(df, loo_probs, flags, threshold=0.70)
+        # 8. Qualitative deep dive
+        deep_dive = qualitative_deep_dive(df, loo_probs, flags, threshold=0.70)
 
-    # 9. Domain-specific coherence
-    domain_results = domain_coherence_analysis(df, loo_probs)
+        # 9. Domain-specific coherence
+        domain_results = domain_coherence_analysis(df, loo_probs)
 
-    # 10. Within-case coherence
-    case_df = within_case_coherence(df, loo_probs)
+        # 10. Within-case coherence
+        case_df = within_case_coherence(df, loo_probs)
 
-    # 11. Temporal coherence
-    year_stats, temporal_rho, temporal_p = temporal_coherence(df, loo_probs)
+        # 11. Temporal coherence
+        year_stats, temporal_rho, temporal_p = temporal_coherence(df, loo_probs)
 
-    # 12. Bootstrap stability
-    stability_results = bootstrap_flag_stability(df, n_boot=500, threshold=0.70)
+        # 12. Bootstrap stability
+        stability_results = bootstrap_flag_stability(df, n_boot=500, threshold=0.70,
+                                                     executor=executor)
 
-    # 13. Sensitivity analyses
-    sensitivity_results = sensitivity_analyses(df, loo_probs)
+        # 13. Sensitivity analyses
+        sensitivity_results = sensitivity_analyses(df, loo_probs, executor=executor)
 
     # 14. Coherence score summary
     scores = compute_coherence_scores(
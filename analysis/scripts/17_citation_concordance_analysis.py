@@ -17,6 +17,10 @@ by examining:
 4. Anchor case analysis: which foundational cases generate the most discord
 5. Cross-referencing with Approach 1 (coherence residual analysis) flags
 6. Citation coherence scores per domain
+7. Shared precedent: co-citation and bibliographic coupling of discordant
+   vs. concordant citation pairs
+8. Concordance against a degree-preserving, time-respecting rewiring null
+   (overall and by dimension)
 
 Builds on existing data in analysis/output/citation_network/.
 """
@@ -29,15 +33,40 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+from citation_graph import load_graph, GRAPH_FILENAME
+from case_similarity import pair_similarity, similarity_topk
+from concordance_null import concordance_null
+from resampling import ResamplingExecutor
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 HOLDINGS_PATH = PROJECT_ROOT / "analysis" / "output" / "holdings_prepared.csv"
-EDGES_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_network" / "citation_edges.csv"
-CASE_ATTRS_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_network" / "case_attributes.csv"
-INTERNAL_EDGES_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_network" / "internal_citation_edges.csv"
+GRAPH_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_network" / GRAPH_FILENAME
 COHERENCE_PATH = PROJECT_ROOT / "analysis" / "output" / "coherence" / "coherence_analysis.json"
 OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_concordance"
 
+# Rewiring null model
+N_NULL_GRAPHS = 10000
+NULL_SWEEPS = 10
+
+# Concordance classes of a citation pair (categorical codes follow this order)
+CONCORDANT = ('CONCORDANT_PRO_DS', 'CONCORDANT_PRO_CTRL')
+DISCORDANT = ('DISCORDANT_CITED_PRO_DS', 'DISCORDANT_CITED_PRO_CTRL')
+CONCORDANCE_TYPES = CONCORDANT + DISCORDANT + ('MIXED_CITED', 'UNKNOWN')
+CONCORDANCE_DTYPE = pd.CategoricalDtype(CONCORDANCE_TYPES)
+
+# Column types of the citation pairs table
+PAIR_DTYPES = {
+    'citing_case': str, 'citing_holding_id': 'int64', 'citing_direction': str,
+    'citing_pro_ds': 'Int64', 'citing_concept': str, 'citing_chamber': str,
+    'citing_pro_ds_purpose': 'Int64', 'citing_concept_cluster': str,
+    'citing_is_compensation': 'int64', 'citing_core_holding': str,
+    'citing_justification': str, 'cited_case': str, 'cited_direction': str,
+    'cited_pro_ds_rate': 'float64', 'cited_chamber': str, 'cited_year': 'Int64',
+    'cited_concept': str, 'cited_purpose_rate': 'float64',
+    'concordance': CONCORDANCE_DTYPE, 'is_concordant': bool, 'is_discordant': bool,
+}
+
 
 # =============================================================================
 # SECTION 1: DATA LOADING AND CITATION PAIR CONSTRUCTION
@@ -46,9 +75,10 @@ OUTPUT_PATH = PROJECT_ROOT / "analysis" / "output" / "citation_concordance"
 def load_all_data():
     """Load holdings, citation edges, and case attributes."""
     holdings = pd.read_csv(HOLDINGS_PATH)
-    edges = pd.read_csv(EDGES_PATH)
-    case_attrs = pd.read_csv(CASE_ATTRS_PATH)
-    internal_edges = pd.read_csv(INTERNAL_EDGES_PATH)
+    graph = load_graph(GRAPH_PATH)
+    edges = graph.edge_table()
+    case_attrs = graph.case_table()
+    internal = graph.internal()
 
     # Load coherence analysis results if available
     coherence_flags = None
@@ -57,8 +87,33 @@ def load_all_data():
             coherence_flags = json.load(f)
 
     print(f"Loaded {len(holdings)} holdings, {len(edges)} citation edges, "
-          f"{len(case_attrs)} cases, {len(internal_edges)} internal edges")
-    return holdings, edges, case_attrs, internal_edges, coherence_flags
+          f"{len(case_attrs)} cases, {internal.n_edges} internal edges")
+    return holdings, edges, case_attrs, internal, coherence_flags
+
+
+def _classify_concordance(cited_pro_ds_rate, citing_pro_ds):
+    """
+    Concordance class of each citation pair, as codes into CONCORDANCE_TYPES.
+
+    The cited case is pro-DS if the majority of its holdings are pro-DS,
+    pro-controller if the majority are not, and mixed if exactly 50/50.
+    """
+    rate = np.asarray(cited_pro_ds_rate, dtype=float)
+    citing = np.asarray(citing_pro_ds, dtype=float)
+    cited_is_pro_ds = rate > 0.5
+    cited_is_pro_controller = rate < 0.5
+    citing_is_pro_ds = citing == 1
+
+    return np.select(
+        [np.isnan(rate) | np.isnan(citing),
+         cited_is_pro_ds & citing_is_pro_ds,                # Both pro-DS
+         cited_is_pro_controller & ~citing_is_pro_ds,       # Both pro-controller
+         cited_is_pro_ds & ~citing_is_pro_ds,               # Cited pro-DS, citing not
+         cited_is_pro_controller & citing_is_pro_ds],       # Cited pro-ctrl, citing pro-DS
+        [CONCORDANCE_TYPES.index(name) for name in (
+            'UNKNOWN', 'CONCORDANT_PRO_DS', 'CONCORDANT_PRO_CTRL',
+            'DISCORDANT_CITED_PRO_DS', 'DISCORDANT_CITED_PRO_CTRL')],
+        default=CONCORDANCE_TYPES.index('MIXED_CITED'))    # Cited case is exactly 50/50
 
 
 def build_citation_pairs(edges, case_attrs, holdings):
@@ -71,96 +126,72 @@ def build_citation_pairs(edges, case_attrs, holdings):
     - Concordance classification
 
     Only includes internal citations (cited case is within the GDPR corpus).
+    Cited-case and citing-holding attributes are attached with keyed joins
+    and concordance is classified with array logic, so the cost is linear
+    in the number of edges. Columns are typed as in PAIR_DTYPES, with the
+    concordance class as a categorical over CONCORDANCE_TYPES.
     """
-    corpus_cases = set(case_attrs['case_id'])
-
     # Filter to internal citations only
-    internal = edges[edges['cited_case'].isin(corpus_cases)].copy()
-
-    # Build cited case direction lookup
-    case_direction = case_attrs.set_index('case_id')[
-        ['dominant_direction', 'pro_ds_rate', 'pro_ds_count', 'holding_count',
-         'chamber', 'year', 'dominant_concept', 'pro_ds_purpose_rate']
-    ].to_dict('index')
-
-    # Build holding-level lookup for richer citing info
-    holding_lookup = {}
-    for _, row in holdings.iterrows():
-        key = (row['case_id'], row['holding_id'])
-        holding_lookup[key] = {
-            'concept_cluster': row.get('concept_cluster', ''),
-            'primary_concept': row.get('primary_concept', ''),
-            'is_compensation': row.get('is_compensation', 0),
-            'dominant_source': row.get('dominant_source', ''),
-            'dominant_structure': row.get('dominant_structure', ''),
-            'core_holding': str(row.get('core_holding', '')),
-            'direction_justification': str(row.get('direction_justification', '')),
-        }
-
-    pairs = []
-    for _, row in internal.iterrows():
-        cited_info = case_direction.get(row['cited_case'], {})
-        citing_key = (row['citing_case'], row['citing_holding_id'])
-        citing_holding_info = holding_lookup.get(citing_key, {})
-
-        cited_pro_ds_rate = cited_info.get('pro_ds_rate', None)
-        citing_pro_ds = row['citing_pro_ds']
-
-        # Concordance classification
-        if cited_pro_ds_rate is None or pd.isna(citing_pro_ds):
-            concordance = 'UNKNOWN'
-        else:
-            # Cited case is "pro-DS" if majority of its holdings are pro-DS
-            cited_is_pro_ds = cited_pro_ds_rate > 0.5
-            # Cited case is "pro-controller" if majority are not pro-DS
-            cited_is_pro_controller = cited_pro_ds_rate < 0.5
-            # Cited case is "mixed" if exactly 50/50
-            citing_is_pro_ds = citing_pro_ds == 1
-
-            if cited_is_pro_ds and citing_is_pro_ds:
-                concordance = 'CONCORDANT_PRO_DS'  # Both pro-DS
-            elif cited_is_pro_controller and not citing_is_pro_ds:
-                concordance = 'CONCORDANT_PRO_CTRL'  # Both pro-controller
-            elif cited_is_pro_ds and not citing_is_pro_ds:
-                concordance = 'DISCORDANT_CITED_PRO_DS'  # Cited pro-DS, citing not
-            elif cited_is_pro_controller and citing_is_pro_ds:
-                concordance = 'DISCORDANT_CITED_PRO_CTRL'  # Cited pro-ctrl, citing pro-DS
-            else:
-                concordance = 'MIXED_CITED'  # Cited case is exactly 50/50
-
-        pairs.append({
-            # Citing holding info
-            'citing_case': row['citing_case'],
-            'citing_holding_id': row['citing_holding_id'],
-            'citing_direction': row['citing_direction'],
-            'citing_pro_ds': citing_pro_ds,
-            'citing_concept': row.get('citing_concept', ''),
-            'citing_chamber': row.get('citing_chamber', ''),
-            'citing_pro_ds_purpose': row.get('citing_pro_ds_purpose', None),
-            'citing_concept_cluster': citing_holding_info.get('concept_cluster', ''),
-            'citing_is_compensation': citing_holding_info.get('is_compensation', 0),
-            'citing_core_holding': citing_holding_info.get('core_holding', ''),
-            'citing_justification': citing_holding_info.get('direction_justification', ''),
-            # Cited case info
-            'cited_case': row['cited_case'],
-            'cited_direction': cited_info.get('dominant_direction', ''),
-            'cited_pro_ds_rate': cited_pro_ds_rate,
-            'cited_chamber': cited_info.get('chamber', ''),
-            'cited_year': cited_info.get('year', None),
-            'cited_concept': cited_info.get('dominant_concept', ''),
-            'cited_purpose_rate': cited_info.get('pro_ds_purpose_rate', None),
-            # Concordance
-            'concordance': concordance,
-            'is_concordant': concordance in ('CONCORDANT_PRO_DS', 'CONCORDANT_PRO_CTRL'),
-            'is_discordant': concordance in ('DISCORDANT_CITED_PRO_DS',
-                                              'DISCORDANT_CITED_PRO_CTRL'),
-        })
-
-    pairs_df = pd.DataFrame(pairs)
+    internal = edges[edges['cited_case'].isin(case_attrs['case_id'])]
+
+    # Cited case direction, one row per case
+    cited = case_attrs.drop_duplicates('case_id', keep='last').set_index('case_id')
+    cited_idx = cited.index.get_indexer(internal['cited_case'])
+
+    # Citing holding details, one row per (case_id, holding_id)
+    holding_info = holdings.drop_duplicates(['case_id', 'holding_id'], keep='last')
+    holding_idx = pd.MultiIndex.from_frame(holding_info[['case_id', 'holding_id']]).get_indexer(
+        pd.MultiIndex.from_arrays([internal['citing_case'], internal['citing_holding_id']]))
+    holding_info = holding_info.reset_index(drop=True)
+    for column in ('core_holding', 'direction_justification'):
+        if column in holding_info.columns:
+            holding_info[column] = holding_info[column].astype(str)
+
+    def lookup(table, idx, column, default):
+        if column not in table.columns:
+            return pd.Series(default, index=internal.index, dtype=object)
+        values = table[column].take(np.maximum(idx, 0)).to_numpy(dtype=object)
+        values[idx < 0] = default
+        return pd.Series(values, index=internal.index)
+
+    def edge_column(column, default):
+        return internal[column] if column in internal.columns else default
+
+    cited_pro_ds_rate = lookup(cited, cited_idx, 'pro_ds_rate', np.nan)
+    codes = _classify_concordance(cited_pro_ds_rate, internal['citing_pro_ds'])
+    concordance = pd.Categorical.from_codes(codes, dtype=CONCORDANCE_DTYPE)
+
+    pairs_df = pd.DataFrame({
+        # Citing holding info
+        'citing_case': internal['citing_case'],
+        'citing_holding_id': internal['citing_holding_id'],
+        'citing_direction': internal['citing_direction'],
+        'citing_pro_ds': internal['citing_pro_ds'],
+        'citing_concept': edge_column('citing_concept', ''),
+        'citing_chamber': edge_column('citing_chamber', ''),
+        'citing_pro_ds_purpose': edge_column('citing_pro_ds_purpose', np.nan),
+        'citing_concept_cluster': lookup(holding_info, holding_idx, 'concept_cluster', ''),
+        'citing_is_compensation': lookup(holding_info, holding_idx, 'is_compensation', 0),
+        'citing_core_holding': lookup(holding_info, holding_idx, 'core_holding', ''),
+        'citing_justification': lookup(holding_info, holding_idx, 'direction_justification', ''),
+        # Cited case info
+        'cited_case': internal['cited_case'],
+        'cited_direction': lookup(cited, cited_idx, 'dominant_direction', ''),
+        'cited_pro_ds_rate': cited_pro_ds_rate,
+        'cited_chamber': lookup(cited, cited_idx, 'chamber', ''),
+        'cited_year': lookup(cited, cited_idx, 'year', np.nan),
+        'cited_concept': lookup(cited, cited_idx, 'dominant_concept', ''),
+        'cited_purpose_rate': lookup(cited, cited_idx, 'pro_ds_purpose_rate', np.nan),
+        # Concordance
+        'concordance': concordance,
+        'is_concordant': np.isin(codes, [CONCORDANCE_TYPES.index(name) for name in CONCORDANT]),
+        'is_discordant': np.isin(codes, [CONCORDANCE_TYPES.index(name) for name in DISCORDANT]),
+    }).reset_index(drop=True).astype(PAIR_DTYPES)
 
     print(f"\nBuilt {len(pairs_df)} internal citation pairs")
     print(f"  Concordance distribution:")
-    for conc, count in pairs_df['concordance'].value_counts().items():
+    counts = pairs_df['concordance'].value_counts()
+    for conc, count in counts[counts > 0].items():
         pct = count / len(pairs_df) * 100
         print(f"    {conc}: {count} ({pct:.1f}%)")
 
@@ -182,10 +213,7 @@ def aggregate_concordance(pairs_df):
     print("=" * 70)
 
     # Exclude UNKNOWN and MIXED_CITED
-    classified = pairs_df[pairs_df['concordance'].isin([
-        'CONCORDANT_PRO_DS', 'CONCORDANT_PRO_CTRL',
-        'DISCORDANT_CITED_PRO_DS', 'DISCORDANT_CITED_PRO_CTRL'
-    ])].copy()
+    classified = pairs_df[pairs_df['concordance'].isin(CONCORDANT + DISCORDANT)].copy()
 
     n_total = len(classified)
     n_concordant = classified['is_concordant'].sum()
@@ -416,7 +444,7 @@ def concordance_by_dimension(pairs_df, classified):
         pass
 
     # Use citing_date from the edges data
-    edges_for_year = pd.read_csv(EDGES_PATH)
+    edges_for_year = load_graph(GRAPH_PATH).edge_table()
     edges_for_year['citing_year'] = pd.to_datetime(
         edges_for_year['citing_date'], errors='coerce').dt.year
 
@@ -714,10 +742,10 @@ def cross_reference_coherence_flags(pairs_df, classified, coherence_flags):
 
     # Check which flagged holdings participate in discordant citations
     classified = classified.copy()
-    classified['is_coherence_flagged'] = classified.apply(
-        lambda row: (row['citing_case'], int(row['citing_holding_id']))
-        in flagged_holdings, axis=1
-    )
+    citing_keys = pd.MultiIndex.from_arrays(
+        [classified['citing_case'], classified['citing_holding_id'].astype(int)])
+    classified['is_coherence_flagged'] = (citing_keys.isin(list(flagged_holdings))
+                                          if flagged_holdings else False)
 
     n_flagged_citing = classified['is_coherence_flagged'].sum()
     n_unflagged_citing = len(classified) - n_flagged_citing
@@ -873,6 +901,129 @@ def compute_citation_coherence_scores(aggregate_results, dimension_results,
     return scores
 
 
+# =============================================================================
+# SECTION 9: SHARED PRECEDENT (CO-CITATION AND BIBLIOGRAPHIC COUPLING)
+# =============================================================================
+
+def shared_precedent_concordance(classified, graph, n_neighbors=5):
+    """
+    Are discordant citations made between cases with less doctrine in common?
+
+    For each classified pair, measures (on the full graph, external
+    precedents included) how far the citing and cited case rest on the same
+    authorities (bibliographic coupling) and how often later cases cite them
+    together (co-citation), both as Salton cosines, and compares concordant
+    with discordant pairs. Also returns each corpus case's nearest
+    neighbours under both measures.
+    """
+    print("\n" + "=" * 70)
+    print("SHARED PRECEDENT: CO-CITATION AND BIBLIOGRAPHIC COUPLING")
+    print("=" * 70)
+
+    citing = classified['citing_case'].map(graph.index).to_numpy()
+    cited = classified['cited_case'].map(graph.index).to_numpy()
+    measures = {
+        'coupling': pair_similarity(graph, citing, cited, kind='coupling'),
+        'cocitation': pair_similarity(graph, citing, cited, kind='cocitation'),
+    }
+
+    results = {}
+    for kind, similarity in measures.items():
+        concordant = similarity[classified['is_concordant'].to_numpy()]
+        discordant = similarity[classified['is_discordant'].to_numpy()]
+        if len(concordant) and len(discordant):
+            u_stat, p = stats.mannwhitneyu(concordant, discordant, alternative='two-sided')
+        else:
+            u_stat, p = np.nan, np.nan
+
+        label = 'Bibliographic coupling' if kind == 'coupling' else 'Co-citation'
+        print(f"\n  {label} (cosine) of citing and cited case:")
+        print(f"    Concordant pairs: mean {np.mean(concordant):.3f} (n={len(concordant)})")
+        print(f"    Discordant pairs: mean {np.mean(discordant):.3f} (n={len(discordant)})")
+        print(f"    Mann-Whitney U = {u_stat:.1f}, p = {p:.4f}")
+
+        results[kind] = {
+            'concordant_mean': float(np.mean(concordant)) if len(concordant) else None,
+            'discordant_mean': float(np.mean(discordant)) if len(discordant) else None,
+            'mann_whitney_u': float(u_stat),
+            'p_value': float(p),
+        }
+
+    corpus = np.arange(graph.n_corpus)
+    neighbors = pd.concat([
+        similarity_topk(graph, kind=kind, k=n_neighbors, nodes=corpus).assign(kind=kind)
+        for kind in measures
+    ], ignore_index=True)
+
+    return results, neighbors
+
+
+# =============================================================================
+# SECTION 10: DEGREE-PRESERVING REWIRING NULL MODEL
+# =============================================================================
+
+def rewiring_null_concordance(pairs_df, case_attrs, executor=None,
+                              n_null=N_NULL_GRAPHS, n_sweeps=NULL_SWEEPS):
+    """
+    Is concordance higher than the citation structure alone implies?
+
+    The binomial test compares concordance with 50%, but pro-DS holdings
+    cite more and pro-DS cases are cited more, which inflates concordance
+    by chance. Each null graph swaps cited cases between citation pairs,
+    keeping every holding's out-degree and every case's in-degree and never
+    citing a later judgment, and concordance is recomputed overall and by
+    citing concept cluster, chamber and year.
+    """
+    print("\n" + "=" * 70)
+    print("DEGREE-PRESERVING REWIRING NULL MODEL")
+    print("=" * 70)
+
+    case_dates = case_attrs.set_index('case_id')['judgment_date']
+    groupings = {
+        'by_cluster': pairs_df['citing_concept_cluster'],
+        'by_chamber': pairs_df['citing_chamber'],
+        'by_year': pd.to_datetime(pairs_df['citing_case'].map(case_dates),
+                                  errors='coerce').dt.year,
+    }
+    table, info = concordance_null(pairs_df, case_dates, groupings=groupings,
+                                   n_null=n_null, n_sweeps=n_sweeps, executor=executor)
+
+    print(f"\n  {n_null} null graphs, {n_sweeps} swap rounds each "
+          f"({info['mean_share_rewired']*100:.1f}% of pairs rewired on average)")
+
+    def record(row):
+        return {'n': int(row['n']), 'observed_rate': float(row['observed_rate']),
+                'null_mean': float(row['null_mean']), 'null_sd': float(row['null_sd']),
+                'z': float(row['z']), 'p_greater': float(row['p_greater']),
+                'p_two_sided': float(row['p_two_sided'])}
+
+    overall = table.iloc[0]
+    print(f"\n  Overall: observed {overall['observed_rate']*100:.1f}% vs. null "
+          f"{overall['null_mean']*100:.1f}% (sd {overall['null_sd']*100:.1f}pp), "
+          f"z={overall['z']:.2f}, p={overall['p_greater']:.4f}")
+    if overall['p_greater'] < 0.05:
+        print(f"  → Concordance EXCEEDS what the degree structure implies")
+    else:
+        print(f"  → Concordance is explained by the degree structure")
+
+    results = {'overall': record(overall), 'diagnostics': info}
+    for dimension, min_n in (('by_cluster', 5), ('by_chamber', 5), ('by_year', 3)):
+        rows = table[(table['dimension'] == dimension) & (table['n'] >= min_n)]
+        if rows.empty:
+            continue
+        print(f"\n  {dimension.replace('_', ' ').capitalize()}:")
+        print(f"  {'Level':<22} {'N':>5} {'Obs':>7} {'Null':>7} {'z':>6} {'p(2s)':>7}")
+        print("  " + "-" * 58)
+        results[dimension] = {}
+        for _, row in rows.iterrows():
+            level = int(row['level']) if dimension == 'by_year' else row['level']
+            print(f"  {str(level):<22} {row['n']:>5} {row['observed_rate']*100:>6.1f}% "
+                  f"{row['null_mean']*100:>6.1f}% {row['z']:>6.2f} {row['p_two_sided']:>7.4f}")
+            results[dimension][level] = record(row)
+
+    return results
+
+
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
@@ -884,7 +1035,7 @@ def main():
     print("=" * 70)
 
     # 1. Load data
-    holdings, edges, case_attrs, internal_edges, coherence_flags = load_all_data()
+    holdings, edges, case_attrs, internal, coherence_flags = load_all_data()
 
     # 2. Build citation pairs
     pairs_df = build_citation_pairs(edges, case_attrs, holdings)
@@ -913,6 +1064,13 @@ def main():
         aggregate_results, dimension_results, anchor_results,
         cross_domain_results, cross_ref_results, classified)
 
+    # 10. Shared precedent (co-citation and coupling)
+    shared_results, neighbors = shared_precedent_concordance(classified, load_graph(GRAPH_PATH))
+
+    # 11. Degree-preserving rewiring null model
+    with ResamplingExecutor() as executor:
+        null_results = rewiring_null_concordance(pairs_df, case_attrs, executor=executor)
+
     # ==========================================================================
     # SAVE RESULTS
     # ==========================================================================
@@ -921,6 +1079,9 @@ def main():
     # Per-pair data
     pairs_df.to_csv(OUTPUT_PATH / "citation_pairs.csv", index=False)
 
+    # Nearest cases by co-citation and coupling
+    neighbors.to_csv(OUTPUT_PATH / "case_neighbors.csv", index=False)
+
     # Comprehensive JSON
     all_results = {
         'aggregate': aggregate_results,
@@ -930,6 +1091,8 @@ def main():
         'cross_domain': cross_domain_results,
         'cross_reference_coherence': cross_ref_results,
         'coherence_scores': scores,
+        'shared_precedent': shared_results,
+        'rewiring_null': null_results,
     }
 
     with open(OUTPUT_PATH / "citation_concordance_analysis.json", 'w') as f:
@@ -939,6 +1102,7 @@ def main():
     print(f"Results saved to {OUTPUT_PATH}")
     print(f"  - citation_pairs.csv   (per-pair concordance data)")
     print(f"  - citation_concordance_analysis.json (comprehensive results)")
+    print(f"  - case_neighbors.csv   (nearest cases by co-citation/coupling)")
     print(f"{'='*70}")
 
     return all_results
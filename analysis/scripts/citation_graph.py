@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+citation_graph.py
+=================
+Sparse citation-graph core shared by the citation-stage scripts.
+
+Every case ID (corpus and external) is interned to an integer node index,
+corpus cases first, so the internal subgraph is simply nodes [0, n_corpus).
+Case-level citations are stored twice:
+
+- CSR (out-edges): indptr/indices/weight, one entry per (citing, cited) pair,
+  weight = number of citing holdings
+- CSC (in-edges): in_indptr/in_indices plus in_edges, the CSR position of
+  each in-edge (so per-edge arrays never need duplicating)
+
+The holding-level edges behind them (one row per holding → cited case) are
+kept as parallel arrays with edge_pair pointing at their case-level edge, and
+every column of the original edge table is carried along.
+
+10_citation_network_construction also attaches the case attributes (one
+row per corpus node) and the holding-level citation variables (with a
+prebuilt case -> holdings index), so the file is the single artifact the
+later citation-stage scripts load instead of re-reading the CSVs.
+
+The graph is saved as a single versioned binary file: a magic string, a
+JSON header and 64-byte aligned arrays. load_graph() memory-maps it, so
+loading costs a header parse regardless of graph size, the OS page cache is
+shared by every process mapping the file, and repeated loads in one process
+return the same object. networkx is only needed to export (to_networkx).
+
+Usage:
+    graph = CitationGraph.from_edges(edge_df, corpus_cases)
+    graph.attach_tables(case_attrs, holding_vars)
+    graph.save(OUTPUT_PATH / "citation_graph.bin")
+
+    graph = load_graph(NETWORK_PATH / "citation_graph.bin")
+    case_attrs = graph.case_table()
+    lookup = graph.case_records()             # case_id -> {attribute: value}
+    internal = graph.internal()
+    internal.successors('C-300/21')
+    A = internal.adjacency()                  # scipy CSR, citing x cited
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+GRAPH_FILENAME = "citation_graph.bin"
+
+_MAGIC = b'CITGRAPH'
+FORMAT_VERSION = 2
+_ALIGN = 64
+
+# Graphs already loaded in this process: resolved path -> (mtime, size, mmap, graph)
+_LOADED = {}
+
+# =============================================================================
+# STRING TABLES AND EDGE COLUMNS
+# =============================================================================
+
+def _encode_strings(values):
+    """UTF-8 blob of newline-separated strings (IDs never contain newlines)."""
+    return np.frombuffer('\n'.join(values).encode('utf-8'), dtype=np.uint8)
+
+def _decode_strings(blob, count):
+    if count == 0:
+        return np.array([], dtype=object)
+    return np.array(bytes(blob).decode('utf-8').split('\n'), dtype=object)
+
+def _encode_column(series):
+    """
+    Encode an edge-table column as (kind, values, categories).
+
+    Numeric, boolean and datetime columns are stored as-is; anything else is
+    dictionary-encoded as int32 codes (-1 for missing) into a string table.
+    """
+    if (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)
+            or pd.api.types.is_datetime64_any_dtype(series)):
+        return 'array', series.to_numpy(), None
+    codes, categories = pd.factorize(series.astype(object).where(series.notna(), None))
+    return 'categorical', codes.astype(np.int32), [str(c) for c in categories]
+
+def _decode_column(kind, values, categories):
+    if kind == 'array':
+        return np.asarray(values)
+    return pd.Categorical.from_codes(np.asarray(values), categories=categories).astype(object)
+
+def _encode_table(df, exclude=()):
+    return {name: _encode_column(df[name]) for name in df.columns if name not in exclude}
+
+def _decode_table(columns):
+    return {name: _decode_column(kind, values, categories)
+            for name, (kind, values, categories) in columns.items()}
+
+def gather_rows(indptr, rows):
+    """Positions of all entries in the given CSR rows, row by row."""
+    starts = indptr[rows]
+    counts = indptr[np.asarray(rows) + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(offsets.size)
+
+def row_groups(indptr, rows):
+    """
+    Entry positions of the given CSR rows, the non-empty rows among them,
+    and where each non-empty row starts in the positions (for ufunc.reduceat).
+    """
+    counts = indptr[rows + 1] - indptr[rows]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    nonempty = counts > 0
+    return gather_rows(indptr, rows), rows[nonempty], starts[nonempty]
+
+# =============================================================================
+# GRAPH
+# =============================================================================
+
+class CitationGraph:
+    """
+    Directed citation graph over interned case IDs (citing → cited).
+
+    Attributes:
+        case_ids: object array, node index -> case ID
+        n_corpus: number of corpus cases (nodes 0..n_corpus-1)
+        indptr, indices, weight: case-level CSR adjacency
+        in_indptr, in_indices, in_edges: the same edges in CSC order
+        edge_src, edge_dst: citing/cited node of each holding-level edge
+        edge_pair: case-level edge (CSR position) of each holding-level edge
+        edge_columns: {name: (kind, values, categories)} holding-level columns
+        case_columns: case attribute columns, one row per corpus node
+        holding_case: corpus node of each row of the holding table
+        holding_columns: holding-level citation variables
+        holding_indptr, holding_order: holding rows grouped by case
+            (rows of node i are holding_order[holding_indptr[i]:holding_indptr[i+1]])
+    """
+
+    def __init__(self, case_ids, n_corpus, indptr, indices, weight,
+                 in_indptr, in_indices, in_edges,
+                 edge_src, edge_dst, edge_pair, edge_columns=None,
+                 case_columns=None, holding_case=None, holding_columns=None,
+                 holding_indptr=None, holding_order=None):
+        self.case_ids = case_ids
+        self.n_corpus = int(n_corpus)
+        self.indptr = indptr
+        self.indices = indices
+        self.weight = weight
+        self.in_indptr = in_indptr
+        self.in_indices = in_indices
+        self.in_edges = in_edges
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_pair = edge_pair
+        self.edge_columns = edge_columns or {}
+        self.case_columns = case_columns or {}
+        self.holding_case = holding_case
+        self.holding_columns = holding_columns or {}
+        self.holding_indptr = holding_indptr
+        self.holding_order = holding_order
+        self._index = None
+        self._records = None
+
+    # -------------------------------------------------------------------------
+    # Construction
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_edges(cls, edge_df, corpus_cases, citing_col='citing_case',
+                   cited_col='cited_case'):
+        """
+        Build the graph from a holding-level edge table.
+
+        Corpus cases are interned first (sorted), then external cited cases
+        (sorted). Every other column of edge_df is kept as a holding-level
+        edge column.
+        """
+        corpus = sorted(set(corpus_cases))
+        external = sorted(set(edge_df[cited_col].unique()) - set(corpus))
+        case_ids = np.array(corpus + external, dtype=object)
+        index = pd.Index(case_ids)
+
+        edge_src = index.get_indexer(edge_df[citing_col]).astype(np.int32)
+        edge_dst = index.get_indexer(edge_df[cited_col]).astype(np.int32)
+        if np.any(edge_src < 0):
+            missing = sorted(set(edge_df.loc[edge_src < 0, citing_col]))
+            raise ValueError(f"Citing cases not in corpus: {missing[:5]}")
+
+        columns = {name: _encode_column(edge_df[name]) for name in edge_df.columns
+                   if name not in (citing_col, cited_col)}
+        graph = cls._from_pairs(case_ids, len(corpus), edge_src, edge_dst, columns)
+        graph._index = dict(zip(case_ids, range(len(case_ids))))
+        return graph
+
+    @classmethod
+    def _from_pairs(cls, case_ids, n_corpus, edge_src, edge_dst, edge_columns):
+        n = len(case_ids)
+        keys = edge_src.astype(np.int64) * n + edge_dst
+        pair_keys, edge_pair, weight = np.unique(keys, return_inverse=True, return_counts=True)
+        src = (pair_keys // n).astype(np.int32)
+        dst = (pair_keys % n).astype(np.int32)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+        in_edges = np.lexsort((src, dst)).astype(np.int64)
+        in_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=in_indptr[1:])
+
+        return cls(case_ids, n_corpus, indptr, dst, weight.astype(np.int32),
+                   in_indptr, src[in_edges], in_edges,
+                   edge_src, edge_dst, edge_pair.astype(np.int64), edge_columns)
+
+    def internal(self):
+        """Subgraph of corpus-to-corpus citations (node indices are unchanged)."""
+        keep = self.edge_dst < self.n_corpus
+        columns = {name: (kind, np.asarray(values)[keep], categories)
+                   for name, (kind, values, categories) in self.edge_columns.items()}
+        graph = CitationGraph._from_pairs(self.case_ids[:self.n_corpus], self.n_corpus,
+                                          self.edge_src[keep], self.edge_dst[keep], columns)
+        graph.case_columns = self.case_columns
+        graph.holding_case = self.holding_case
+        graph.holding_columns = self.holding_columns
+        graph.holding_indptr = self.holding_indptr
+        graph.holding_order = self.holding_order
+        graph._records = self._records
+        return graph
+
+    def attach_tables(self, case_attrs=None, holding_vars=None):
+        """
+        Carry case attributes and holding-level variables with the graph.
+
+        case_attrs: DataFrame with a case_id column; rows are aligned to the
+            corpus nodes (cases missing from it get NaN).
+        holding_vars: DataFrame with a case_id column (corpus cases only);
+            row order is kept.
+        """
+        corpus = pd.Index(self.case_ids[:self.n_corpus])
+        if case_attrs is not None:
+            aligned = case_attrs.set_index('case_id').reindex(corpus)
+            self.case_columns = _encode_table(aligned)
+            self._records = None
+        if holding_vars is not None:
+            holding_case = corpus.get_indexer(holding_vars['case_id'])
+            if np.any(holding_case < 0):
+                missing = sorted(set(holding_vars.loc[holding_case < 0, 'case_id']))
+                raise ValueError(f"Holding cases not in corpus: {missing[:5]}")
+            self.holding_case = holding_case.astype(np.int32)
+            self.holding_columns = _encode_table(holding_vars, exclude=('case_id',))
+            self.holding_order = np.argsort(self.holding_case, kind='stable').astype(np.int64)
+            self.holding_indptr = np.zeros(self.n_corpus + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.holding_case, minlength=self.n_corpus),
+                      out=self.holding_indptr[1:])
+        return self
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    @property
+    def n_nodes(self):
+        return len(self.case_ids)
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    @property
+    def index(self):
+        """case ID -> node index (built on first use)."""
+        if self._index is None:
+            self._index = dict(zip(self.case_ids, range(self.n_nodes)))
+        return self._index
+
+    def __len__(self):
+        return self.n_nodes
+
+    def __contains__(self, case_id):
+        return case_id in self.index
+
+    def node(self, case_id):
+        return self.index[case_id]
+
+    def is_corpus(self):
+        return np.arange(self.n_nodes) < self.n_corpus
+
+    def successor_nodes(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def predecessor_nodes(self, i):
+        return self.in_indices[self.in_indptr[i]:self.in_indptr[i + 1]]
+
+    def successors(self, case_id):
+        """Case IDs cited by case_id."""
+        return list(self.case_ids[self.successor_nodes(self.node(case_id))])
+
+    def predecessors(self, case_id):
+        """Case IDs citing case_id."""
+        return list(self.case_ids[self.predecessor_nodes(self.node(case_id))])
+
+    def out_degree(self, weighted=False):
+        if weighted:
+            return np.bincount(np.repeat(np.arange(self.n_nodes), np.diff(self.indptr)),
+                               weights=self.weight, minlength=self.n_nodes)
+        return np.diff(self.indptr)
+
+    def in_degree(self, weighted=False):
+        if weighted:
+            return np.bincount(self.indices, weights=self.weight, minlength=self.n_nodes)
+        return np.diff(self.in_indptr)
+
+    def adjacency(self, weighted=True, dtype=np.float64):
+        """Sparse CSR matrix A[citing, cited] (weights or 0/1)."""
+        data = self.weight.astype(dtype) if weighted else np.ones(self.n_edges, dtype=dtype)
+        return sp.csr_matrix((data, self.indices, self.indptr),
+                             shape=(self.n_nodes, self.n_nodes))
+
+    def case_table(self):
+        """Case attributes, as written to case_attributes.csv (corpus node order)."""
+        if not self.case_columns:
+            raise ValueError("No case attributes attached to this graph")
+        return pd.DataFrame({'case_id': self.case_ids[:self.n_corpus],
+                             **_decode_table(self.case_columns)})
+
+    def case_records(self):
+        """case_id -> {attribute: value} for every corpus case (built once)."""
+        if self._records is None:
+            self._records = self.case_table().set_index('case_id').to_dict('index')
+        return self._records
+
+    def holding_table(self):
+        """Holding-level citation variables, as written to holding_citation_vars.csv."""
+        if self.holding_case is None:
+            raise ValueError("No holding variables attached to this graph")
+        return pd.DataFrame({'case_id': self.case_ids[np.asarray(self.holding_case)],
+                             **_decode_table(self.holding_columns)})
+
+    def holding_rows(self, case_id):
+        """Rows of the holding table belonging to case_id."""
+        i = self.node(case_id)
+        return self.holding_order[self.holding_indptr[i]:self.holding_indptr[i + 1]]
+
+    def edge_table(self):
+        """Holding-level edge table, as written to citation_edges.csv."""
+        table = {'citing_case': self.case_ids[self.edge_src],
+                 'cited_case': self.case_ids[self.edge_dst]}
+        for name, (kind, values, categories) in self.edge_columns.items():
+            table[name] = _decode_column(kind, values, categories)
+        columns = list(table)
+        if 'citing_holding_id' in columns:
+            # Keep the CSV column order: citing_case, citing_holding_id, cited_case, ...
+            columns.remove('citing_holding_id')
+            columns.insert(1, 'citing_holding_id')
+        return pd.DataFrame(table)[columns]
+
+    def topological_levels(self):
+        """
+        Kahn frontiers: level 0 holds the cases nobody cites, and every case
+        appears after all cases citing it. No edge joins two nodes of the
+        same level. Returns None if the graph has a cycle.
+        """
+        remaining = self.in_degree().copy()
+        frontier = np.flatnonzero(remaining == 0)
+        levels = []
+        while frontier.size:
+            levels.append(frontier)
+            targets = self.indices[gather_rows(self.indptr, frontier)]
+            np.subtract.at(remaining, targets, 1)
+            touched = np.unique(targets)
+            frontier = touched[remaining[touched] == 0]
+        return levels if sum(len(level) for level in levels) == self.n_nodes else None
+
+    def topological_order(self):
+        """
+        Nodes ordered so every citing case precedes the cases it cites, or
+        None if the graph has a cycle.
+        """
+        levels = self.topological_levels()
+        if levels is None:
+            return None
+        return np.concatenate(levels) if levels else np.array([], dtype=np.int64)
+
+    def to_networkx(self, node_attrs=None):
+        """
+        Export to a networkx DiGraph (weight on every edge).
+
+        node_attrs: optional DataFrame indexed by case_id whose columns
+        become node attributes.
+        """
+        import networkx as nx
+
+        G = nx.DiGraph()
+        G.add_nodes_from(self.case_ids)
+        if node_attrs is not None:
+            nx.set_node_attributes(G, node_attrs.to_dict('index'))
+        src = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        G.add_weighted_edges_from(zip(self.case_ids[src], self.case_ids[self.indices],
+                                      self.weight.tolist()))
+        return G
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def _arrays(self):
+        arrays = {
+            'case_ids': _encode_strings(self.case_ids),
+            'indptr': self.indptr, 'indices': self.indices, 'weight': self.weight,
+            'in_indptr': self.in_indptr, 'in_indices': self.in_indices,
+            'in_edges': self.in_edges,
+            'edge_src': self.edge_src, 'edge_dst': self.edge_dst,
+            'edge_pair': self.edge_pair,
+        }
+        if self.holding_case is not None:
+            arrays.update(holding_case=self.holding_case, holding_indptr=self.holding_indptr,
+                          holding_order=self.holding_order)
+        for table, columns in self._tables().items():
+            for name, (kind, values, categories) in columns.items():
+                arrays[f'{table}:{name}'] = np.asarray(values)
+                if kind == 'categorical':
+                    arrays[f'{table}-cat:{name}'] = _encode_strings(categories)
+        return arrays
+
+    def _tables(self):
+        return {'edge': self.edge_columns, 'case': self.case_columns,
+                'holding': self.holding_columns}
+
+    def save(self, path):
+        """Write the graph to a single binary file."""
+        arrays = {name: np.ascontiguousarray(a) for name, a in self._arrays().items()}
+        header = {
+            'format_version': FORMAT_VERSION,
+            'n_nodes': self.n_nodes,
+            'n_corpus': self.n_corpus,
+            'tables': {table: [[name, kind, None if categories is None else len(categories)]
+                               for name, (kind, _, categories) in columns.items()]
+                       for table, columns in self._tables().items()},
+            'arrays': {},
+        }
+
+        # Array offsets depend on the header length, which depends on the
+        # offsets; lay out relative offsets first and pad the header
+        offset = 0
+        for name, a in arrays.items():
+            header['arrays'][name] = [a.dtype.str, list(a.shape), offset]
+            offset += -(-a.nbytes // _ALIGN) * _ALIGN
+        header_bytes = json.dumps(header).encode('utf-8')
+        data_start = -(-(len(_MAGIC) + 8 + len(header_bytes)) // _ALIGN) * _ALIGN
+
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(data_start).tobytes())
+            f.write(header_bytes)
+            for name, a in arrays.items():
+                f.seek(data_start + header['arrays'][name][2])
+                f.write(a.tobytes())
+            f.truncate(data_start + offset)
+
+def load_graph(path, mmap=True):
+    """
+    Load a graph written by CitationGraph.save.
+
+    With mmap=True (default) the arrays are read-only views of a memory map,
+    so the OS page cache is shared by every process loading the same file.
+    Loading the same unchanged file again in one process returns the cached
+    graph object; treat it as read-only.
+    """
+    path = Path(path)
+    stat = path.stat()
+    key = str(path.resolve())
+    cached = _LOADED.get(key)
+    if cached is not None and cached[:3] == (stat.st_mtime_ns, stat.st_size, mmap):
+        return cached[3]
+
+    with open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a citation graph file")
+        data_start = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(data_start - len(_MAGIC) - 8).rstrip(b'\0'))
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"{path} has graph format {header['format_version']}, "
+                         f"expected {FORMAT_VERSION}; rerun 10_citation_network_construction.py")
+
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+
+    arrays = {}
+    for name, (dtype, shape, offset) in header['arrays'].items():
+        dtype = np.dtype(dtype)
+        start = data_start + offset
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays[name] = buffer[start:start + nbytes].view(dtype).reshape(shape)
+
+    tables = {}
+    for table, spec in header['tables'].items():
+        columns = tables[table] = {}
+        for name, kind, n_categories in spec:
+            categories = None
+            if kind == 'categorical':
+                categories = list(_decode_strings(arrays[f'{table}-cat:{name}'], n_categories))
+            columns[name] = (kind, arrays[f'{table}:{name}'], categories)
+
+    graph = CitationGraph(
+        _decode_strings(arrays['case_ids'], header['n_nodes']), header['n_corpus'],
+        arrays['indptr'], arrays['indices'], arrays['weight'],
+        arrays['in_indptr'], arrays['in_indices'], arrays['in_edges'],
+        arrays['edge_src'], arrays['edge_dst'], arrays['edge_pair'], tables['edge'],
+        tables['case'], arrays.get('holding_case'), tables['holding'],
+        arrays.get('holding_indptr'), arrays.get('holding_order'))
+    _LOADED[key] = (stat.st_mtime_ns, stat.st_size, mmap, graph)
+    return graph
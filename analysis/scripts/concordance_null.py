@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+concordance_null.py
+===================
+Degree-preserving, time-respecting null model for citation concordance.
+
+Testing concordance against 50% ignores who cites whom: pro-DS holdings
+make most of the citations and pro-DS cases receive most of them, so many
+"concordant" pairs are expected by degree alone. The null model keeps every
+citing holding's out-degree and every cited case's in-degree and only
+shuffles which holding cites which case:
+
+- rewiring swaps cited endpoints between two citation pairs,
+  (a → b, c → d) becomes (a → d, c → b) (Maslov & Sneppen 2002)
+- a swap is rejected if it would make a case cite a later judgment, cite
+  itself, or cite the same case twice from one holding
+
+Each null graph runs n_sweeps rounds, and each round proposes a random perfect
+matching of the pairs. All swaps of a round are disjoint, so they are
+checked and applied at once over the (graphs x pairs) edge arrays, and a
+whole block of null graphs is rewired together. The block's concordance is
+then rescored with two matrix products against one-hot group indicators
+(overall and per dimension level). Null graphs are the replicates of a
+ResamplingExecutor, so results are bit-identical for any number of workers.
+
+Usage:
+    table, info = concordance_null(pairs_df, case_dates,
+                                   groupings={'citing_chamber': pairs_df['citing_chamber']},
+                                   n_null=10000, executor=executor)
+"""
+
+import numpy as np
+import pandas as pd
+
+from resampling import replicate_rngs, stack_indicators
+
+# =============================================================================
+# REWIRING
+# =============================================================================
+
+def _duplicated(keys):
+    """Mask of entries whose key occurs more than once in the same row."""
+    span = keys.max() + 1 if keys.size else 1
+    flat = (keys + np.arange(len(keys))[:, None] * span).ravel()
+    order = np.argsort(flat)
+    ordered = flat[order]
+    same = ordered[1:] == ordered[:-1]
+    duplicated = np.zeros(len(flat), dtype=bool)
+    duplicated[order[1:][same]] = True
+    duplicated[order[:-1][same]] = True
+    return duplicated.reshape(keys.shape)
+
+def _reject_duplicates(state, unit_keys, swapped, first, second):
+    """
+    Undo accepted swaps that created a duplicate (holding, cited case) pair.
+
+    Undoing a swap can restore a pair that another swap has just created, so
+    the graphs that had a swap undone are checked again until none has.
+    """
+    graphs = np.arange(state.shape[0])
+    while len(graphs):
+        rows = np.arange(len(graphs))[:, None]
+        duplicated = _duplicated(unit_keys + state[graphs])
+        undo = swapped[graphs] & (duplicated[rows, first[graphs]] |
+                                  duplicated[rows, second[graphs]])
+        w, k = np.nonzero(undo)
+        w = graphs[w]
+        i, j = first[w, k], second[w, k]
+        state[w, i], state[w, j] = state[w, j], state[w, i]
+        swapped[w, k] = False
+        graphs = graphs[undo.any(axis=1)]
+    return swapped
+
+def rewire(rngs, citing, cited, unit, node_time, n_sweeps=10):
+    """
+    Degree-preserving, time-respecting rewirings of a set of citation pairs.
+
+    Args:
+        rngs: one generator per null graph
+        citing, cited: node index of the citing and cited case of each pair
+        unit: citing unit of each pair (holding code); degrees are kept per
+            unit and a unit never cites the same case twice
+        node_time: judgment time per node (NaN pins every pair touching it)
+        n_sweeps: rounds of swap proposals (each proposes len(cited) // 2)
+
+    Returns:
+        (rewired, n_accepted): cited node of each pair in each null graph,
+        shape (len(rngs), len(cited)), and accepted swaps per graph
+    """
+    citing, cited = np.asarray(citing), np.asarray(cited)
+    node_time = np.asarray(node_time, dtype=float)
+    n_graphs, n_pairs = len(rngs), len(cited)
+    n_nodes = len(node_time)
+    half = n_pairs // 2
+
+    state = np.tile(cited, (n_graphs, 1))
+    unit_keys = (np.asarray(unit, dtype=np.int64) * n_nodes)[None, :]
+    citing_time = node_time[citing]
+    rows = np.arange(n_graphs)[:, None]
+    n_accepted = np.zeros(n_graphs, dtype=np.int64)
+    if half == 0:
+        return state, n_accepted
+
+    for _ in range(n_sweeps):
+        matching = np.stack([rng.permutation(n_pairs) for rng in rngs])
+        first, second = matching[:, :half], matching[:, half:2 * half]
+        b, d = state[rows, first], state[rows, second]
+
+        swapped = ((b != d)
+                   & (node_time[d] <= citing_time[first])
+                   & (node_time[b] <= citing_time[second])
+                   & (d != citing[first])
+                   & (b != citing[second]))
+        w, k = np.nonzero(swapped)
+        state[w, first[w, k]], state[w, second[w, k]] = d[w, k], b[w, k]
+
+        swapped = _reject_duplicates(state, unit_keys, swapped, first, second)
+        n_accepted += swapped.sum(axis=1)
+    return state, n_accepted
+
+# =============================================================================
+# SCORING
+# =============================================================================
+
+def concordance_counts(cited_rate, citing_pro_ds, indicators):
+    """
+    Classified and concordant pairs per group, for one or many graphs.
+
+    A pair is classified when both directions are known and the cited case
+    is not exactly 50/50; it is concordant when the citing holding is pro-DS
+    exactly when the cited case's pro-DS rate is above one half.
+
+    Args:
+        cited_rate: cited case pro-DS rate per pair, (pairs,) or (graphs x pairs)
+        citing_pro_ds: citing holding direction per pair (NaN when unknown)
+        indicators: (pairs x groups) one-hot group membership
+
+    Returns:
+        (n_classified, n_concordant), each shaped like cited_rate @ indicators
+    """
+    cited_rate = np.asarray(cited_rate, dtype=float)
+    citing_pro_ds = np.asarray(citing_pro_ds, dtype=float)
+    classified = ~np.isnan(cited_rate) & (cited_rate != 0.5) & ~np.isnan(citing_pro_ds)
+    concordant = classified & ((cited_rate > 0.5) == (citing_pro_ds == 1))
+    return classified @ indicators, concordant @ indicators
+
+def _null_block(rep_ids, rngs, citing, cited, unit, node_time, node_rate,
+                citing_pro_ds, indicators, n_sweeps):
+    """Concordance rates of a block of null graphs: one row per graph, one column per group."""
+    rewired, n_accepted = rewire(rngs, citing, cited, unit, node_time, n_sweeps)
+    n_classified, n_concordant = concordance_counts(node_rate[rewired], citing_pro_ds, indicators)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = n_concordant / n_classified
+    changed = (rewired != cited).mean(axis=1)
+    return rates, changed, n_accepted
+
+# =============================================================================
+# NULL MODEL
+# =============================================================================
+
+def concordance_null(pairs, case_dates, groupings=None, n_null=10000, n_sweeps=10,
+                     seed=42, executor=None):
+    """
+    Observed concordance against its degree-preserving rewiring null.
+
+    Args:
+        pairs: citation pairs with citing_case, citing_holding_id, cited_case,
+            citing_pro_ds and cited_pro_ds_rate (build_citation_pairs output);
+            every pair takes part in the rewiring, classified or not
+        case_dates: judgment date per case_id (Series)
+        groupings: dict mapping a dimension name to a label per pair (levels
+            of the citing holding, e.g. concept cluster, chamber or year)
+        n_null: number of null graphs
+        n_sweeps: swap rounds per null graph
+        seed: base seed; null graph i draws from SeedSequence(seed, spawn_key=(i,))
+        executor: optional ResamplingExecutor; null graphs are split across it
+
+    Returns:
+        (table, diagnostics). The table has one row per dimension level (and
+        an 'overall' row): n (classified pairs observed), observed_rate,
+        null_mean, null_sd, z, p_greater (share of null graphs at least as
+        concordant, with the +1 correction) and p_two_sided.
+    """
+    pairs = pairs.reset_index(drop=True)
+    nodes, case_codes = np.unique(np.concatenate([pairs['citing_case'].to_numpy(dtype=object),
+                                                  pairs['cited_case'].to_numpy(dtype=object)]),
+                                  return_inverse=True)
+    citing, cited = case_codes[:len(pairs)], case_codes[len(pairs):]
+    unit, _ = pd.factorize(pd.MultiIndex.from_arrays([pairs['citing_case'],
+                                                      pairs['citing_holding_id']]))
+
+    dates = pd.to_datetime(pd.Series(nodes).map(case_dates), errors='coerce')
+    node_time = (dates - pd.Timestamp(0)).dt.days.to_numpy(dtype=float)
+    node_rate = np.full(len(nodes), np.nan)
+    node_rate[cited] = pd.to_numeric(pairs['cited_pro_ds_rate'], errors='coerce').to_numpy(dtype=float)
+    citing_pro_ds = pd.to_numeric(pairs['citing_pro_ds'], errors='coerce').to_numpy(dtype=float)
+
+    keys, indicators = [('overall', 'all')], np.ones((len(pairs), 1))
+    if groupings:
+        group_keys, group_indicators = stack_indicators(
+            {name: np.asarray(labels, dtype=object) for name, labels in groupings.items()})
+        keys += group_keys
+        indicators = np.hstack([indicators, group_indicators])
+
+    args = (citing, cited, unit, node_time, node_rate, citing_pro_ds, indicators, n_sweeps)
+    if executor is None:
+        null_rates, changed, n_accepted = _null_block(
+            np.arange(n_null), replicate_rngs(seed, range(n_null)), *args)
+    else:
+        null_rates, changed, n_accepted = executor.map_blocks(
+            _null_block, n_null, args=args, seed=seed, label='rewired null graphs')
+
+    n_observed, n_concordant = concordance_counts(node_rate[cited], citing_pro_ds, indicators)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = n_concordant / n_observed
+
+    valid = ~np.isnan(null_rates)
+    n_valid = valid.sum(axis=0)
+    greater = ((null_rates >= observed - 1e-12) & valid).sum(axis=0)
+    less = ((null_rates <= observed + 1e-12) & valid).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        null_mean = np.nanmean(null_rates, axis=0)
+        null_sd = np.nanstd(null_rates, axis=0, ddof=1)
+        z = (observed - null_mean) / null_sd
+        p_greater = (1 + greater) / (1 + n_valid)
+        p_less = (1 + less) / (1 + n_valid)
+
+    table = pd.DataFrame({
+        'dimension': [key[0] for key in keys],
+        'level': [key[1] for key in keys],
+        'n': n_observed.astype(np.int64),
+        'observed_rate': observed,
+        'null_mean': null_mean,
+        'null_sd': null_sd,
+        'z': z,
+        'p_greater': p_greater,
+        'p_two_sided': np.minimum(1.0, 2 * np.minimum(p_greater, p_less)),
+    })
+
+    info = {'n_null': int(n_null), 'n_sweeps': int(n_sweeps), 'seed': seed,
+            'n_pairs': int(len(pairs)), 'n_cases': int(len(nodes)),
+            'mean_swaps_accepted': float(n_accepted.mean()) if n_null else 0.0,
+            'mean_share_rewired': float(changed.mean()) if n_null else 0.0}
+    return table, info
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+glmm.py
+=======
+Random-intercept logistic regression (GLMM) fitted by maximum marginal
+likelihood, for holdings nested in cases (and cases in rapporteurs).
+
+    logit P(y_i = 1) = x_i'beta + sigma_1 u_1[case_i] (+ sigma_2 u_2[rapporteur_i]),
+    u ~ N(0, 1)
+
+The random intercepts are integrated out in the standardized scale u:
+
+- one grouping factor: clusters are independent, so every cluster's
+  integral is approximated at once. A vectorized Newton iteration finds all
+  cluster modes u^_g and curvatures H_g together (bincount sums), and the
+  integral is evaluated by adaptive Gauss-Hermite quadrature with nodes
+  u^_g + sqrt(2 / H_g) x_q (n_quad = 1 is the Laplace approximation). The
+  gradient is exact for the approximation, including the dependence of the
+  mode and the node spacing on the parameters, and reduces to X' times one
+  vector for beta
+- several grouping factors (nested or crossed): one joint Laplace
+  approximation, log L = h(u^) - log det(H) / 2, with the joint mode from
+  dense Newton steps over all random effects and the exact gradient from
+  the leverage diagonal of Z H^-1 Z'
+
+Parameters are theta = (beta, sigma_1^2, ...). The likelihood is even in
+sigma, so its slope in sigma (or log sigma) vanishes as sigma -> 0 and an
+optimizer stalls wherever it gets close; in sigma^2 the slope at zero is
+finite, and a boundary fit (no between-cluster variance) sits at the lower
+bound instead. Every evaluation starts its mode search from the previous
+modes, and fit() takes a previous result as start, so refits inside
+bootstrap and specification loops are warm-started in both the parameters
+and the random effects.
+
+Usage:
+    model = RandomInterceptLogit(spec.X, spec.y, case_ids, n_quad=9,
+                                 columns=spec.columns)
+    laplace = RandomInterceptLogit(spec.X, spec.y, case_ids).fit()
+    result = model.fit(start=laplace)
+    result['params'], result['bse'], result['sigma'], result['llf']
+
+    crossed = RandomInterceptLogit(spec.X, spec.y, [case_ids, rapporteurs])
+    draws = case_bootstrap(model, result, executor=executor)   # (B x theta)
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import minimize
+from scipy.special import expit, logsumexp
+
+from resampling import ResamplingExecutor
+from wild_bootstrap import fit_logit
+
+# Random-intercept variances are kept in this range (sigma from 1e-4 to 20)
+VARIANCE_BOUNDS = (1e-8, 400.0)
+
+N_GLMM_BOOT = 499
+
+# Bootstrap refits with a |slope| beyond this are (quasi-)separated, e.g. a
+# chamber whose resampled cases all went the same way, and are dropped
+SEPARATION_COEF = 10.0
+
+MODE_TOL = 1e-10
+MODE_MAX_ITER = 100
+MAX_NEWTON_STEP = 5.0
+
+# Latent-scale residual variance of the logistic distribution (for the ICC)
+LOGISTIC_VARIANCE = np.pi ** 2 / 3
+
+class RandomInterceptLogit:
+    """
+    Logistic regression with normal random intercepts.
+
+    Args:
+        X: (n x p) fixed-effects design matrix (e.g. ModelSpec.X)
+        y: binary outcome
+        groups: group label per row, or a list of such arrays, one per
+            grouping factor (nested or crossed)
+        n_quad: adaptive Gauss-Hermite nodes per cluster (1 = Laplace);
+            several grouping factors always use the joint Laplace
+            approximation
+        columns: names of the fixed effects (default x0, x1, ...)
+    """
+
+    def __init__(self, X, y, groups, n_quad=1, columns=None):
+        self.X = np.asarray(X, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.n, self.n_fixed = self.X.shape
+        self.columns = list(columns) if columns is not None else [f'x{j}' for j in range(self.n_fixed)]
+
+        if not isinstance(groups, (list, tuple)):
+            groups = [groups]
+        self.codes, self.levels = [], []
+        for labels in groups:
+            codes, levels = pd.factorize(pd.Series(np.asarray(labels, dtype=object)))
+            if (codes < 0).any():
+                raise ValueError("group labels must not be missing")
+            self.codes.append(codes)
+            self.levels.append(list(levels))
+        self.sizes = [len(levels) for levels in self.levels]
+        self.n_factors = len(self.codes)
+
+        if self.n_factors > 1 and n_quad != 1:
+            raise ValueError("adaptive quadrature needs a single grouping factor; use n_quad=1")
+        self.n_quad = n_quad
+        self.nodes, self.weights = np.polynomial.hermite.hermgauss(n_quad)
+        self.log_weights = np.log(self.weights) + self.nodes ** 2
+
+        # Unit incidence of rows in random effects (n x m), factor blocks side by side
+        offsets = np.cumsum([0] + self.sizes)
+        cols = np.concatenate([codes + offsets[f] for f, codes in enumerate(self.codes)])
+        rows = np.tile(np.arange(self.n), self.n_factors)
+        self.Z = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(self.n, offsets[-1]))
+        self.block = np.repeat(np.arange(self.n_factors), self.sizes)
+        self._modes = np.zeros(offsets[-1])
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _split(self, theta):
+        theta = np.asarray(theta, dtype=float)
+        return theta[:self.n_fixed], np.sqrt(theta[self.n_fixed:])
+
+    def _cluster_sum(self, values):
+        """Sums over the rows of each cluster (single factor): (G,) or (G x Q)."""
+        codes, size = self.codes[0], self.sizes[0]
+        if values.ndim == 1:
+            return np.bincount(codes, weights=values, minlength=size)
+        return self.Z.T @ values
+
+    # -------------------------------------------------------------------------
+    # One grouping factor: vectorized adaptive Gauss-Hermite quadrature
+    # -------------------------------------------------------------------------
+
+    def _cluster_modes(self, eta0, sigma):
+        """Modes u^_g and curvatures H_g of every cluster's integrand at once."""
+        codes = self.codes[0]
+        u = self._modes.copy()
+        for _ in range(MODE_MAX_ITER):
+            p = expit(eta0 + sigma * u[codes])
+            gradient = sigma * self._cluster_sum(self.y - p) - u
+            curvature = sigma ** 2 * self._cluster_sum(p * (1 - p)) + 1
+            step = np.clip(gradient / curvature, -MAX_NEWTON_STEP, MAX_NEWTON_STEP)
+            u += step
+            if np.abs(step).max() < MODE_TOL:
+                break
+        p = expit(eta0 + sigma * u[codes])
+        self._modes = u
+        return u, p, sigma ** 2 * self._cluster_sum(p * (1 - p)) + 1
+
+    def _loglike_aghq(self, theta):
+        """Log-likelihood and its exact gradient (one grouping factor)."""
+        beta, (sigma,) = self._split(theta)
+        X, y, codes = self.X, self.y, self.codes[0]
+        eta0 = X @ beta
+
+        u, p, H = self._cluster_modes(eta0, sigma)
+        w = p * (1 - p)
+        dw = w * (1 - 2 * p)
+        Sw, Sdw = self._cluster_sum(w), self._cluster_sum(dw)
+
+        # Quadrature nodes per cluster: (G x Q)
+        c = np.sqrt(2 / H)
+        u_q = u[:, None] + c[:, None] * self.nodes[None, :]
+        eta_q = eta0[:, None] + sigma * u_q[codes]
+        loglik_q = y[:, None] * eta_q - np.logaddexp(0, eta_q)
+        h_q = self._cluster_sum(loglik_q) - u_q ** 2 / 2
+        terms = self.log_weights[None, :] + h_q
+        log_sum = logsumexp(terms, axis=1)
+        llf = float(np.sum(np.log(c) - 0.5 * np.log(2 * np.pi) + log_sum))
+
+        pi = np.exp(terms - log_sum[:, None])               # node weights
+        r_q = y[:, None] - expit(eta_q)
+        R_q = self._cluster_sum(r_q)
+        hu_q = sigma * R_q - u_q
+        A = (pi * hu_q).sum(axis=1)
+        B = (pi * hu_q * self.nodes[None, :]).sum(axis=1)
+        K = -0.5 * (1 + B * c) / H
+
+        # beta: sum_q pi h_beta(u_q) + A du/dbeta + K dH/dbeta, all as X' v
+        v = ((pi[codes] * r_q).sum(axis=1)
+             - A[codes] * sigma * w / H[codes]
+             + K[codes] * (sigma ** 2 * dw - sigma ** 4 * Sdw[codes] * w / H[codes]))
+        grad_beta = X.T @ v
+
+        du_s = u * (1 - sigma ** 2 * Sw) / H
+        dH_s = 2 * sigma ** 2 * Sw + sigma ** 3 * u * Sdw + sigma ** 3 * Sdw * du_s
+        grad_s = np.sum((pi * sigma * u_q * R_q).sum(axis=1) + A * du_s + K * dH_s)
+
+        # d/d sigma^2 = d/d log sigma / (2 sigma^2)
+        return llf, np.r_[grad_beta, grad_s / (2 * sigma ** 2)]
+
+    # -------------------------------------------------------------------------
+    # Several grouping factors: joint Laplace approximation
+    # -------------------------------------------------------------------------
+
+    def _joint_modes(self, eta0, lam):
+        """Joint mode of all random effects and the dense Hessian H."""
+        Z = self.Z
+        u = self._modes.copy()
+        for _ in range(MODE_MAX_ITER):
+            p = expit(eta0 + Z @ (lam * u))
+            L = Z.multiply(lam[None, :]).tocsr()
+            H = (L.T @ L.multiply((p * (1 - p))[:, None])).toarray() + np.eye(len(u))
+            step = np.linalg.solve(H, lam * (Z.T @ (self.y - p)) - u)
+            step = np.clip(step, -MAX_NEWTON_STEP, MAX_NEWTON_STEP)
+            u += step
+            if np.abs(step).max() < MODE_TOL:
+                break
+        p = expit(eta0 + Z @ (lam * u))
+        L = Z.multiply(lam[None, :]).tocsr()
+        H = (L.T @ L.multiply((p * (1 - p))[:, None])).toarray() + np.eye(len(u))
+        self._modes = u
+        return u, p, L, H
+
+    def _loglike_laplace(self, theta):
+        """Log-likelihood and its exact gradient (joint Laplace)."""
+        beta, sigmas = self._split(theta)
+        X, y = self.X, self.y
+        lam = sigmas[self.block]
+        eta0 = X @ beta
+
+        u, p, L, H = self._joint_modes(eta0, lam)
+        w = p * (1 - p)
+        dw = w * (1 - 2 * p)
+        r = y - p
+        eta = eta0 + L @ u
+        _, logdet = np.linalg.slogdet(H)
+        llf = float(np.sum(y * eta - np.logaddexp(0, eta)) - u @ u / 2 - logdet / 2)
+
+        # d eta / d log sigma_f at fixed u, one column per factor (converted
+        # to d / d sigma_f^2 at the end)
+        E = np.column_stack([L[:, self.block == f] @ u[self.block == f]
+                             for f in range(self.n_factors)])
+        direct = np.column_stack([X, E])
+
+        # du^/dtheta = H^-1 h_u,theta
+        h_u_theta = -(L.T @ (w[:, None] * direct))
+        Zr = L.T @ r
+        for f in range(self.n_factors):
+            h_u_theta[:, self.n_fixed + f] += np.where(self.block == f, Zr, 0)
+        du = np.linalg.solve(H, h_u_theta)
+        total = direct + L @ du
+
+        # Leverages: T_i = (L H^-1 L')_ii, and the same restricted to each factor
+        M = np.linalg.solve(H, L.T.toarray())
+        LM = L.multiply(M.T).tocsc()
+        T = np.asarray(LM.sum(axis=1)).ravel()
+
+        score = np.r_[X.T @ r, [r @ E[:, f] for f in range(self.n_factors)]]
+        trace = (dw * T) @ total
+        for f in range(self.n_factors):
+            T_f = np.asarray(LM[:, self.block == f].sum(axis=1)).ravel()
+            trace[self.n_fixed + f] += 2 * (w @ T_f)
+
+        gradient = score - trace / 2
+        gradient[self.n_fixed:] /= 2 * sigmas ** 2
+        return llf, gradient
+
+    # -------------------------------------------------------------------------
+    # Fitting
+    # -------------------------------------------------------------------------
+
+    def loglike(self, theta):
+        """(log-likelihood, gradient) at theta = (beta, sigma_1^2, ...)."""
+        if self.n_factors == 1:
+            return self._loglike_aghq(theta)
+        return self._loglike_laplace(theta)
+
+    def _start(self, start):
+        """Starting theta (and modes) from None, a theta vector or a previous result."""
+        if start is None:
+            beta, _ = fit_logit(self.X, self.y)
+            return np.r_[beta, np.ones(self.n_factors)]
+        if isinstance(start, dict):
+            modes = start.get('modes')
+            if modes is not None and len(modes) == len(self._modes):
+                self._modes = np.array(modes, dtype=float)
+            theta = np.asarray(start['theta'], dtype=float)
+        else:
+            theta = np.asarray(start, dtype=float)
+        if len(theta) < self.n_fixed + self.n_factors:
+            # e.g. a single-factor result starting a crossed model
+            theta = np.r_[theta, np.ones(self.n_fixed + self.n_factors - len(theta))]
+        return theta[:self.n_fixed + self.n_factors]
+
+    def _hessian(self, theta, free, eps=1e-5):
+        """
+        Hessian over the free parameters by central differences of the
+        analytic gradient (variances at their lower bound stay fixed).
+        """
+        hessian = np.empty((len(free), len(free)))
+        modes = self._modes.copy()
+        for a, j in enumerate(free):
+            step = np.zeros(len(theta))
+            step[j] = eps * max(1.0, abs(theta[j]))
+            self._modes = modes.copy()
+            _, up = self.loglike(theta + step)
+            self._modes = modes.copy()
+            _, down = self.loglike(theta - step)
+            hessian[:, a] = (up[free] - down[free]) / (2 * step[j])
+        self._modes = modes
+        return (hessian + hessian.T) / 2
+
+    def fit(self, start=None, maxiter=500, compute_se=True):
+        """
+        Maximize the (approximate) marginal likelihood with L-BFGS-B.
+
+        Args:
+            start: None (ordinary logit, sigma = 1), a theta vector, or a
+                previous fit() result (parameters and random-effect modes)
+            compute_se: also compute standard errors from the observed
+                information (skip inside resampling loops); variances at
+                the lower bound are held fixed there and get no SE
+
+        Returns:
+            dict with params and bse (fixed effects, Series), sigma,
+            variance_se and at_boundary per grouping factor, llf, icc
+            (latent scale), random_effects (sigma * u^ per factor), theta,
+            modes, converged, n_iter, method and n_groups
+        """
+        theta0 = self._start(start)
+
+        def objective(theta):
+            llf, gradient = self.loglike(theta)
+            return -llf, -gradient
+
+        bounds = [(None, None)] * self.n_fixed + [VARIANCE_BOUNDS] * self.n_factors
+        theta0[self.n_fixed:] = np.clip(theta0[self.n_fixed:], *VARIANCE_BOUNDS)
+        opt = minimize(objective, theta0, jac=True, method='L-BFGS-B', bounds=bounds,
+                       options={'maxiter': maxiter, 'gtol': 1e-6})
+        theta = opt.x
+        llf, _ = self.loglike(theta)
+        beta, sigmas = self._split(theta)
+
+        at_bound = theta[self.n_fixed:] <= VARIANCE_BOUNDS[0] * (1 + 1e-6)
+        se = np.full(len(theta), np.nan)
+        if compute_se:
+            free = np.flatnonzero(np.r_[np.ones(self.n_fixed, dtype=bool), ~at_bound])
+            with np.errstate(invalid='ignore'):
+                covariance = np.linalg.pinv(-self._hessian(theta, free))
+                se[free] = np.sqrt(np.diag(covariance))
+
+        offsets = np.cumsum([0] + self.sizes)
+        random_effects = [sigmas[f] * self._modes[offsets[f]:offsets[f + 1]]
+                          for f in range(self.n_factors)]
+        return {
+            'method': 'Laplace' if self.n_quad == 1 else f'AGHQ ({self.n_quad} nodes)',
+            'params': pd.Series(beta, index=self.columns),
+            'bse': pd.Series(se[:self.n_fixed], index=self.columns),
+            'sigma': sigmas,
+            'variance_se': se[self.n_fixed:],
+            'at_boundary': at_bound,
+            'icc': float(np.sum(sigmas ** 2) / (np.sum(sigmas ** 2) + LOGISTIC_VARIANCE)),
+            'llf': float(llf),
+            'random_effects': [pd.Series(re, index=levels)
+                               for re, levels in zip(random_effects, self.levels)],
+            'theta': theta,
+            'modes': self._modes.copy(),
+            'converged': bool(opt.success),
+            'n_iter': int(opt.nit),
+            'n_obs': self.n,
+            'n_groups': list(self.sizes),
+        }
+
+# =============================================================================
+# CASE BOOTSTRAP
+# =============================================================================
+
+def _case_bootstrap_block(rep_ids, rngs, X, y, cluster_rows, n_quad, theta, modes, slopes):
+    """Executor block: refit on resampled cases, warm-started from the full fit."""
+    n_clusters = len(cluster_rows)
+    sizes = np.array([len(rows) for rows in cluster_rows])
+    draws = np.full((len(rep_ids), len(theta)), np.nan)
+    for b, rng in enumerate(rngs):
+        drawn = rng.integers(0, n_clusters, n_clusters)
+        rows = np.concatenate([cluster_rows[g] for g in drawn])
+        if not np.all(np.any(X[rows] != 0, axis=0)):
+            continue  # a design column vanished (e.g. no case of one chamber)
+        # Resampled copies of a case are distinct clusters
+        groups = np.repeat(np.arange(n_clusters), sizes[drawn])
+        model = RandomInterceptLogit(X[rows], y[rows], groups, n_quad=n_quad)
+        result = model.fit(start={'theta': theta, 'modes': modes[drawn]}, compute_se=False)
+        separated = np.abs(result['params'].values[slopes]).max(initial=0) > SEPARATION_COEF
+        if result['converged'] and not separated:
+            draws[b] = result['theta']
+    return draws
+
+def case_bootstrap(model, result, n_boot=N_GLMM_BOOT, seed=42, executor=None):
+    """
+    Case (cluster) bootstrap of a single-factor fit.
+
+    Cases are resampled with replacement and every replicate is refitted
+    starting from result's parameters and the drawn cases' modes, so a
+    replicate needs only a few optimizer iterations.
+
+    Returns:
+        (n_boot x len(theta)) array of (beta, sigma^2) draws; NaN rows for
+        replicates that are not estimable, (quasi-)separated or do not
+        converge
+    """
+    if model.n_factors != 1:
+        raise ValueError("the case bootstrap resamples a single grouping factor")
+    executor = executor or ResamplingExecutor(n_workers=1)
+    codes = model.codes[0]
+    cluster_rows = [np.flatnonzero(codes == g) for g in range(model.sizes[0])]
+    slopes = np.array([column != 'Intercept' for column in model.columns])
+    return executor.map_blocks(_case_bootstrap_block, n_boot,
+                               args=(model.X, model.y, cluster_rows, model.n_quad,
+                                     result['theta'], result['modes'], slopes),
+                               seed=seed, label='GLMM case bootstrap')
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+influence_cascades.py
+=====================
+Monte Carlo influence cascades over the citation DAG.
+
+Pro-data-subject reasoning is modelled as spreading from a cited case to
+the cases citing it (against the citing → cited edge direction). Two
+classic diffusion models are supported:
+
+1. Independent cascade: each citation edge transmits with probability p_e
+2. Linear threshold: a case adopts once the transmission weight of its
+   active precedents reaches a uniform random threshold
+
+Both are simulated as "live-edge" worlds (Kempe, Kleinberg & Tardos 2003):
+a world fixes every edge coin (or every threshold) up front, and because
+the graph is acyclic the final active set of every seed follows in one pass
+over the topological levels, cited cases first. All seeds share the same
+worlds (common random numbers), so differences between seeds are not
+simulation noise. Worlds are the replicates of a ResamplingExecutor, so
+results are bit-identical for any number of workers.
+
+Edge probabilities come from the holding-level concordance used by
+17_citation_concordance_analysis: when a holding cites a pro-DS case
+(pro_ds_rate > 0.5), a pro-DS holding is a transmission (CONCORDANT_PRO_DS)
+and any other holding a failure (DISCORDANT_CITED_PRO_DS). Per-edge rates
+are shrunk towards the pooled rate with a beta prior.
+
+Usage:
+    p, info = edge_transmission_probabilities(G, cited_pro_ds_rate)
+    table, info = simulate_cascades(G, p, model='independent_cascade',
+                                    n_sims=10000, executor=executor)
+"""
+
+import numpy as np
+import pandas as pd
+
+from citation_graph import row_groups
+from reachability import ReachabilityIndex
+from resampling import replicate_rngs
+
+MODELS = ('independent_cascade', 'linear_threshold')
+
+# Upper bound on the elements of one (edges x seeds x worlds) work array
+_BATCH_ELEMENTS = 4_000_000
+
+# =============================================================================
+# EDGE PROBABILITIES
+# =============================================================================
+
+def edge_transmission_probabilities(graph, cited_pro_ds_rate, prior_strength=2.0):
+    """
+    Transmission probability of every case-level edge (CSR order).
+
+    Args:
+        graph: CitationGraph with a holding-level 'citing_pro_ds' edge column
+        cited_pro_ds_rate: pro-DS rate per node (NaN when unknown)
+        prior_strength: pseudo-observations m of the beta prior centred on
+            the pooled rate p0; p_e = (k_e + m * p0) / (n_e + m)
+
+    Returns:
+        (probabilities, diagnostics)
+    """
+    citing_pro_ds = pd.to_numeric(graph.edge_table()['citing_pro_ds'], errors='coerce').values
+    cited_rate = np.asarray(cited_pro_ds_rate, dtype=float)[np.asarray(graph.edge_dst)]
+
+    observed = (cited_rate > 0.5) & ~np.isnan(citing_pro_ds)
+    pairs = np.asarray(graph.edge_pair)[observed]
+    transmitted = (citing_pro_ds[observed] == 1).astype(float)
+
+    trials = np.bincount(pairs, minlength=graph.n_edges).astype(float)
+    successes = np.bincount(pairs, weights=transmitted, minlength=graph.n_edges)
+    if trials.sum() == 0:
+        raise ValueError("No citations of pro-DS cases to estimate transmission from")
+
+    p0 = successes.sum() / trials.sum()
+    probabilities = (successes + prior_strength * p0) / (trials + prior_strength)
+
+    info = {
+        'pooled_rate': float(p0),
+        'prior_strength': prior_strength,
+        'n_pairs': int(observed.sum()),
+        'n_transmitted': int(transmitted.sum()),
+        'n_edges': int(graph.n_edges),
+        'n_edges_observed': int((trials > 0).sum()),
+    }
+    return probabilities, info
+
+def threshold_weights(graph, probabilities):
+    """
+    Linear-threshold weights: each case's incoming influence weights are its
+    edge probabilities, rescaled where they would sum to more than one.
+    """
+    rows = np.repeat(np.arange(graph.n_nodes), np.diff(np.asarray(graph.indptr)))
+    totals = np.bincount(rows, weights=probabilities, minlength=graph.n_nodes)
+    return probabilities / np.maximum(totals[rows], 1.0)
+
+# =============================================================================
+# SIMULATION
+# =============================================================================
+
+def _cascade_block(rep_ids, rngs, n, indices, weights, groups, seeds, model):
+    """
+    Cascade sizes for a block of worlds: one row per world, one column per seed.
+
+    groups holds (positions, rows, starts) for each topological level, cited
+    cases first, so every precedent is final before its citers are reduced.
+    """
+    n_seeds, n_edges = len(seeds), len(weights)
+    batch = max(1, _BATCH_ELEMENTS // (max(n_edges, n, 1) * n_seeds))
+    sizes = np.empty((len(rngs), n_seeds), dtype=np.int64)
+
+    for lo in range(0, len(rngs), batch):
+        block = rngs[lo:lo + batch]
+        if model == 'independent_cascade':
+            live = np.stack([rng.random(n_edges) < weights for rng in block], axis=1)
+        else:
+            # Thresholds in (0, 1], so a case with no active precedent never adopts
+            thresholds = np.stack([1.0 - rng.random(n) for rng in block], axis=1)
+
+        active = np.zeros((n, n_seeds, len(block)), dtype=bool)
+        active[seeds, np.arange(n_seeds), :] = True
+
+        for positions, rows, starts in groups:
+            precedent = active[indices[positions]]
+            if model == 'independent_cascade':
+                reached = np.logical_or.reduceat(precedent & live[positions][:, None, :],
+                                                 starts, axis=0)
+            else:
+                pressure = np.add.reduceat(precedent * weights[positions][:, None, None],
+                                           starts, axis=0)
+                reached = pressure >= thresholds[rows][:, None, :]
+            active[rows] |= reached
+
+        sizes[lo:lo + len(block)] = active.sum(axis=0).T - 1
+    return sizes
+
+def simulate_cascades(graph, probabilities, seeds=None, model='independent_cascade',
+                      n_sims=10000, seed=42, executor=None):
+    """
+    Expected cascade size of every seed case.
+
+    Args:
+        graph: acyclic CitationGraph
+        probabilities: transmission probability per case-level edge (CSR order)
+        seeds: node indices to seed (default: every node)
+        model: 'independent_cascade' or 'linear_threshold'
+        n_sims: number of simulated worlds
+        seed: base seed; world i draws from SeedSequence(seed, spawn_key=(i,))
+        executor: optional ResamplingExecutor; worlds are split across it
+
+    Returns:
+        (table, diagnostics). The table has one row per seed case, sorted by
+        expected cascade size: expected_cascade_size (cases adopting besides
+        the seed), cascade_se (Monte Carlo standard error), p_spread
+        (probability of at least one adoption), reachable (descendants, the
+        largest possible cascade) and influence_score (expected size as a
+        share of the other cases).
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown cascade model: {model}")
+    levels = graph.topological_levels()
+    if levels is None:
+        raise ValueError("Cascade simulation requires an acyclic citation graph")
+
+    n = graph.n_nodes
+    seeds = np.arange(n) if seeds is None else np.asarray(seeds, dtype=np.int64)
+    indptr, indices = np.asarray(graph.indptr), np.asarray(graph.indices)
+    probabilities = np.asarray(probabilities, dtype=float)
+    weights = probabilities if model == 'independent_cascade' else threshold_weights(graph, probabilities)
+
+    groups = [group for group in (row_groups(indptr, level) for level in reversed(levels))
+              if len(group[1])]
+    args = (n, indices, weights, groups, seeds, model)
+    if executor is None:
+        sizes = _cascade_block(np.arange(n_sims), replicate_rngs(seed, range(n_sims)), *args)
+    else:
+        sizes = executor.map_blocks(_cascade_block, n_sims, args=args, seed=seed,
+                                    label=f'{model} worlds')
+
+    expected = sizes.mean(axis=0)
+    se = sizes.std(axis=0, ddof=1) / np.sqrt(n_sims) if n_sims > 1 else np.full(len(seeds), np.nan)
+    reachable = ReachabilityIndex(graph).cascade_sizes()[seeds]
+
+    table = pd.DataFrame({
+        'case_id': graph.case_ids[seeds],
+        'expected_cascade_size': expected,
+        'cascade_se': se,
+        'p_spread': (sizes > 0).mean(axis=0),
+        'reachable': reachable,
+        'influence_score': expected / max(n - 1, 1),
+    }).sort_values(['expected_cascade_size', 'case_id'], ascending=[False, True])
+
+    info = {'model': model, 'n_sims': int(n_sims), 'seed': seed, 'n_seeds': int(len(seeds)),
+            'n_nodes': int(n), 'n_edges': int(graph.n_edges), 'n_levels': len(levels),
+            'max_cascade_se': float(np.nanmax(se)) if len(se) else float('nan')}
+    return table.reset_index(drop=True), info
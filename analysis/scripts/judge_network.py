@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+judge_network.py
+================
+Sparse judge co-occurrence network shared by the judicial-stage scripts.
+
+Panels are stored as a case x judge incidence matrix B (one row per case,
+B[c, j] = 1 when judge j sat on case c). Every co-occurrence count is then a
+single sparse product:
+
+- C = BᵀB: cases judges i and j decided together; the diagonal holds each
+  judge's number of cases
+- C_w = Bᵀ diag(w) B: weighted co-sitting, e.g. w = holdings per case
+- per-year layers: BᵀB over the cases of one year
+
+Network statistics come from the binary adjacency A (off-diagonal C > 0):
+degrees are row counts, strengths are row sums of C, and triangles per judge
+are diag(A³)/2 = rowsum((A @ A) ∘ A)/2, so no step is quadratic in Python.
+
+10_judicial_data_preparation saves every variant in one binary .npz file
+(CSR arrays plus judge names) instead of a dense CSV.
+
+Usage:
+    judges, B = panel_incidence(cases)
+    network = cooccurrence_network(B, judges, case_weights={'holdings': w},
+                                   case_years=years)
+    save_cooccurrence(network, OUTPUT_PATH / COOCCURRENCE_FILENAME)
+
+    network = load_cooccurrence(OUTPUT_PATH / COOCCURRENCE_FILENAME)
+    stats = network_statistics(network['matrices']['cases'])
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+COOCCURRENCE_FILENAME = "judge_cooccurrence.npz"
+
+# =============================================================================
+# CONSTRUCTION
+# =============================================================================
+
+def panel_incidence(cases, judges=None):
+    """
+    Case x judge incidence matrix (CSR, int64) from case records.
+
+    Args:
+        cases: case dicts with a 'judges' list
+        judges: judge names in column order (default: sorted unique judges);
+            judges not listed are ignored
+
+    Returns:
+        (judges, B) with B[c, j] = 1 when judge j sat on case c
+    """
+    panels = [case.get('judges', []) or [] for case in cases]
+    if judges is None:
+        judges = sorted({judge for panel in panels for judge in panel})
+    judge_to_idx = {judge: i for i, judge in enumerate(judges)}
+
+    rows = np.repeat(np.arange(len(panels)), [len(panel) for panel in panels])
+    cols = np.array([judge_to_idx.get(judge, -1) for panel in panels for judge in panel],
+                    dtype=np.int64)
+    known = cols >= 0
+
+    B = sp.csr_matrix((np.ones(known.sum(), dtype=np.int64), (rows[known], cols[known])),
+                      shape=(len(panels), len(judges)))
+    B.data[:] = 1  # a judge listed twice still sat once
+    return list(judges), B
+
+def cooccurrence(B, weights=None):
+    """Bᵀ diag(weights) B: (weighted) co-sitting counts, diagonal = own cases."""
+    if weights is None:
+        return (B.T @ B).tocsr()
+    weights = np.asarray(weights)
+    weighted = sp.diags(weights, dtype=np.result_type(weights, B.dtype)) @ B
+    return (weighted.T @ B).tocsr()
+
+def cooccurrence_network(B, judges, case_weights=None, case_years=None):
+    """
+    All co-occurrence variants of one incidence matrix.
+
+    Args:
+        B: case x judge incidence (panel_incidence)
+        judges: judge names (columns of B)
+        case_weights: dict mapping a variant name to a weight per case
+        case_years: year per case (0 or negative when unknown); adds one
+            'year_<YYYY>' layer per year
+
+    Returns:
+        dict with 'judges' and 'matrices' (variant name -> CSR matrix);
+        'cases' is the unweighted count matrix
+    """
+    matrices = {'cases': cooccurrence(B)}
+    for name, weights in (case_weights or {}).items():
+        matrices[name] = cooccurrence(B, weights)
+
+    if case_years is not None:
+        case_years = np.asarray(case_years)
+        for year in np.unique(case_years[case_years > 0]):
+            matrices[f'year_{int(year)}'] = cooccurrence(B[case_years == year])
+
+    for matrix in matrices.values():
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+    return {'judges': list(judges), 'matrices': matrices}
+
+# =============================================================================
+# STORAGE
+# =============================================================================
+
+def save_cooccurrence(network, path):
+    """Save judge names and every co-occurrence matrix as CSR arrays in one .npz."""
+    arrays = {'judges': np.array(network['judges'], dtype=str),
+              'variants': np.array(list(network['matrices']), dtype=str)}
+    for name, matrix in network['matrices'].items():
+        arrays[f'{name}/indptr'] = matrix.indptr
+        arrays[f'{name}/indices'] = matrix.indices
+        arrays[f'{name}/data'] = matrix.data
+    np.savez(path, **arrays)
+
+def load_cooccurrence(path):
+    """Inverse of save_cooccurrence."""
+    with np.load(path) as stored:
+        judges = [str(judge) for judge in stored['judges']]
+        n = len(judges)
+        matrices = {
+            str(name): sp.csr_matrix((stored[f'{name}/data'], stored[f'{name}/indices'],
+                                      stored[f'{name}/indptr']), shape=(n, n))
+            for name in stored['variants']
+        }
+    return {'judges': judges, 'matrices': matrices}
+
+# =============================================================================
+# NETWORK STATISTICS
+# =============================================================================
+
+def network_statistics(C):
+    """
+    Degree, strength, triangle and clustering statistics of a co-occurrence matrix.
+
+    Returns:
+        dict of per-judge arrays: degree (distinct co-panelists), strength
+        (co-sittings with others), cases (diagonal), triangles and
+        clustering (local clustering coefficient, NaN below degree 2), plus
+        scalars n_edges, density and avg_clustering (over judges with
+        degree >= 2)
+    """
+    C = sp.csr_matrix(C)
+    n = C.shape[0]
+    diagonal = C.diagonal()
+    off_diagonal = C.copy()
+    off_diagonal.setdiag(0)
+    off_diagonal.eliminate_zeros()
+
+    A = off_diagonal.copy()
+    A.data = np.ones_like(A.data, dtype=np.int64)
+
+    degree = np.diff(A.indptr)
+    strength = np.asarray(off_diagonal.sum(axis=1)).ravel()
+    triangles = np.asarray((A @ A).multiply(A).sum(axis=1)).ravel() // 2
+
+    possible = degree * (degree - 1) // 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clustering = np.where(degree >= 2, triangles / possible, np.nan)
+
+    n_edges = int(A.nnz // 2)
+    max_edges = n * (n - 1) // 2
+    eligible = degree >= 2
+    return {
+        'degree': degree,
+        'strength': strength,
+        'cases': diagonal,
+        'triangles': triangles,
+        'clustering': clustering,
+        'n_edges': n_edges,
+        'n_triangles': int(triangles.sum() // 3),
+        'density': n_edges / max_edges if max_edges > 0 else 0,
+        'avg_clustering': float(clustering[eligible].mean()) if eligible.any() else 0,
+    }
+
+def strongest_pairs(C, k=10):
+    """
+    The k judge pairs with the largest off-diagonal counts.
+
+    Returns (i, j, count) arrays with i < j, ordered by count and then by
+    (i, j).
+    """
+    upper = sp.triu(sp.csr_matrix(C), k=1).tocoo()
+    keep = upper.data > 0
+    i, j, count = upper.row[keep], upper.col[keep], upper.data[keep]
+    order = np.lexsort((j, i, -count))[:k]
+    return i[order], j[order], count[order]
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+judge_tenure.py
+===============
+Judge-tenure interval index: which judges were at the Court (or sat in a
+given chamber) on a given date.
+
+The panel data only say who sat on each case, so "judge did not sit" and
+"judge was not at the Court yet / any more" look the same. Tenure is read
+off the compositions in cases_metadata.json: each judge's observed tenure
+is the interval from their first to their last sitting, and each
+(judge, chamber) pair gets the same kind of interval over the sittings in
+that chamber (Grand Chamber and full Court sittings draw on the whole Court
+and are not counted as chamber membership). Observed tenure is a lower
+bound on the real term of office, so a judge is never out of office on a
+case they sat on.
+
+Intervals are kept sorted by start date, so a stabbing query (who was
+active on date D) is one binary search for the intervals that started by D
+followed by a check of their end dates. Many dates are answered at once as
+a (dates x judges) boolean matrix, and active counts per date come from two
+binary searches over the sorted start and end dates.
+
+Usage:
+    sittings = load_sittings()
+    tenure = judge_tenure(sittings)
+    tenure.active_on('2022-10-27')                 # judges in office
+    eligible = tenure.active(holding_dates)        # (holdings x judges)
+    court_size = tenure.n_active(holding_dates)    # per-case denominators
+
+    chambers = chamber_tenure(sittings)
+    chambers.active_on('2022-10-27')               # (judge, chamber) pairs
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+CASES_METADATA = PROJECT_ROOT / "data" / "metadata" / "cases_metadata.json"
+
+# Sittings that draw on the whole Court rather than on one chamber
+PLENARY_CHAMBERS = {'GRAND_CHAMBER', 'FULL_COURT'}
+
+def _chamber_code(name):
+    """Chamber names as in cases.json ('Grand' -> 'GRAND_CHAMBER', 'First' -> 'FIRST')."""
+    code = str(name or '').strip().upper().replace(' ', '_')
+    return {'GRAND': 'GRAND_CHAMBER', 'FULL': 'FULL_COURT'}.get(code, code)
+
+def _to_days(dates):
+    """Dates (strings, datetimes or datetime64) as datetime64[D]; unparseable -> NaT."""
+    try:
+        return np.atleast_1d(np.asarray(dates, dtype='datetime64[D]'))
+    except (ValueError, TypeError):
+        values = pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(dates, dtype=object))),
+                                errors='coerce')
+        return values.to_numpy(dtype='datetime64[D]')
+
+# =============================================================================
+# SITTINGS
+# =============================================================================
+
+def load_sittings(path=CASES_METADATA):
+    """
+    One row per (case, judge) sitting from the cases_metadata.json compositions.
+
+    Returns:
+        DataFrame with case_number, date (datetime64), chamber (cases.json
+        codes), judge and is_rapporteur; cases without a composition or a
+        date are skipped
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        cases = json.load(f).get('cases', [])
+
+    rows = []
+    for case in cases:
+        composition = case.get('composition') or {}
+        if not case.get('caseDate'):
+            continue
+        for judge in composition.get('judges', []) or []:
+            rows.append({
+                'case_number': case.get('caseNumber', ''),
+                'date': case['caseDate'],
+                'chamber': _chamber_code(composition.get('chamber')),
+                'judge': judge,
+                'is_rapporteur': judge == composition.get('judgeRapporteur'),
+            })
+
+    sittings = pd.DataFrame(rows, columns=['case_number', 'date', 'chamber', 'judge',
+                                           'is_rapporteur'])
+    sittings['date'] = pd.to_datetime(sittings['date'], errors='coerce')
+    return sittings.dropna(subset=['date']).reset_index(drop=True)
+
+# =============================================================================
+# INTERVAL INDEX
+# =============================================================================
+
+class TenureIndex:
+    """
+    Closed intervals [start, end] per key (a judge, or a (judge, chamber) pair).
+
+    Args:
+        keys: one key per interval
+        starts, ends: first and last day of each interval
+    """
+
+    def __init__(self, keys, starts, ends):
+        starts, ends = _to_days(starts), _to_days(ends)
+        order = np.argsort(starts, kind='stable')
+        self.keys = [keys[i] for i in order]
+        self.starts, self.ends = starts[order], ends[order]
+        self._sorted_ends = np.sort(self.ends)
+        self._position = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_sittings(cls, keys, dates):
+        """Intervals spanning the first to last date of each key's sittings."""
+        frame = pd.DataFrame({'key': list(keys), 'date': _to_days(dates)}).dropna()
+        spans = frame.groupby('key', sort=True)['date'].agg(['min', 'max'])
+        return cls(list(spans.index), spans['min'].to_numpy(), spans['max'].to_numpy())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._position
+
+    def position(self, key):
+        """Column of key in active()."""
+        return self._position[key]
+
+    def interval(self, key):
+        """(start, end) of key's interval."""
+        i = self._position[key]
+        return self.starts[i], self.ends[i]
+
+    def active_on(self, date):
+        """Keys whose interval contains date (stabbing query)."""
+        day = _to_days(date)[0]
+        if np.isnat(day):
+            return []
+        started = np.searchsorted(self.starts, day, side='right')
+        hits = np.nonzero(self.ends[:started] >= day)[0]
+        return [self.keys[i] for i in hits]
+
+    def active(self, dates, keys=None):
+        """
+        Boolean (dates x keys) matrix: interval of key contains date.
+
+        Columns follow self.keys, or keys when given (False for keys with no
+        interval); NaT dates are inside no interval.
+        """
+        if keys is None:
+            starts, ends = self.starts, self.ends
+        else:
+            missing = np.datetime64('NaT', 'D')
+            starts = np.array([self.starts[self._position[k]] if k in self._position else missing
+                               for k in keys], dtype='datetime64[D]')
+            ends = np.array([self.ends[self._position[k]] if k in self._position else missing
+                             for k in keys], dtype='datetime64[D]')
+        days = _to_days(dates)[:, None]
+        return (starts[None, :] <= days) & (days <= ends[None, :])
+
+    def n_active(self, dates):
+        """Number of intervals containing each date (started minus already ended)."""
+        days = _to_days(dates)
+        started = np.searchsorted(self.starts, days, side='right')
+        ended = np.searchsorted(self._sorted_ends, days, side='left')
+        return np.where(np.isnat(days), 0, started - ended)
+
+    def table(self):
+        """Intervals as a DataFrame (key, start, end, days)."""
+        return pd.DataFrame({'key': self.keys, 'start': self.starts, 'end': self.ends,
+                             'days': (self.ends - self.starts).astype(np.int64) + 1})
+
+def judge_tenure(sittings):
+    """Observed tenure at the Court per judge (first to last sitting)."""
+    return TenureIndex.from_sittings(sittings['judge'], sittings['date'])
+
+def chamber_tenure(sittings):
+    """Observed tenure per (judge, chamber), from chamber (non-plenary) sittings."""
+    chamber = sittings[~sittings['chamber'].isin(PLENARY_CHAMBERS) & (sittings['chamber'] != '')]
+    keys = list(zip(chamber['judge'], chamber['chamber']))
+    return TenureIndex.from_sittings(keys, chamber['date'])
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+mantel_haenszel.py
+==================
+Vectorized Mantel-Haenszel odds ratios for many exposures and
+stratifications at once.
+
+Exposure levels (e.g. every rapporteur, each compared with the rest) and
+strata (e.g. year, concept cluster, chamber) are encoded as integer codes,
+and every stratum's 2x2 table for every exposure level comes from one
+bincount over (stratification, stratum, level, outcome) codes:
+
+- a, b: exposed pro-DS / other, counted directly
+- c, d: stratum pro-DS / other totals minus a and b
+
+The resulting (stratifications x levels x strata) arrays give, in a few
+array expressions:
+
+- the MH pooled odds ratio ΣR / ΣS, with R = ad/n and S = bc/n
+- the Robins-Breslow-Greenland variance of log(OR_MH) and its CI and Wald p
+- the Breslow-Day test of a common odds ratio (with Tarone's correction),
+  with the expected exposed count per stratum from the closed-form root of
+  the conditional quadratic
+
+Usage:
+    results = mantel_haenszel_tests(
+        [h['judge_rapporteur'] for h in holdings],
+        [h['pro_ds'] for h in holdings],
+        {'year': years, 'concept_cluster': clusters, 'chamber': chambers})
+    results[('L.S. Rossi', 'year')]['mh_or']
+"""
+
+import numpy as np
+from scipy import stats
+
+# =============================================================================
+# ENCODING AND TABLES
+# =============================================================================
+
+def _is_missing(value):
+    return value is None or value != value or value == ''
+
+def encode(values, missing=None):
+    """
+    Integer codes (first-appearance order) and levels of a label vector.
+
+    Missing labels get code -1 when missing is None, otherwise they are
+    encoded as the label `missing` (so they form a level of their own).
+    """
+    index = {}
+    codes = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if _is_missing(value):
+            if missing is None:
+                codes[i] = -1
+                continue
+            value = missing
+        codes[i] = index.setdefault(value, len(index))
+    return codes, list(index)
+
+def stratified_tables(exposure, y, strata, n_levels):
+    """
+    One-vs-rest 2x2 tables of every exposure level within every stratum.
+
+    Args:
+        exposure: level code per observation (-1: no level, always unexposed)
+        y: binary outcome per observation
+        strata: (n x M) stratum codes, one column per stratification
+            (codes 0 .. S_m - 1)
+        n_levels: number of exposure levels K
+
+    Returns:
+        (a, b, c, d), each (M x K x S) with S the largest stratum count;
+        padding strata are empty tables
+    """
+    exposure = np.asarray(exposure, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    strata = np.asarray(strata, dtype=np.int64).reshape(len(y), -1)
+    n_strat = strata.shape[1]
+    n_strata = int(strata.max()) + 1 if strata.size else 1
+
+    # Stratum outcome totals: (M x S x 2)
+    stratum_key = np.arange(n_strat)[None, :] * n_strata + strata
+    totals = np.bincount((stratum_key * 2 + y[:, None]).ravel(),
+                         minlength=n_strat * n_strata * 2).reshape(n_strat, n_strata, 2)
+
+    # Exposed counts: (M x K x S x 2)
+    exposed = exposure >= 0
+    key = ((np.arange(n_strat)[None, :] * n_levels + exposure[:, None]) * n_strata
+           + strata) * 2 + y[:, None]
+    counts = np.bincount(key[exposed].ravel(),
+                         minlength=n_strat * n_levels * n_strata * 2
+                         ).reshape(n_strat, n_levels, n_strata, 2)
+
+    a, b = counts[..., 1], counts[..., 0]
+    c = totals[:, None, :, 1] - a
+    d = totals[:, None, :, 0] - b
+    return a, b, c, d
+
+# =============================================================================
+# MANTEL-HAENSZEL AND BRESLOW-DAY
+# =============================================================================
+
+def mantel_haenszel(a, b, c, d, alpha=0.05):
+    """
+    MH pooled odds ratio over the last axis (strata), with RBG variance.
+
+    Returns:
+        dict of arrays over the leading axes: mh_or, ci_low, ci_high,
+        se_log_or, z, p_value and n_strata (strata with both exposed and
+        unexposed observations). The OR is NaN when ΣR or ΣS is zero.
+    """
+    a, b, c, d = (np.asarray(x, dtype=float) for x in (a, b, c, d))
+    n = a + b + c + d
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        P = np.where(n > 0, (a + d) / n, 0)
+        Q = np.where(n > 0, (b + c) / n, 0)
+        R = np.where(n > 0, a * d / n, 0)
+        S = np.where(n > 0, b * c / n, 0)
+
+        R_sum, S_sum = R.sum(axis=-1), S.sum(axis=-1)
+        mh_or = R_sum / S_sum
+        var_log_or = ((P * R).sum(axis=-1) / (2 * R_sum ** 2)
+                      + (P * S + Q * R).sum(axis=-1) / (2 * R_sum * S_sum)
+                      + (Q * S).sum(axis=-1) / (2 * S_sum ** 2))
+        valid = (R_sum > 0) & (S_sum > 0)
+        mh_or = np.where(valid, mh_or, np.nan)
+        se = np.where(valid, np.sqrt(var_log_or), np.nan)
+
+        z_crit = stats.norm.ppf(1 - alpha / 2)
+        log_or = np.log(mh_or)
+        z = log_or / se
+        ci_low, ci_high = np.exp(log_or - z_crit * se), np.exp(log_or + z_crit * se)
+
+    return {
+        'mh_or': mh_or,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'se_log_or': se,
+        'z': z,
+        'p_value': 2 * stats.norm.sf(np.abs(z)),
+        'n_strata': ((a + b > 0) & (c + d > 0)).sum(axis=-1),
+    }
+
+def _expected_exposed(n1, n0, m1, odds_ratio):
+    """
+    E[a] per stratum under a common odds ratio (conditional on the margins).
+
+    Solves a(n0 - m1 + a) = OR (n1 - a)(m1 - a) for the root inside
+    [max(0, m1 - n0), min(n1, m1)].
+    """
+    A = 1 - odds_ratio
+    B = n0 - m1 + odds_ratio * (n1 + m1)
+    C = -odds_ratio * n1 * m1
+    low, high = np.maximum(0, m1 - n0), np.minimum(n1, m1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(np.maximum(B ** 2 - 4 * A * C, 0))
+        first, second = (-B + root) / (2 * A), (-B - root) / (2 * A)
+        linear = -C / B
+    inside = (first >= low - 1e-9) & (first <= high + 1e-9)
+    quadratic = np.where(inside, first, second)
+    return np.where(np.abs(A) < 1e-12, linear, quadratic)
+
+def breslow_day(a, b, c, d, odds_ratio):
+    """
+    Breslow-Day test of a common odds ratio across strata (Tarone-corrected).
+
+    Args:
+        a, b, c, d: stratum tables (..., S)
+        odds_ratio: common odds ratio per leading index (usually the MH OR)
+
+    Returns:
+        (chi2, df, p_value) over the leading axes; df is the number of
+        strata with a non-degenerate table minus one (NaN below two strata)
+    """
+    a, b, c, d = (np.asarray(x, dtype=float) for x in (a, b, c, d))
+    odds_ratio = np.asarray(odds_ratio, dtype=float)[..., None]
+    n1, n0, m1 = a + b, c + d, a + c
+
+    expected = _expected_exposed(n1, n0, m1, odds_ratio)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = 1 / (1 / expected + 1 / (n1 - expected) + 1 / (m1 - expected)
+                        + 1 / (n0 - m1 + expected))
+    informative = (n1 > 0) & (n0 > 0) & (m1 > 0) & (n1 + n0 - m1 > 0) & (variance > 0)
+    informative &= ~np.isnan(odds_ratio)
+
+    residual = np.where(informative, a - expected, 0)
+    variance = np.where(informative, variance, 1)
+    chi2 = (residual ** 2 / variance).sum(axis=-1)
+    var_sum = np.where(informative, variance, 0).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = chi2 - np.where(var_sum > 0, residual.sum(axis=-1) ** 2 / var_sum, 0)
+
+    df = informative.sum(axis=-1) - 1
+    chi2 = np.where(df >= 1, chi2, np.nan)
+    p_value = np.where(df >= 1, stats.chi2.sf(chi2, np.maximum(df, 1)), np.nan)
+    return chi2, np.where(df >= 1, df, np.nan), p_value
+
+# =============================================================================
+# ALL EXPOSURES x ALL STRATIFICATIONS
+# =============================================================================
+
+def mantel_haenszel_tests(exposure, y, stratifications, alpha=0.05):
+    """
+    MH odds ratios, RBG CIs and Breslow-Day tests for every exposure level
+    (vs. the rest) under every stratification, in one vectorized pass.
+
+    Args:
+        exposure: exposure label per observation (missing labels are never
+            exposed)
+        y: binary outcome per observation
+        stratifications: dict mapping a name to a stratum label per
+            observation; missing labels form one 'UNKNOWN' stratum
+        alpha: CI level
+
+    Returns:
+        dict keyed by (level, stratification) with n_exposed, crude_or, mh_or,
+        ci_low, ci_high, p_value, n_strata, bd_chi2, bd_df and bd_p_value
+        (NaN where undefined)
+    """
+    exposure_codes, levels = encode(exposure)
+    names = list(stratifications)
+    strata = np.column_stack([encode(stratifications[name], missing='UNKNOWN')[0]
+                              for name in names]) if names else np.zeros((len(y), 0))
+
+    a, b, c, d = stratified_tables(exposure_codes, y, strata, len(levels))
+    mh = mantel_haenszel(a, b, c, d, alpha)
+    bd_chi2, bd_df, bd_p = breslow_day(a, b, c, d, mh['mh_or'])
+
+    A, B, C, D = (x.sum(axis=-1) for x in (a, b, c, d))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crude_or = np.where(B * C > 0, (A * D) / (B * C), np.inf)
+
+    results = {}
+    for m, name in enumerate(names):
+        for k, level in enumerate(levels):
+            results[(level, name)] = {
+                'n_exposed': int(A[m, k] + B[m, k]),
+                'crude_or': float(crude_or[m, k]),
+                'mh_or': float(mh['mh_or'][m, k]),
+                'ci_low': float(mh['ci_low'][m, k]),
+                'ci_high': float(mh['ci_high'][m, k]),
+                'p_value': float(mh['p_value'][m, k]),
+                'n_strata': int(mh['n_strata'][m, k]),
+                'bd_chi2': float(bd_chi2[m, k]),
+                'bd_df': float(bd_df[m, k]),
+                'bd_p_value': float(bd_p[m, k]),
+            }
+    return results
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+model_specs.py
+==============
+Compiled model specifications for repeated formula fits.
+
+smf.logit re-parses its formula and rebuilds the patsy design matrix on every
+call. The cross-validation, bootstrap and specification loops refit the same
+formula hundreds of times on subsets of one dataset, so this registry compiles
+each (formula, dataset) pair once, keeps the dense design matrix, and refits
+on subsets, weights or resamples by slicing arrays.
+
+Usage:
+    spec = get_spec(formula, df)
+    model = spec.logit()                      # full data, named parameters
+    model = spec.logit(rows=train_idx)        # subset/resample, no re-parse
+    probs = spec.predict(model.params, rows=test_idx)
+"""
+
+import weakref
+
+import numpy as np
+import pandas as pd
+import patsy
+import statsmodels.api as sm
+from scipy.special import expit
+from statsmodels.genmod.families import Binomial
+
+# (formula, id(df)) -> ModelSpec; entries are evicted when the DataFrame is
+# garbage collected, so a recycled id can never hit a stale spec
+_REGISTRY = {}
+_TRACKED = set()
+
+def _evict(df_id):
+    _TRACKED.discard(df_id)
+    for key in [key for key in _REGISTRY if key[1] == df_id]:
+        del _REGISTRY[key]
+
+class ModelSpec:
+    """
+    A formula compiled against one dataset.
+
+    Attributes:
+        formula: the patsy formula
+        y: outcome vector for the rows patsy kept (missing rows are dropped)
+        X: dense design matrix (float64) for the same rows
+        columns: design column names, as smf.logit would name the parameters
+        rows: positions of the kept rows in the source DataFrame
+        n_source: number of rows in the source DataFrame
+        design_info: patsy DesignInfo, for building matrices on new data
+    """
+
+    def __init__(self, formula, df):
+        y, X = patsy.dmatrices(formula, df, return_type='dataframe')
+
+        self.formula = formula
+        self.y_name = y.columns[0]
+        self.columns = list(X.columns)
+        self.y = np.ascontiguousarray(y.values[:, 0], dtype=float)
+        self.X = np.ascontiguousarray(X.values, dtype=float)
+        self.rows = df.index.get_indexer(X.index)
+        self.n_source = len(df)
+        self.design_info = X.design_info
+
+    def __getstate__(self):
+        # patsy's DesignInfo cannot be pickled; worker processes only need
+        # the arrays
+        state = self.__dict__.copy()
+        state['design_info'] = None
+        return state
+
+    @property
+    def nobs(self):
+        return len(self.y)
+
+    def design(self, new_df):
+        """Design matrix for new data, reusing the compiled design info."""
+        return np.asarray(patsy.build_design_matrices([self.design_info], new_df)[0])
+
+    def estimable(self, rows=None):
+        """
+        True when no design column is identically zero on the selected rows.
+
+        A resample or subset that drops every holding of a factor level would
+        make the information matrix singular (smf.logit would instead drop
+        the level and then fail to predict it).
+        """
+        X = self.X if rows is None else self.X[rows]
+        return bool(np.all(np.any(X != 0, axis=0)))
+
+    def endog_exog(self, rows=None):
+        """
+        Named (endog, exog) for the selected rows, ready for any statsmodels
+        model class (Logit, GLM, GEE, ...).
+        """
+        y = self.y if rows is None else self.y[rows]
+        X = self.X if rows is None else self.X[rows]
+        return pd.Series(y, name=self.y_name), pd.DataFrame(X, columns=self.columns)
+
+    def logit(self, rows=None, start_params=None, **fit_kwargs):
+        """
+        Fit a logit on the selected rows (positions into spec.y / spec.X).
+
+        Parameters keep the formula's names, so results are used exactly
+        like smf.logit results. fit_kwargs go to Logit.fit (cov_type, ...).
+        """
+        fit_kwargs.setdefault('disp', 0)
+        endog, exog = self.endog_exog(rows)
+        return sm.Logit(endog, exog).fit(start_params=start_params, **fit_kwargs)
+
+    def glm(self, rows=None, freq_weights=None, var_weights=None, **fit_kwargs):
+        """Fit a binomial GLM (supports frequency and variance weights)."""
+        endog, exog = self.endog_exog(rows)
+        return sm.GLM(endog, exog, family=Binomial(),
+                      freq_weights=freq_weights, var_weights=var_weights).fit(**fit_kwargs)
+
+    def predict(self, params, rows=None):
+        """Predicted probabilities for the selected rows."""
+        X = self.X if rows is None else self.X[rows]
+        return expit(X @ np.asarray(params))
+
+def get_spec(formula, df):
+    """
+    Compile formula against df once; later calls return the cached spec.
+
+    Specs are cached per DataFrame object. Subsets created with df[mask]
+    are new objects and get their own spec; to refit on a subset without
+    recompiling, pass row positions to spec.logit(rows=...) instead. A spec
+    is recompiled if the DataFrame's length changes; call clear_registry()
+    after editing columns in place.
+    """
+    key = (formula, id(df))
+    spec = _REGISTRY.get(key)
+    if spec is None or spec.n_source != len(df):
+        spec = ModelSpec(formula, df)
+        _REGISTRY[key] = spec
+        if id(df) not in _TRACKED:
+            _TRACKED.add(id(df))
+            weakref.finalize(df, _evict, id(df))
+    return spec
+
+def clear_registry():
+    """Drop all compiled specifications."""
+    _REGISTRY.clear()
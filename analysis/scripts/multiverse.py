@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+multiverse.py
+=============
+Specification-curve (multiverse) engine for entity effects.
+
+Every analytical choice is declared as an axis of options, and an effect is
+estimated under the full Cartesian product of all axes:
+
+- outcome codings: a value per holding in [0, 1] (NaN = not coded, dropped)
+- sample restrictions: one or more axes of boolean masks (combined with AND)
+- weighting schemes: holdings weighted by (holdings of their case in the
+  sample)^-alpha, so alpha = 0 is unweighted and alpha = 1 gives every case
+  the same total weight
+- covariate sets: strata formed by one or more label columns
+- estimators: stratum-adjusted rate difference (Mantel-Haenszel, Sato
+  variance), MH log odds ratio (Robins-Breslow-Greenland variance) and a
+  weighted logistic regression with ridge-penalized stratum fixed effects.
+  All three variances treat holding weights as frequency counts
+
+Outcomes, masks, stratum codes and exposures are encoded once as arrays, and
+specifications are evaluated in blocks: a block's weight matrix (specs x
+holdings) comes from its masks and in-sample case sizes, and all its stratum
+tables for all exposures come from one einsum per covariate set. Blocks are
+the replicates of a ResamplingExecutor, so a multiverse of thousands of
+specifications is split across cores and does not depend on the worker count.
+
+Usage:
+    table = run_multiverse(
+        exposures={'Third Chamber': chamber == 'THIRD'},
+        case_ids=case_ids,
+        outcomes={'pro_ds': pro_ds},
+        samples={'period': {'all': all_rows, '2023+': year >= 2023}},
+        weights={'unweighted': 0.0, 'inverse': 1.0},
+        covariates={'none': [], 'year': [years]},
+        executor=executor)
+    summary = specification_summary(table)
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.special import expit
+
+from mantel_haenszel import encode, mantel_haenszel
+
+ESTIMATORS = ('rate_difference', 'mh_log_odds', 'logit')
+
+# Logistic regression: Newton iterations and ridge on the stratum dummies
+# (keeps strata with a single outcome finite)
+LOGIT_MAX_ITER = 25
+LOGIT_RIDGE = 1e-2
+
+# Log odds ratios beyond this are (quasi-)separated fits and reported as NaN
+MAX_LOG_ODDS = 10.0
+
+# =============================================================================
+# ESTIMATORS
+# =============================================================================
+
+def stratum_tables(W, y, X, strata, n_strata):
+    """
+    Weighted 2x2 tables of every exposure within every stratum, for a block
+    of specifications.
+
+    Args:
+        W: (P x n) holding weights per specification (0 = not in sample)
+        y: (P x n) outcome per specification
+        X: (n x K) exposure indicators
+        strata: stratum code per holding
+
+    Returns:
+        (a, b, c, d), each (P x K x S)
+    """
+    Z = np.eye(n_strata)[strata]
+    WY = W * y
+    a = np.einsum('pi,ik,is->pks', WY, X, Z, optimize=True)
+    n1 = np.einsum('pi,ik,is->pks', W, X, Z, optimize=True)
+    c = (WY @ Z)[:, None, :] - a
+    n0 = (W @ Z)[:, None, :] - n1
+    return a, n1 - a, c, n0 - c
+
+def rate_difference(W, y, X, strata, n_strata):
+    """Mantel-Haenszel rate difference (exposed minus rest) with Sato's variance."""
+    a, b, c, d = stratum_tables(W, y, X, strata, n_strata)
+    n1, n0 = a + b, c + d
+    N = n1 + n0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w = np.where(N > 0, n1 * n0 / N, 0)
+        num = np.where(N > 0, (a * n0 - c * n1) / N, 0)
+        P = np.where(N > 0, (n1 ** 2 * c - n0 ** 2 * a + n1 * n0 * (n0 - n1) / 2) / N ** 2, 0)
+        Q = np.where(N > 0, (a * (n0 - c) + c * (n1 - a)) / (2 * N), 0)
+
+        w_sum = w.sum(axis=-1)
+        estimate = num.sum(axis=-1) / w_sum
+        variance = (estimate * P.sum(axis=-1) + Q.sum(axis=-1)) / w_sum ** 2
+        se = np.sqrt(np.where(variance > 0, variance, np.nan))
+    return np.where(w_sum > 0, estimate, np.nan), se
+
+def mh_log_odds(W, y, X, strata, n_strata):
+    """Log of the Mantel-Haenszel odds ratio with its RBG standard error."""
+    mh = mantel_haenszel(*stratum_tables(W, y, X, strata, n_strata))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_or = np.log(mh['mh_or'])
+    credible = np.abs(log_or) < MAX_LOG_ODDS
+    return np.where(credible, log_or, np.nan), np.where(credible, mh['se_log_or'], np.nan)
+
+def _stratum_sums(values, strata, n_strata):
+    """Sums of values (... x n) over the holdings of each stratum: (... x S)."""
+    lead = values.reshape(-1, values.shape[-1])
+    index = np.arange(len(lead))[:, None] * n_strata + strata[None, :]
+    sums = np.bincount(index.ravel(), weights=lead.ravel(), minlength=len(lead) * n_strata)
+    return sums.reshape(*values.shape[:-1], n_strata)
+
+def logit(W, y, X, strata, n_strata):
+    """
+    Exposure coefficient (log odds ratio) of a weighted logistic regression
+    with stratum fixed effects, fitted by Newton's method for the whole
+    block of specifications and all exposures at once.
+
+    The stratum dummies carry a ridge penalty of LOGIT_RIDGE (keeping strata
+    with a single outcome finite), so this is a penalized fit, not the MLE.
+    The Hessian is an arrow matrix: a dense 2 x 2 block for (intercept,
+    exposure) and a diagonal stratum block, both built from per-stratum
+    sums, so each Newton step is a Schur-complement solve in O(S).
+    Specifications that have not converged after LOGIT_MAX_ITER steps are
+    NaN. The inverse-Hessian SE treats holding weights as frequency counts.
+    """
+    x = X.T[None, :, :]                                    # (1 x K x n)
+    W, y = W[:, None, :], y[:, None, :]
+    shape = (W.shape[0], X.shape[1])
+    base = np.zeros(shape + (2,))                          # intercept, exposure
+    gamma = np.zeros(shape + (n_strata,))                  # stratum 0 is the reference
+    tiny = 1e-8
+    converged = np.zeros(shape, dtype=bool)
+
+    def blocks():
+        eta = base[..., :1] + base[..., 1:] * x + gamma[..., strata]
+        mu = expit(eta)
+        r, v = W * (y - mu), W * mu * (1 - mu)
+        R, A, B = (_stratum_sums(values, strata, n_strata) for values in (r, v, v * x))
+        M = np.empty(shape + (2, 2))
+        M[..., 0, 0] = A.sum(axis=-1) + tiny
+        M[..., 0, 1] = M[..., 1, 0] = B.sum(axis=-1)
+        M[..., 1, 1] = (v * x ** 2).sum(axis=-1) + tiny
+        U = np.stack([A, B], axis=-2)[..., 1:]             # (P x K x 2 x S-1)
+        D = A[..., 1:] + LOGIT_RIDGE
+        schur = M - np.einsum('...is,...js->...ij', U / D[..., None, :], U)
+        g_base = np.stack([R.sum(axis=-1), (r * x).sum(axis=-1)], axis=-1) - tiny * base
+        g_gamma = R[..., 1:] - LOGIT_RIDGE * gamma[..., 1:]
+        return schur, U, D, g_base, g_gamma
+
+    for _ in range(LOGIT_MAX_ITER):
+        schur, U, D, g_base, g_gamma = blocks()
+        rhs = g_base - np.einsum('...is,...s->...i', U, g_gamma / D)
+        d_base = np.linalg.solve(schur, rhs[..., None])[..., 0]
+        d_gamma = (g_gamma - np.einsum('...is,...i->...s', U, d_base)) / D
+        base += d_base
+        gamma[..., 1:] += d_gamma
+        step = np.maximum(np.abs(d_base).max(axis=-1), np.abs(d_gamma).max(axis=-1, initial=0))
+        converged = step < 1e-8
+        if converged.all():
+            break
+
+    schur = blocks()[0]
+    with np.errstate(invalid='ignore'):
+        variance = np.linalg.inv(schur)[..., 1, 1]
+    slope = base[..., 1]
+    finite = converged & (np.abs(slope) < MAX_LOG_ODDS)
+    estimate = np.where(finite, slope, np.nan)
+    se = np.where(finite & (variance > 0), np.sqrt(np.abs(variance)), np.nan)
+    return estimate, se
+
+ESTIMATOR_FUNCTIONS = {
+    'rate_difference': rate_difference,
+    'mh_log_odds': mh_log_odds,
+    'logit': logit,
+}
+
+# =============================================================================
+# SPECIFICATION BLOCKS
+# =============================================================================
+
+def _specification_block(rep_ids, rngs, shape, Y, masks, alphas, strata, n_strata, X,
+                         case_codes, n_cases, estimators, min_n, min_sample):
+    """
+    Executor block: estimates for a chunk of specification indices.
+
+    Axis order of shape: covariates, estimator, outcome, sample axes..., weights.
+    """
+    index = np.unravel_index(rep_ids, shape)
+    c, e, o = index[0], index[1], index[2]
+    w = index[-1]
+
+    y = Y[o]
+    valid = ~np.isnan(y)
+    for axis, options in enumerate(masks):
+        valid &= options[index[3 + axis]]
+    y = np.nan_to_num(y)
+
+    # Holdings per case within each specification's sample
+    rows = np.arange(len(rep_ids))[:, None] * n_cases
+    case_size = np.bincount((rows + case_codes[None, :]).ravel(), weights=valid.ravel(),
+                            minlength=len(rep_ids) * n_cases).reshape(len(rep_ids), n_cases)
+    with np.errstate(divide='ignore'):
+        W = np.where(valid, case_size[:, case_codes] ** -alphas[w][:, None], 0.0)
+
+    n_sample = valid.sum(axis=1)
+    n_exposed = valid.astype(float) @ X
+    estimate = np.full((len(rep_ids), X.shape[1]), np.nan)
+    se = np.full_like(estimate, np.nan)
+
+    for cov in np.unique(c):
+        for est in np.unique(e[c == cov]):
+            sel = (c == cov) & (e == est)
+            estimate[sel], se[sel] = ESTIMATOR_FUNCTIONS[estimators[est]](
+                W[sel], y[sel], X, strata[cov], n_strata[cov])
+
+    enough = ((n_exposed >= min_n) & (n_sample[:, None] - n_exposed >= min_n)
+              & (n_sample[:, None] >= min_sample))
+    estimate[~enough] = np.nan
+    se[~enough] = np.nan
+    return estimate, se, n_sample, n_exposed
+
+# =============================================================================
+# MULTIVERSE
+# =============================================================================
+
+def run_multiverse(exposures, case_ids, outcomes, samples, weights, covariates,
+                   estimators=ESTIMATORS, min_n=5, min_sample=50, alpha=0.05, executor=None):
+    """
+    Estimate every exposure under every combination of the declared axes.
+
+    Args:
+        exposures: dict mapping an effect name to a boolean vector per holding
+        case_ids: case identifier per holding
+        outcomes: dict mapping an outcome coding to a value per holding in
+            [0, 1] (NaN: holding not coded and dropped)
+        samples: dict mapping a sample axis to {option: boolean mask}
+        weights: dict mapping a weighting scheme to its case-size exponent
+        covariates: dict mapping a covariate set to a list of label vectors
+            (strata are their combinations; [] for none)
+        estimators: names from ESTIMATORS
+        min_n: minimum exposed and unexposed holdings in the sample
+        min_sample: minimum holdings in the sample
+        executor: optional ResamplingExecutor; specifications are split across it
+
+    Returns:
+        DataFrame (the specification curve) with one row per (specification,
+        effect): spec_id, effect, one column per axis, weighted, n,
+        n_exposed, estimate, se, ci_low, ci_high and p_value (NaN where not
+        estimable). All three variances treat holding weights as frequency
+        counts, so se, CI and p-value are only nominal for weighted
+        specifications (weighted = True)
+    """
+    effect_names = list(exposures)
+    X = np.column_stack([np.asarray(exposures[name], dtype=bool) for name in effect_names]
+                        ).astype(float)
+    case_codes, cases = encode(list(case_ids))
+
+    outcome_names = list(outcomes)
+    Y = np.vstack([np.asarray(outcomes[name], dtype=float) for name in outcome_names])
+    sample_axes = list(samples)
+    sample_options = [list(samples[axis]) for axis in sample_axes]
+    masks = [np.vstack([np.asarray(samples[axis][option], dtype=bool) for option in options])
+             for axis, options in zip(sample_axes, sample_options)]
+    weight_names = list(weights)
+    alphas = np.array([weights[name] for name in weight_names], dtype=float)
+
+    covariate_names = list(covariates)
+    strata, n_strata = [], []
+    for name in covariate_names:
+        columns = covariates[name]
+        labels = list(zip(*columns)) if columns else [()] * len(case_codes)
+        codes, levels = encode(labels)
+        strata.append(codes)
+        n_strata.append(len(levels))
+
+    shape = (len(covariate_names), len(estimators), len(outcome_names),
+             *[len(options) for options in sample_options], len(weight_names))
+    n_specs = int(np.prod(shape))
+    args = (shape, Y, masks, alphas, strata, n_strata, X, case_codes, len(cases),
+            tuple(estimators), min_n, min_sample)
+
+    if executor is None:
+        estimate, se, n_sample, n_exposed = _specification_block(np.arange(n_specs), None, *args)
+    else:
+        estimate, se, n_sample, n_exposed = executor.map_blocks(
+            _specification_block, n_specs, args=args, label='specifications')
+
+    index = np.unravel_index(np.arange(n_specs), shape)
+    specs = {
+        'covariates': np.array(covariate_names, dtype=object)[index[0]],
+        'estimator': np.array(estimators, dtype=object)[index[1]],
+        'outcome': np.array(outcome_names, dtype=object)[index[2]],
+    }
+    for axis, (name, options) in enumerate(zip(sample_axes, sample_options)):
+        specs[name] = np.array(options, dtype=object)[index[3 + axis]]
+    specs['weights'] = np.array(weight_names, dtype=object)[index[-1]]
+    specs['weighted'] = alphas[index[-1]] != 0
+
+    K = len(effect_names)
+    z_crit = stats.norm.ppf(1 - alpha / 2)
+    estimate, se = estimate.ravel(), se.ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_value = 2 * stats.norm.sf(np.abs(estimate / se))
+
+    table = pd.DataFrame({
+        'spec_id': np.repeat(np.arange(n_specs), K),
+        'effect': np.tile(np.array(effect_names, dtype=object), n_specs),
+        **{name: np.repeat(values, K) for name, values in specs.items()},
+        'n': np.repeat(n_sample, K),
+        'n_exposed': n_exposed.ravel().astype(np.int64),
+        'estimate': estimate,
+        'se': se,
+        'ci_low': estimate - z_crit * se,
+        'ci_high': estimate + z_crit * se,
+        'p_value': p_value,
+    })
+    return table
+
+def specification_summary(table, alpha=0.05):
+    """
+    Per effect and estimator: specifications run and estimable, median and
+    range of the estimate, and the share that are negative (among the
+    estimable ones) and significantly negative or positive. Significance
+    shares count only unweighted specifications (n_tested), whose standard
+    errors are valid; weighted ones treat case weights as frequency counts.
+    """
+    valid = table.dropna(subset=['estimate'])
+    tested = ~valid['weighted']
+    significant = tested & (valid['p_value'] < alpha)
+    flags = valid.assign(negative=valid['estimate'] < 0,
+                         tested=tested,
+                         sig_negative=significant & (valid['estimate'] < 0),
+                         sig_positive=significant & (valid['estimate'] > 0))
+    summary = flags.groupby(['effect', 'estimator'], sort=False).agg(
+        n_valid=('estimate', 'size'),
+        n_tested=('tested', 'sum'),
+        median=('estimate', 'median'),
+        min=('estimate', 'min'),
+        max=('estimate', 'max'),
+        share_negative=('negative', 'mean'),
+        sig_negative=('sig_negative', 'sum'),
+        sig_positive=('sig_positive', 'sum'),
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['share_sig_negative'] = summary.pop('sig_negative') / summary['n_tested']
+        summary['share_sig_positive'] = summary.pop('sig_positive') / summary['n_tested']
+    n_specs = table.groupby(['effect', 'estimator'], sort=False).size().rename('n_specs')
+    return pd.concat([n_specs, summary], axis=1).reset_index()
+
+def option_medians(table, effect, estimator, axes):
+    """Median estimate per option of each axis (the spec-curve 'dashboard')."""
+    subset = table[(table['effect'] == effect) & (table['estimator'] == estimator)]
+    return {axis: subset.groupby(axis, sort=False)['estimate'].median().to_dict()
+            for axis in axes}
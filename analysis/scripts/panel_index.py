@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+panel_index.py
+==============
+Panel-composition similarity: which cases were decided by (nearly) the
+same judges?
+
+Judge names are interned to integer IDs and every case's panel is stored
+twice:
+
+- a row of 64-bit words (one bit per judge), so the Jaccard similarity of
+  one panel with every other panel is a vectorized AND/OR plus popcount
+  over a (cases x words) array
+- the sparse case x judge incidence matrix B (judge_network) and its
+  transpose, a judge -> cases inverted index: a nearest-panel query only
+  scores the cases sharing a judge with the query, and the shared-judge
+  counts of all overlapping pairs come from one product BBᵀ, so the
+  panel-overlap join only touches pairs with a judge in common
+
+panel_overlap() turns the index into a case-level covariate for the
+judicial models: how closely a case's panel repeats one that has already
+sat (maximum Jaccard with any earlier case).
+
+Usage:
+    index = PanelIndex.from_cases(cases)
+    index.nearest('C-300/21', k=5)          # most similar panels
+    index.jaccard('C-300/21', 'C-687/21')
+    pairs = index.overlap_join(0.6)         # all pairs with J >= 0.6
+    overlap = index.panel_overlap(judgment_dates)
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from judge_network import panel_incidence
+from reachability import popcount
+
+class PanelIndex:
+    """
+    Jaccard index over case panels.
+
+    Args:
+        case_ids: case IDs, one per panel
+        panels: judge names per case (lists; duplicates are ignored)
+        judges: judge names in ID order (default: sorted unique judges)
+    """
+
+    def __init__(self, case_ids, panels, judges=None):
+        self.case_ids = np.asarray(case_ids, dtype=object)
+        self.judges, self.incidence = panel_incidence(
+            [{'judges': list(panel or [])} for panel in panels], judges)
+        self._index = {case_id: i for i, case_id in enumerate(self.case_ids)}
+
+        n, m = self.incidence.shape
+        self.n_words = max(1, (m + 63) // 64)
+        self.bits = np.zeros((n, self.n_words), dtype=np.uint64)
+        rows = np.repeat(np.arange(n), np.diff(self.incidence.indptr))
+        cols = self.incidence.indices.astype(np.int64)
+        np.bitwise_or.at(self.bits, (rows, cols >> 6),
+                         np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64)))
+        self.sizes = popcount(self.bits)
+
+        # Inverted index: judge -> cases (CSC of the incidence matrix)
+        by_judge = self.incidence.tocsc()
+        self._judge_indptr, self._judge_cases = by_judge.indptr, by_judge.indices
+
+    @classmethod
+    def from_cases(cls, cases, judges=None):
+        """Index case dicts with 'case_id' and 'judges' (cases.json records)."""
+        return cls([case.get('case_id', '') for case in cases],
+                   [case.get('judges', []) or [] for case in cases], judges)
+
+    @classmethod
+    def from_holdings(cls, holdings, judges_col='judges', sep=';'):
+        """Index the panels of a holdings table (one panel per case_id)."""
+        panels = {}
+        for h in holdings:
+            case_id = h.get('case_id', '')
+            if case_id not in panels:
+                value = h.get(judges_col, '') or ''
+                panels[case_id] = [judge for judge in value.split(sep) if judge]
+        return cls(list(panels), list(panels.values()))
+
+    def __len__(self):
+        return len(self.case_ids)
+
+    def node(self, case_id):
+        return self._index[case_id]
+
+    # -------------------------------------------------------------------------
+    # Point queries (bitsets)
+    # -------------------------------------------------------------------------
+
+    def similarities(self, case_id):
+        """Shared judges and Jaccard similarity of one panel with every panel."""
+        row = self.bits[self.node(case_id)]
+        shared = popcount(self.bits & row)
+        union = popcount(self.bits | row)
+        jaccard = np.divide(shared, union, out=np.zeros(len(union)), where=union > 0)
+        return shared, jaccard
+
+    def jaccard(self, case_a, case_b):
+        """Jaccard similarity of two panels."""
+        a, b = self.bits[self.node(case_a)], self.bits[self.node(case_b)]
+        union = int(popcount((a | b)[None, :])[0])
+        return int(popcount((a & b)[None, :])[0]) / union if union else 0.0
+
+    def nearest_nodes(self, v, k=10, min_jaccard=0.0):
+        """
+        Node indices, shared judges and Jaccard of the k panels closest to
+        node v's. Only cases sharing a judge with v are scored, found
+        through the judge -> cases inverted index.
+        """
+        judges = self.incidence.indices[self.incidence.indptr[v]:self.incidence.indptr[v + 1]]
+        starts, stops = self._judge_indptr[judges], self._judge_indptr[judges + 1]
+        lists = [self._judge_cases[lo:hi] for lo, hi in zip(starts, stops)]
+        if not lists:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+        candidates, shared = np.unique(np.concatenate(lists), return_counts=True)
+        jaccard = shared / (self.sizes[v] + self.sizes[candidates] - shared)
+
+        keep = (candidates != v) & (jaccard >= min_jaccard)
+        candidates, shared, jaccard = candidates[keep], shared[keep], jaccard[keep]
+        if len(candidates) > k:
+            threshold = np.partition(jaccard, len(jaccard) - k)[len(jaccard) - k]
+            keep = jaccard >= threshold
+            candidates, shared, jaccard = candidates[keep], shared[keep], jaccard[keep]
+        order = np.lexsort((candidates, -jaccard))[:k]
+        return candidates[order], shared[order], jaccard[order]
+
+    def nearest(self, case_id, k=10, min_jaccard=0.0):
+        """
+        The k panels most similar to case_id's (the case itself excluded).
+
+        Returns a DataFrame with case_id, shared (judges in common) and
+        jaccard, most similar first (ties by index order). Panels with no
+        judge in common are never listed.
+        """
+        nodes, shared, jaccard = self.nearest_nodes(self.node(case_id), k, min_jaccard)
+        return pd.DataFrame({'case_id': self.case_ids[nodes], 'shared': shared,
+                             'jaccard': jaccard})
+
+    # -------------------------------------------------------------------------
+    # Joins (sparse incidence product)
+    # -------------------------------------------------------------------------
+
+    def _pair_overlaps(self):
+        """Upper-triangle (i, j, shared) for every pair with a judge in common."""
+        B = self.incidence
+        shared = sp.triu(B @ B.T, k=1).tocoo()
+        return shared.row.astype(np.int64), shared.col.astype(np.int64), shared.data
+
+    def overlap_join(self, threshold=0.5):
+        """
+        Every pair of panels with Jaccard >= threshold (threshold > 0).
+
+        Returns a DataFrame with case_a, case_b, shared and jaccard, sorted
+        by jaccard.
+        """
+        i, j, shared = self._pair_overlaps()
+        union = self.sizes[i] + self.sizes[j] - shared
+        jaccard = shared / union
+        keep = jaccard >= threshold
+        i, j, shared, jaccard = i[keep], j[keep], shared[keep], jaccard[keep]
+        order = np.lexsort((j, i, -jaccard))
+        return pd.DataFrame({'case_a': self.case_ids[i[order]],
+                             'case_b': self.case_ids[j[order]],
+                             'shared': shared[order],
+                             'jaccard': jaccard[order]})
+
+    def panel_overlap(self, dates):
+        """
+        Maximum Jaccard similarity of each panel with any earlier case's panel.
+
+        Args:
+            dates: judgment date per case (same order as case_ids); cases on
+                the same date do not count as earlier
+
+        Returns:
+            array of overlaps in [0, 1] (0 when no earlier panel shares a judge)
+        """
+        time = pd.to_datetime(pd.Series(np.asarray(dates)), errors='coerce').to_numpy()
+        i, j, shared = self._pair_overlaps()
+        jaccard = shared / (self.sizes[i] + self.sizes[j] - shared)
+
+        overlap = np.zeros(len(self))
+        # Each pair counts for whichever case is later
+        later = np.where(time[i] > time[j], i, np.where(time[j] > time[i], j, -1))
+        valid = later >= 0
+        np.maximum.at(overlap, later[valid], jaccard[valid])
+        return overlap
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+reachability.py
+===============
+Precomputed transitive closure of the citation DAG.
+
+Citation graphs are acyclic (compute_network_metrics checks is_dag), so
+every reachability set can be built once in topological order instead of
+walking the graph per query:
+
+- foundations(Y): every case Y rests on, directly or through intermediate
+  citations (the cases reachable from Y along citing → cited edges)
+- descendants(X): every later case that cites X directly or indirectly
+  (its citation cascade)
+
+Two representations are used:
+
+1. Bitsets (graphs up to BITSET_MAX_NODES nodes): one row of 64-bit words
+   per case for each direction, built level by level with a vectorized
+   bitwise-OR reduction over the CSR arrays. Membership tests are O(1).
+2. Interval labelling (larger graphs): a spanning forest is numbered in
+   post-order, and every case keeps the merged post-order intervals it
+   reaches (Agrawal, Borgida & Jagadish 1989). Membership tests are a
+   binary search, and enumeration is O(output).
+
+Usage:
+    index = ReachabilityIndex(graph.internal())
+    index.descendants('C-300/21')     # full citation cascade
+    index.foundations('C-687/21')     # everything it ultimately rests on
+    index.cascade_sizes()             # descendants per case, all at once
+"""
+
+import numpy as np
+
+from citation_graph import row_groups
+
+BITSET_MAX_NODES = 16384
+
+def popcount(words):
+    """Set bits per row of a (rows x words) uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return np.unpackbits(words.view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+# =============================================================================
+# BITSETS
+# =============================================================================
+
+def _bitset_closure(n, indptr, indices, levels):
+    """
+    Reflexive closure bitsets: row v has bit u set when v reaches u.
+
+    levels must list nodes so that every edge points to a later level;
+    they are processed last to first, so all targets are final when a
+    level is reduced.
+    """
+    n_words = (n + 63) // 64
+    closure = np.zeros((n, n_words), dtype=np.uint64)
+    nodes = np.arange(n)
+    closure[nodes, nodes >> 6] = np.left_shift(np.uint64(1), (nodes & 63).astype(np.uint64))
+
+    for level in reversed(levels):
+        positions, rows, starts = row_groups(indptr, level)
+        if not len(rows):
+            continue
+        reduced = np.bitwise_or.reduceat(closure[indices[positions]], starts, axis=0)
+        closure[rows] |= reduced
+    return closure
+
+def _bits_to_nodes(row, n):
+    bits = np.unpackbits(row.view(np.uint8), bitorder='little')[:n]
+    return np.flatnonzero(bits)
+
+# =============================================================================
+# INTERVAL LABELLING
+# =============================================================================
+
+class _IntervalLabels:
+    """
+    Post-order interval labels for reachability along one edge direction.
+
+    indptr/indices give the edges (source -> target), rev_indptr/rev_indices
+    the same edges grouped by target, and levels a topological layering in
+    which every edge points to a later level.
+    """
+
+    def __init__(self, n, indptr, indices, rev_indptr, rev_indices, levels):
+        # Spanning forest: each node hangs under its first source
+        has_parent = np.diff(rev_indptr) > 0
+        parent = np.full(n, -1, dtype=np.int64)
+        parent[has_parent] = rev_indices[rev_indptr[:-1][has_parent]]
+
+        # Subtree sizes, leaves first
+        size = np.ones(n, dtype=np.int64)
+        for level in reversed(levels):
+            child = level[parent[level] >= 0]
+            np.add.at(size, parent[child], size[child])
+
+        # Each child's offset within its parent's block: sizes of earlier siblings
+        children = np.flatnonzero(parent >= 0)
+        children = children[np.argsort(parent[children], kind='stable')]
+        sibling_sizes = size[children]
+        group_start = np.r_[True, parent[children][1:] != parent[children][:-1]]
+        cumulative = np.cumsum(sibling_sizes)
+        group_base = np.maximum.accumulate(np.where(group_start, cumulative - sibling_sizes, 0))
+        offset = np.zeros(n, dtype=np.int64)
+        offset[children] = cumulative - sibling_sizes - group_base
+
+        # Post-order numbering: a subtree occupies [low, low + size - 1],
+        # the subtree root takes the last number
+        low = np.zeros(n, dtype=np.int64)
+        roots = np.flatnonzero(parent < 0)
+        low[roots] = np.cumsum(size[roots]) - size[roots]
+        for level in levels:
+            child = level[parent[level] >= 0]
+            low[child] = low[parent[child]] + offset[child]
+        self.post = low + size - 1
+        self.node_at_post = np.empty(n, dtype=np.int64)
+        self.node_at_post[self.post] = np.arange(n)
+
+        # Intervals: own subtree, merged with the intervals of every target
+        lows = [np.array([lo]) for lo in low]
+        highs = [np.array([hi]) for hi in self.post]
+        for level in reversed(levels):
+            for v in level[np.diff(indptr)[level] > 0]:
+                targets = indices[indptr[v]:indptr[v + 1]]
+                lo = np.concatenate([lows[v]] + [lows[t] for t in targets])
+                hi = np.concatenate([highs[v]] + [highs[t] for t in targets])
+                lows[v], highs[v] = self._merge(lo, hi)
+
+        counts = np.array([len(lo) for lo in lows], dtype=np.int64)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.low = np.concatenate(lows)
+        self.high = np.concatenate(highs)
+
+    @staticmethod
+    def _merge(lo, hi):
+        order = np.argsort(lo, kind='stable')
+        lo, hi = lo[order], hi[order]
+        reach = np.maximum.accumulate(hi)
+        starts = np.flatnonzero(np.r_[True, lo[1:] > reach[:-1] + 1])
+        return lo[starts], np.maximum.reduceat(hi, starts)
+
+    def contains(self, u, v):
+        start, stop = self.indptr[u], self.indptr[u + 1]
+        p = self.post[v]
+        k = np.searchsorted(self.low[start:stop], p, side='right') - 1
+        return bool(k >= 0 and self.high[start + k] >= p)
+
+    def members(self, u):
+        start, stop = self.indptr[u], self.indptr[u + 1]
+        spans = [self.node_at_post[lo:hi + 1]
+                 for lo, hi in zip(self.low[start:stop], self.high[start:stop])]
+        return np.concatenate(spans)
+
+    def counts(self):
+        widths = self.high - self.low + 1
+        return np.add.reduceat(widths, self.indptr[:-1])
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+class ReachabilityIndex:
+    """
+    Ancestor/descendant index over a citation DAG (CitationGraph).
+
+    Args:
+        graph: CitationGraph (must be acyclic)
+        method: 'bitset', 'interval' or 'auto' (bitsets up to
+            BITSET_MAX_NODES nodes)
+    """
+
+    def __init__(self, graph, method='auto'):
+        levels = graph.topological_levels()
+        if levels is None:
+            raise ValueError("Reachability index requires an acyclic citation graph")
+        if method == 'auto':
+            method = 'bitset' if graph.n_nodes <= BITSET_MAX_NODES else 'interval'
+        if method not in ('bitset', 'interval'):
+            raise ValueError(f"Unknown reachability method: {method}")
+
+        self.graph = graph
+        self.method = method
+        n = graph.n_nodes
+        indptr, indices = np.asarray(graph.indptr), np.asarray(graph.indices)
+        in_indptr, in_indices = np.asarray(graph.in_indptr), np.asarray(graph.in_indices)
+
+        if method == 'bitset':
+            self._cited = _bitset_closure(n, indptr, indices, levels)
+            self._citing = _bitset_closure(n, in_indptr, in_indices, levels[::-1])
+        else:
+            self._cited = _IntervalLabels(n, indptr, indices, in_indptr, in_indices, levels)
+            self._citing = _IntervalLabels(n, in_indptr, in_indices, indptr, indices, levels[::-1])
+
+        # Longest chain of precedent beneath each case (0 = cites nothing)
+        self.depth = np.zeros(n, dtype=np.int64)
+        for level in reversed(levels):
+            positions, rows, starts = row_groups(indptr, level)
+            if len(rows):
+                self.depth[rows] = np.maximum.reduceat(self.depth[indices[positions]], starts) + 1
+
+    def _node(self, case_id):
+        return self.graph.node(case_id)
+
+    def _members(self, closure, v):
+        if self.method == 'bitset':
+            nodes = _bits_to_nodes(closure[v], self.graph.n_nodes)
+        else:
+            nodes = closure.members(v)
+        return nodes[nodes != v]
+
+    def _contains(self, closure, u, v):
+        if self.method == 'bitset':
+            return bool((closure[u, v >> 6] >> np.uint64(v & 63)) & np.uint64(1))
+        return closure.contains(u, v)
+
+    def _counts(self, closure):
+        counts = popcount(closure) if self.method == 'bitset' else closure.counts()
+        return counts - 1
+
+    def reaches(self, citing_case, cited_case):
+        """True if citing_case cites cited_case directly or indirectly."""
+        u, v = self._node(citing_case), self._node(cited_case)
+        return u != v and self._contains(self._cited, u, v)
+
+    def foundations(self, case_id):
+        """Case IDs that case_id ultimately rests on."""
+        return list(self.graph.case_ids[self._members(self._cited, self._node(case_id))])
+
+    def descendants(self, case_id):
+        """Case IDs citing case_id directly or indirectly (its cascade)."""
+        return list(self.graph.case_ids[self._members(self._citing, self._node(case_id))])
+
+    def foundation_nodes(self, v):
+        return self._members(self._cited, v)
+
+    def descendant_nodes(self, v):
+        return self._members(self._citing, v)
+
+    def foundation_counts(self):
+        """Number of foundations per node."""
+        return self._counts(self._cited)
+
+    def cascade_sizes(self):
+        """Number of descendants per node."""
+        return self._counts(self._citing)
+
+    def lineage_depth(self, case_id):
+        """Length of the longest citation chain beneath case_id."""
+        return int(self.depth[self._node(case_id)])
@@ -0,0 +1,744 @@
+#!/usr/bin/env python3
+"""
+resampling.py
+=============
+Shared resampling engines for the robustness scripts.
+
+The numbered scripts are run standalone, so this module lives next to them
+and is imported directly (the script directory is on sys.path when a script
+is executed).
+
+This module implements:
+1. Index-matrix bootstrap for rate-difference effects (entity vs. rest)
+2. Percentile, BCa and studentized bootstrap confidence intervals
+3. Block-vectorized permutation tests with sequential (Besag-Clifford) stopping
+4. A deterministic process-pool executor shared by bootstrap, permutation and
+   jackknife workflows
+5. Per-case sufficient statistics: leave-one-case-out, case-majority and
+   inverse-holding-weighted entity effects by subtraction
+6. Case-level randomization inference: case labels (chamber, rapporteur)
+   permuted across cases, optionally within strata
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from scipy import stats
+
+# =============================================================================
+# PARALLEL EXECUTOR
+# =============================================================================
+
+def replicate_rngs(seed, rep_ids):
+    """
+    One independent generator per replicate.
+
+    Replicate i always draws from SeedSequence(seed, spawn_key=(i,)), so its
+    random stream does not depend on how replicates are split into chunks.
+    """
+    return [np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(int(i),)))
+            for i in rep_ids]
+
+def _run_chunk(block_fn, seed, start, stop, args):
+    """Evaluate one chunk of replicates (runs inside a worker process)."""
+    rep_ids = np.arange(start, stop)
+    return block_fn(rep_ids, replicate_rngs(seed, rep_ids), *args)
+
+def _concatenate(parts):
+    """Concatenate chunk results (arrays, or tuples of arrays) in replicate order."""
+    if isinstance(parts[0], tuple):
+        return tuple(np.concatenate(component) for component in zip(*parts))
+    return np.concatenate(parts)
+
+class ResamplingExecutor:
+    """
+    Split B resampling replicates across a process pool.
+
+    Work is expressed as a block function block_fn(rep_ids, rngs, *args) that
+    returns one row per replicate (an array, or a tuple of arrays). Because
+    every replicate has its own SeedSequence-derived generator, results are
+    bit-identical for any number of workers and any chunk size. Unless
+    chunk_size is set, each call is split into about four chunks per worker,
+    so even a few hundred replicates are spread over the pool. Jackknife
+    workflows simply ignore the generators and use rep_ids as the left-out
+    unit.
+
+    Block functions must be picklable (module-level functions, or
+    functools.partial of them) when n_workers > 1.
+
+    Usage:
+        with ResamplingExecutor(n_workers=4, progress=True) as executor:
+            boot = bootstrap_rate_differences(y, groupings, executor=executor)
+    """
+
+    def __init__(self, n_workers=None, chunk_size=None, progress=False):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self):
+        """Shut down the worker pool (if one was started)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _chunk_size(self, n_reps):
+        """Replicates per chunk: the fixed chunk_size, or ~4 chunks per worker."""
+        if self.chunk_size is not None:
+            return self.chunk_size
+        return max(math.ceil(n_reps / (4 * self.n_workers)), 1)
+
+    def _report(self, label, done, total, chunk):
+        """Chunked progress reporting: a callback, or a line every ~10%."""
+        if callable(self.progress):
+            self.progress(label, done, total)
+        elif self.progress:
+            step = max(total // 10, 1)
+            if done == total or (done // step) != ((done - chunk) // step):
+                print(f"    {label}: {done}/{total} replicates")
+
+    def map_blocks(self, block_fn, n_reps, args=(), seed=42, start=0, label='resampling'):
+        """
+        Run replicates start .. start + n_reps - 1 and stack their rows in order.
+        """
+        chunk = self._chunk_size(n_reps)
+        bounds = [(lo, min(lo + chunk, start + n_reps))
+                  for lo in range(start, start + n_reps, chunk)]
+
+        parts = []
+        if self.n_workers == 1 or len(bounds) == 1:
+            for lo, hi in bounds:
+                parts.append(_run_chunk(block_fn, seed, lo, hi, args))
+                self._report(label, hi - start, n_reps, chunk)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.n_workers)
+            futures = [self._pool.submit(_run_chunk, block_fn, seed, lo, hi, args)
+                       for lo, hi in bounds]
+            for (lo, hi), future in zip(bounds, futures):
+                parts.append(future.result())
+                self._report(label, hi - start, n_reps, chunk)
+
+        return _concatenate(parts)
+
+# =============================================================================
+# ENTITY INDICATORS
+# =============================================================================
+
+def one_hot(labels):
+    """
+    Encode a label vector as a one-hot indicator matrix.
+
+    Missing and empty labels get an all-zero row, so those observations only
+    ever count towards the "other" group.
+
+    Returns:
+        (levels, indicators) where indicators is an (n x K) float array
+    """
+    labels = np.asarray(labels, dtype=object)
+    valid = np.array([l is not None and l == l and l != '' for l in labels], dtype=bool)
+
+    levels = sorted(set(labels[valid]))
+    index = {level: k for k, level in enumerate(levels)}
+
+    indicators = np.zeros((len(labels), len(levels)))
+    rows = np.flatnonzero(valid)
+    cols = np.array([index[l] for l in labels[valid]], dtype=int)
+    indicators[rows, cols] = 1.0
+
+    return levels, indicators
+
+def stack_indicators(groupings):
+    """
+    Stack the one-hot indicators of several label columns side by side.
+
+    Parameters:
+    groupings: dict mapping a column name to its label vector
+
+    Returns:
+        (effect_keys, indicators) with one (column, level) key per indicator column
+    """
+    keys = []
+    blocks = []
+    for column, labels in groupings.items():
+        levels, indicators = one_hot(labels)
+        keys.extend((column, level) for level in levels)
+        blocks.append(indicators)
+
+    return keys, np.hstack(blocks)
+
+# =============================================================================
+# RATE-DIFFERENCE KERNEL
+# =============================================================================
+
+def rate_differences(counts, y, indicators):
+    """
+    Entity-minus-rest pro-DS rate differences for every indicator column.
+
+    `counts` holds observation weights: a length-n vector for one sample, or a
+    (B x n) matrix for a batch of bootstrap replicates. Everything reduces to
+    two matrix products, so a whole batch is scored at once.
+
+    Returns:
+        (effects, standard_errors) shaped like counts @ indicators. Entries
+        with an empty entity or rest group are NaN.
+    """
+    counts = np.asarray(counts, dtype=float)
+
+    n_entity = counts @ indicators
+    s_entity = (counts * y) @ indicators
+    n_total = counts.sum(axis=-1, keepdims=True)
+    s_total = (counts * y).sum(axis=-1, keepdims=True)
+
+    n_other = n_total - n_entity
+    s_other = s_total - s_entity
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_entity = s_entity / n_entity
+        p_other = s_other / n_other
+        effects = p_entity - p_other
+        se = np.sqrt(p_entity * (1 - p_entity) / n_entity +
+                     p_other * (1 - p_other) / n_other)
+
+    return effects, se
+
+def jackknife_rate_differences(y, indicators):
+    """
+    Leave-one-observation-out rate differences, derived by subtraction.
+
+    Returns:
+        (n x K) array; row i is every effect with observation i removed
+    """
+    n_entity = indicators.sum(axis=0)
+    s_entity = y @ indicators
+
+    n_entity_i = n_entity - indicators
+    s_entity_i = s_entity - y[:, None] * indicators
+    n_other_i = (len(y) - 1) - n_entity_i
+    s_other_i = (y.sum() - y)[:, None] - s_entity_i
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return s_entity_i / n_entity_i - s_other_i / n_other_i
+
+def bootstrap_counts(rngs, n):
+    """
+    Multinomial count matrix with one row per replicate generator.
+
+    Row b holds how often each observation is drawn in replicate b, which is
+    equivalent to resampling n observations with replacement.
+    """
+    probs = np.full(n, 1.0 / n)
+    return np.stack([rng.multinomial(n, probs) for rng in rngs])
+
+def _rate_difference_block(rep_ids, rngs, y, indicators):
+    """Executor block: bootstrap rate differences for a chunk of replicates."""
+    return rate_differences(bootstrap_counts(rngs, len(y)), y, indicators)
+
+# =============================================================================
+# CASE-LEVEL SUFFICIENT STATISTICS
+# =============================================================================
+
+def case_sufficient_stats(case_ids, y, groupings):
+    """
+    Aggregate holdings once into per-case counts and pro-DS sums per entity.
+
+    Every case-level jackknife, aggregation and reweighting of entity effects
+    can be derived from these (C x K) tables without touching the holdings
+    again.
+
+    Parameters:
+    case_ids: case identifier per holding (length n)
+    y: binary outcome per holding
+    groupings: dict mapping a column name to its label vector
+
+    Returns:
+        dict with 'cases' (C ids), 'keys' (K (column, level) pairs),
+        'n' and 's' (C x K holding counts / pro-DS sums per entity) and
+        'n_case' and 's_case' (per-case totals)
+    """
+    y = np.asarray(y, dtype=float)
+    codes, cases = _factorize(case_ids)
+    keys, indicators = stack_indicators(groupings)
+
+    n = np.zeros((len(cases), len(keys)))
+    s = np.zeros((len(cases), len(keys)))
+    np.add.at(n, codes, indicators)
+    np.add.at(s, codes, y[:, None] * indicators)
+
+    return {
+        'cases': cases,
+        'keys': keys,
+        'n': n,
+        's': s,
+        'n_case': np.bincount(codes, minlength=len(cases)).astype(float),
+        's_case': np.bincount(codes, weights=y, minlength=len(cases)),
+    }
+
+def _factorize(values):
+    """Integer codes and ordered unique values (first-appearance order)."""
+    index = {}
+    codes = np.array([index.setdefault(v, len(index)) for v in values], dtype=int)
+    return codes, list(index)
+
+def _rates(s_entity, n_entity, s_total, n_total):
+    """Entity and rest rates (NaN where a group is empty)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return s_entity / n_entity, (s_total - s_entity) / (n_total - n_entity)
+
+def leave_one_case_out(case_stats, min_n=5):
+    """
+    Leave-one-case-out rate differences for every entity, by subtraction.
+
+    Removing case c subtracts row c of the per-case tables from the totals,
+    so all C x K jackknife effects cost O(C x K) after aggregation.
+
+    Parameters:
+    min_n: an effect is NaN when the entity or the rest has fewer than
+           min_n holdings once the case is removed
+
+    Returns:
+        (full_effects, loo_effects) with shapes (K,) and (C x K)
+    """
+    n, s = case_stats['n'], case_stats['s']
+    n_total, s_total = case_stats['n_case'].sum(), case_stats['s_case'].sum()
+
+    p_entity, p_other = _rates(s.sum(axis=0), n.sum(axis=0), s_total, n_total)
+    full = p_entity - p_other
+
+    n_entity = n.sum(axis=0) - n
+    n_rest = (n_total - case_stats['n_case'])[:, None]
+    p_entity, p_other = _rates(s.sum(axis=0) - s, n_entity,
+                               (s_total - case_stats['s_case'])[:, None], n_rest)
+    loo = p_entity - p_other
+    loo[(n_entity < min_n) | (n_rest - n_entity < min_n)] = np.nan
+
+    return full, loo
+
+def case_majority_tables(case_stats):
+    """
+    2x2 tables for every entity at the case level (majority-vote outcome).
+
+    A case is pro-DS when more than half its holdings are, and belongs to an
+    entity when any of its holdings does.
+
+    Returns:
+        (a, b, c, d) arrays of length K: entity pro-DS / other, rest pro-DS / other
+    """
+    majority = (case_stats['s_case'] > case_stats['n_case'] / 2).astype(float)
+    member = (case_stats['n'] > 0).astype(float)
+
+    n_entity = member.sum(axis=0)
+    a = majority @ member
+    c = majority.sum() - a
+    d = (len(majority) - n_entity) - c
+
+    return a, n_entity - a, c, d
+
+def inverse_weighted_rates(case_stats):
+    """
+    Entity and rest pro-DS rates with weight 1/holdings_per_case per holding.
+
+    Returns:
+        (entity_rate, other_rate, entity_weight) arrays of length K
+    """
+    inv = 1.0 / case_stats['n_case']
+    w_entity = inv @ case_stats['n']
+    ws_entity = inv @ case_stats['s']
+
+    entity_rate, other_rate = _rates(ws_entity, w_entity,
+                                     inv @ case_stats['s_case'], inv @ case_stats['n_case'])
+    return entity_rate, other_rate, w_entity
+
+# =============================================================================
+# CONFIDENCE INTERVALS
+# =============================================================================
+
+def percentile_ci(boot, alpha=0.05):
+    """Percentile bootstrap interval."""
+    low, high = np.quantile(boot, [alpha / 2, 1 - alpha / 2])
+    return float(low), float(high)
+
+def bca_ci(boot, observed, jackknife, alpha=0.05):
+    """
+    Bias-corrected and accelerated (BCa) bootstrap interval.
+
+    Parameters:
+    boot: bootstrap replicates of the statistic
+    observed: full-sample statistic
+    jackknife: leave-one-out values of the statistic (for the acceleration)
+    """
+    jackknife = jackknife[np.isfinite(jackknife)]
+
+    prop_below = np.mean(boot < observed) + 0.5 * np.mean(boot == observed)
+    prop_below = min(max(prop_below, 1.0 / (len(boot) + 1)), len(boot) / (len(boot) + 1.0))
+    z0 = stats.norm.ppf(prop_below)
+
+    diffs = jackknife.mean() - jackknife
+    denom = 6.0 * (np.sum(diffs ** 2) ** 1.5)
+    accel = np.sum(diffs ** 3) / denom if denom > 0 else 0.0
+
+    z = stats.norm.ppf([alpha / 2, 1 - alpha / 2])
+    adjusted = stats.norm.cdf(z0 + (z0 + z) / (1 - accel * (z0 + z)))
+
+    low, high = np.quantile(boot, adjusted)
+    return float(low), float(high)
+
+def studentized_ci(boot, boot_se, observed, observed_se, alpha=0.05):
+    """
+    Studentized (bootstrap-t) interval using the plug-in SE of each replicate.
+    """
+    valid = np.isfinite(boot_se) & (boot_se > 0)
+    if valid.sum() < 2 or not observed_se > 0:
+        return float('nan'), float('nan')
+
+    t_stats = (boot[valid] - observed) / boot_se[valid]
+    t_low, t_high = np.quantile(t_stats, [alpha / 2, 1 - alpha / 2])
+
+    return float(observed - t_high * observed_se), float(observed - t_low * observed_se)
+
+# =============================================================================
+# BOOTSTRAP DRIVER
+# =============================================================================
+
+def bootstrap_rate_differences(y, groupings, n_boot=10000, seed=42, alpha=0.05,
+                               min_valid=0.9, executor=None):
+    """
+    Bootstrap every entity-vs-rest rate difference from one shared resample.
+
+    A (B x n) multinomial count matrix is drawn once (chunk by chunk) and
+    every effect of every grouping column is scored from it with matrix
+    products against the stacked one-hot indicators.
+
+    Parameters:
+    y: binary outcome vector (length n)
+    groupings: dict mapping a column name to its label vector, e.g.
+               {'chamber': [...], 'judge_rapporteur': [...]}
+    n_boot: number of bootstrap replicates
+    seed: root seed of the per-replicate SeedSequences
+    min_valid: minimum share of replicates in which an effect must be
+               defined (entity and rest both drawn) to be reported
+    executor: ResamplingExecutor to spread replicates over (default: serial)
+
+    Returns:
+        dict keyed by (column, level) with observed effect, SE and the
+        percentile, BCa and studentized intervals
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    keys, indicators = stack_indicators(groupings)
+
+    observed, observed_se = rate_differences(np.ones(n), y, indicators)
+
+    jackknife = jackknife_rate_differences(y, indicators)
+
+    executor = executor or ResamplingExecutor(n_workers=1)
+    boot, boot_se = executor.map_blocks(_rate_difference_block, n_boot,
+                                        args=(y, indicators), seed=seed,
+                                        label='bootstrap')
+
+    results = {}
+    for k, key in enumerate(keys):
+        if not np.isfinite(observed[k]):
+            continue
+
+        valid = np.isfinite(boot[:, k])
+        if valid.sum() < n_boot * min_valid:
+            continue
+
+        draws = boot[valid, k]
+        results[key] = {
+            'observed': float(observed[k]),
+            'se': float(draws.std(ddof=1)),
+            'n_entity': int(indicators[:, k].sum()),
+            'n_valid': int(valid.sum()),
+            'ci_percentile': percentile_ci(draws, alpha),
+            'ci_bca': bca_ci(draws, observed[k], jackknife[:, k], alpha),
+            'ci_studentized': studentized_ci(draws, boot_se[valid, k],
+                                             observed[k], observed_se[k], alpha),
+        }
+
+    return results
+
+# =============================================================================
+# PERMUTATION TESTS
+# =============================================================================
+
+def permutation_indices(rngs, n):
+    """(len(rngs) x n) array whose rows are random permutations of range(n)."""
+    return np.stack([rng.permutation(n) for rng in rngs])
+
+def _permutation_block(rep_ids, rngs, stat_fn, n):
+    """Executor block: null statistics for a chunk of permutations."""
+    return stat_fn(permutation_indices(rngs, n))
+
+def correlation_statistic(x, y):
+    """
+    Pearson correlation as a block statistic for permutation_test.
+
+    x is the permuted variable. Both vectors are standardized once, so the
+    correlations of a whole permutation block are one matrix-vector product.
+
+    Returns:
+        (observed_r, stat_fn) where stat_fn maps a (block x n) permutation
+        index array to the block's correlations
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    zx = (x - x.mean()) / x.std()
+    zy = (y - y.mean()) / y.std()
+
+    return float(zx @ zy / len(x)), partial(_permuted_correlations, zx, zy)
+
+def _permuted_correlations(zx, zy, perm_idx):
+    """Correlations of zx permuted by each row of perm_idx with zy."""
+    return zx[perm_idx] @ zy / len(zx)
+
+def _extreme_mask(null_stats, observed, alternative):
+    """Boolean mask of null statistics at least as extreme as the observed one."""
+    tol = 1e-12 * max(1.0, abs(observed))
+    if alternative == 'greater':
+        return null_stats >= observed - tol
+    if alternative == 'less':
+        return null_stats <= observed + tol
+    return np.abs(null_stats) >= abs(observed) - tol
+
+def permutation_test(stat_fn, observed, n, n_perm=10000, alternative='two-sided',
+                     alpha=0.05, sequential=True, h=20, stop_when_significant=False,
+                     min_perm=1000, block_size=5000, seed=42, executor=None):
+    """
+    Block-vectorized Monte Carlo permutation test with sequential stopping.
+
+    Permutation indices are generated a block at a time and stat_fn scores
+    the whole block at once; each block is split across the executor's
+    workers. Stopping rules are only checked at block boundaries, so the
+    result does not depend on the number of workers. With sequential=True
+    the test stops early:
+    - Besag-Clifford: at an exceedance (a null statistic at least as extreme
+      as the observed one), once there have been at least h of them and the
+      99% Clopper-Pearson lower bound for p is above alpha. The p-value is
+      then clearly not significant and is estimated as exceedances / m
+      (m = permutations drawn so far). A p-value that may be near or below
+      alpha never triggers this rule, so it gets all n_perm permutations;
+    - with stop_when_significant=True, also once the 99% Clopper-Pearson
+      interval for p lies entirely below alpha (after min_perm permutations).
+      Leave this off when a precise small p-value is wanted.
+
+    Parameters:
+    stat_fn: maps a (block x n) permutation index array to null statistics
+             (must be picklable to run on more than one worker)
+    observed: observed value of the statistic
+    n: number of observations being permuted
+    alternative: 'two-sided', 'greater' or 'less'
+
+    Returns:
+        dict with p_value, Clopper-Pearson interval, permutations used, the
+        stopping reason and moments of the null distribution
+    """
+    executor = executor or ResamplingExecutor(n_workers=1)
+
+    drawn = 0
+    exceed = 0
+    null_sum = 0.0
+    null_sumsq = 0.0
+    stop_reason = 'completed'
+
+    for start in range(0, n_perm, block_size):
+        size = min(block_size, n_perm - start)
+        null_stats = executor.map_blocks(_permutation_block, size, args=(stat_fn, n),
+                                         seed=seed, start=start, label='permutations')
+        extreme = _extreme_mask(null_stats, observed, alternative)
+        hits = int(extreme.sum())
+
+        if sequential and exceed + hits >= h:
+            # Besag-Clifford: stop at the first exceedance that is at least the
+            # h-th and puts the Clopper-Pearson lower bound above alpha
+            positions = np.flatnonzero(extreme)
+            counts = exceed + np.arange(1, len(positions) + 1)
+            positions, counts = positions[counts >= h], counts[counts >= h]
+            m = drawn + positions + 1
+            clearly_large = stats.beta.ppf(0.005, counts, m - counts + 1) > alpha
+            if clearly_large.any():
+                first = int(np.argmax(clearly_large))
+                null_stats = null_stats[:positions[first] + 1]
+                hits = int(counts[first] - exceed)
+                stop_reason = 'besag_clifford'
+
+        drawn += len(null_stats)
+        exceed += hits
+        null_sum += float(null_stats.sum())
+        null_sumsq += float(np.sum(null_stats ** 2))
+
+        if stop_reason != 'completed':
+            break
+
+        if sequential and stop_when_significant and drawn >= min_perm:
+            if stats.beta.ppf(0.995, exceed + 1, drawn - exceed) < alpha:
+                stop_reason = 'significant'
+                break
+
+    if stop_reason == 'besag_clifford':
+        p_value = exceed / drawn
+    else:
+        p_value = (exceed + 1) / (drawn + 1)
+
+    p_low = stats.beta.ppf(alpha / 2, exceed, drawn - exceed + 1) if exceed > 0 else 0.0
+    p_high = stats.beta.ppf(1 - alpha / 2, exceed + 1, drawn - exceed) if exceed < drawn else 1.0
+    null_mean = null_sum / drawn
+
+    return {
+        'observed': float(observed),
+        'p_value': float(p_value),
+        'p_ci': (float(p_low), float(p_high)),
+        'n_permutations': drawn,
+        'n_exceedances': exceed,
+        'stop_reason': stop_reason,
+        'null_mean': null_mean,
+        'null_sd': float(np.sqrt(max(null_sumsq / drawn - null_mean ** 2, 0.0))),
+    }
+
+# =============================================================================
+# CASE-LEVEL RANDOMIZATION INFERENCE
+# =============================================================================
+
+def _case_mode(codes, values, n_cases):
+    """Most frequent value per case (the first seen on ties)."""
+    counts = [{} for _ in range(n_cases)]
+    for c, v in zip(codes, values):
+        counts[c][v] = counts[c].get(v, 0) + 1
+    return np.array([max(case.items(), key=lambda kv: kv[1])[0] for case in counts],
+                    dtype=object)
+
+def stratified_permutations(rngs, strata):
+    """
+    (len(rngs) x C) permutations that only move cases within their stratum.
+
+    Adding a uniform draw to the integer stratum code and sorting shuffles
+    each stratum's block while keeping the blocks in place, so the whole
+    block of permutations is one batched argsort.
+    """
+    strata = np.asarray(strata)
+    base = np.argsort(strata, kind='stable')
+    noise = np.stack([rng.random(len(strata)) for rng in rngs])
+    shuffled = np.argsort(strata[None, :] + noise, axis=1)
+    perm = np.empty_like(shuffled)
+    perm[:, base] = shuffled
+    return perm
+
+def label_statistics(codes, n_case, s_case, n_levels):
+    """
+    Holding-level entity-minus-rest rate differences and the omnibus
+    chi-square for one or many case labelings.
+
+    Parameters:
+    codes: level code per case, (C,) or (B x C)
+    n_case, s_case: holdings and pro-DS holdings per case
+
+    Returns:
+        (differences, chi2) with shapes (..., K) and (...)
+    """
+    codes = np.atleast_2d(codes)
+    rows = np.arange(codes.shape[0])[:, None] * n_levels
+    flat = (codes + rows).ravel()
+    size = codes.shape[0] * n_levels
+    n_entity = np.bincount(flat, weights=np.tile(n_case, codes.shape[0]),
+                           minlength=size).reshape(-1, n_levels)
+    s_entity = np.bincount(flat, weights=np.tile(s_case, codes.shape[0]),
+                           minlength=size).reshape(-1, n_levels)
+
+    n_total, s_total = n_case.sum(), s_case.sum()
+    p = s_total / n_total
+    p_entity, p_other = _rates(s_entity, n_entity, s_total, n_total)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = np.nansum((s_entity - n_entity * p) ** 2 / (n_entity * p * (1 - p)), axis=1)
+    return p_entity - p_other, chi2
+
+def _randomization_block(rep_ids, rngs, codes, strata, n_case, s_case, n_levels):
+    """Executor block: statistics of a chunk of within-stratum relabelings."""
+    perm = stratified_permutations(rngs, strata)
+    return label_statistics(codes[perm], n_case, s_case, n_levels)
+
+def case_randomization_test(case_ids, y, labels, strata=None, n_perm=10000, seed=42,
+                            executor=None):
+    """
+    Randomization inference for a case-level label (chamber, rapporteur).
+
+    Cases, not holdings, are assigned to chambers and rapporteurs, so the
+    null distribution permutes the label across cases (within strata when
+    given) and recomputes the holding-level statistics: every level's
+    entity-minus-rest pro-DS rate difference and the omnibus chi-square.
+    Each case keeps its holdings and outcomes; only the label moves.
+
+    Parameters:
+    case_ids: case identifier per holding
+    y: binary outcome per holding
+    labels: label per holding (constant within a case; the case's most
+            frequent label is used). Cases with a missing or empty label
+            are left out.
+    strata: optional stratum per holding (e.g. year or concept cluster),
+            reduced to each case's most frequent value; labels are only
+            exchanged between cases of the same stratum
+    n_perm: number of relabelings
+
+    Returns:
+        dict with levels, per-level n_cases, n_holdings, observed
+        differences, null_sd and two-sided p_values (+1 corrected), the
+        omnibus chi-square and its p-value, and the number of strata
+    """
+    y = np.asarray(y, dtype=float)
+    codes, cases = _factorize(case_ids)
+    n_case = np.bincount(codes, minlength=len(cases)).astype(float)
+    s_case = np.bincount(codes, weights=y, minlength=len(cases))
+
+    case_labels = _case_mode(codes, labels, len(cases))
+    valid = np.array([l is not None and l == l and l != '' for l in case_labels], dtype=bool)
+    levels = sorted(set(case_labels[valid]))
+    index = {level: k for k, level in enumerate(levels)}
+    level_codes = np.array([index[l] for l in case_labels[valid]], dtype=np.int64)
+    n_case, s_case = n_case[valid], s_case[valid]
+
+    if strata is None:
+        strata_codes = np.zeros(len(level_codes), dtype=np.int64)
+    else:
+        strata_codes, _ = _factorize(_case_mode(codes, strata, len(cases))[valid])
+
+    observed, observed_chi2 = label_statistics(level_codes, n_case, s_case, len(levels))
+    observed, observed_chi2 = observed[0], observed_chi2[0]
+
+    args = (level_codes, strata_codes, n_case, s_case, len(levels))
+    if executor is None:
+        null, null_chi2 = _randomization_block(np.arange(n_perm),
+                                               replicate_rngs(seed, range(n_perm)), *args)
+    else:
+        null, null_chi2 = executor.map_blocks(_randomization_block, n_perm, args=args,
+                                              seed=seed, label='case relabelings')
+
+    # Levels whose relabeled entity or rest is empty give NaN and are not counted
+    n_valid = (~np.isnan(null)).sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        extreme = np.abs(null) >= np.abs(observed) - 1e-12
+    p_values = (extreme.sum(axis=0) + 1) / (n_valid + 1)
+    null_sd = np.nanstd(null, axis=0) if n_perm else np.full(len(levels), np.nan)
+    chi2_exceed = _extreme_mask(null_chi2, observed_chi2, 'greater').sum()
+
+    return {
+        'levels': levels,
+        'n_cases': np.bincount(level_codes, minlength=len(levels)),
+        'n_holdings': np.bincount(level_codes, weights=n_case, minlength=len(levels)).astype(int),
+        'observed': observed,
+        'null_sd': null_sd,
+        'p_values': np.where(np.isnan(observed), np.nan, p_values),
+        'chi2': float(observed_chi2),
+        'chi2_p_value': float((chi2_exceed + 1) / (n_perm + 1)),
+        'n_permutations': int(n_perm),
+        'n_strata': int(strata_codes.max() + 1) if len(strata_codes) else 0,
+    }
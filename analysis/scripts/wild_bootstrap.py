@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+wild_bootstrap.py
+=================
+Wild cluster bootstrap for few-cluster inference on case-clustered holdings.
+
+The holdings come from only ~67 cases, and CR1 cluster-robust Wald tests
+over-reject with that few clusters. Both bootstraps here impose the null
+hypothesis beta_k = 0 (restricted estimation) and flip the sign of whole
+clusters with Rademacher (+-1) or Webb six-point weights v_g:
+
+- linear probability model: the restricted wild cluster bootstrap-t (WCR).
+  With y* = y~ + v_g u~ (restricted fit and residuals), every replicate's
+  coefficient and CR1 cluster scores are linear in v: beta*_k = c_k . v
+  and s*_k = A_k v, with c_k and the G x G matrix A_k computed once per
+  coefficient, so no replicate refits anything
+- logit: the wild score bootstrap (Kline & Santos 2012). The restricted MLE
+  is fitted once per coefficient; its per-cluster scores s_g and Hessian H
+  are reused by every replicate, which only reweights the projected scores
+  w_g = (H^-1 s_g)_k: t* = sum v_g w_g / sqrt(sum v_g^2 w_g^2)
+
+Replicates are blocks of a ResamplingExecutor (one generator per replicate),
+so 9,999 replicates per coefficient are a few matrix products and do not
+depend on the number of workers. P-values follow the permutation tests:
+(exceedances + 1) / (B + 1), symmetric (two-sided).
+
+Usage:
+    spec = get_spec(formula, df)
+    groups = df['case_id'].values[spec.rows]
+    lpm = wild_cluster_ols(spec.X, spec.y, groups, spec.columns)
+    logit = wild_score_logit(spec.X, spec.y, groups, spec.columns,
+                             test=['pro_ds_purpose'], executor=executor)
+    logit['pro_ds_purpose']['p_boot']
+"""
+
+import numpy as np
+from scipy import stats
+from scipy.special import expit
+
+from resampling import ResamplingExecutor
+
+N_WILD_BOOT = 9999
+
+# Webb (2014) six-point weights: +-sqrt(1/2), +-1, +-sqrt(3/2)
+WEBB_WEIGHTS = np.array([-np.sqrt(1.5), -1.0, -np.sqrt(0.5), np.sqrt(0.5), 1.0, np.sqrt(1.5)])
+
+LOGIT_MAX_ITER = 100
+
+# =============================================================================
+# CLUSTER WEIGHTS
+# =============================================================================
+
+def cluster_weights(rngs, n_clusters, kind='rademacher'):
+    """(replicates x clusters) wild weights, one row per replicate generator."""
+    if kind == 'rademacher':
+        return np.stack([rng.integers(0, 2, n_clusters) * 2.0 - 1.0 for rng in rngs])
+    if kind == 'webb':
+        return np.stack([WEBB_WEIGHTS[rng.integers(0, 6, n_clusters)] for rng in rngs])
+    raise ValueError(f"unknown wild weights: {kind}")
+
+def _cluster_indicators(clusters):
+    """Cluster codes and the (n x G) indicator matrix D."""
+    codes = np.unique(np.asarray(clusters), return_inverse=True)[1].ravel()
+    return codes, np.eye(codes.max() + 1)[codes]
+
+def _small_sample_factor(n, n_params, n_clusters):
+    """CR1 correction G/(G-1) * (N-1)/(N-K), as statsmodels' cluster covariance."""
+    return n_clusters / (n_clusters - 1) * (n - 1) / (n - n_params)
+
+def _test_positions(columns, test):
+    """Positions of the tested columns (default: every column but the intercept)."""
+    if test is None:
+        return [k for k, name in enumerate(columns) if name != 'Intercept']
+    return [columns.index(name) for name in test]
+
+def _bootstrap_p(null_stats, observed):
+    """Symmetric bootstrap p-values, (exceedances + 1) / (B + 1), per column."""
+    tol = 1e-12 * np.maximum(1.0, np.abs(observed))
+    exceed = (np.abs(null_stats) >= np.abs(observed) - tol).sum(axis=0)
+    return (exceed + 1) / (len(null_stats) + 1)
+
+# =============================================================================
+# LINEAR PROBABILITY MODEL: WCR BOOTSTRAP-T
+# =============================================================================
+
+def _wild_ols_block(rep_ids, rngs, kind, C, A, factor):
+    """Executor block: bootstrap t-statistics (replicates x tested columns)."""
+    V = cluster_weights(rngs, C.shape[0], kind)
+    beta = V @ C
+    scores = np.einsum('bh,kgh->bkg', V, A, optimize=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return beta / np.sqrt(factor * (scores ** 2).sum(axis=-1))
+
+def wild_cluster_ols(X, y, clusters, columns, test=None, n_boot=N_WILD_BOOT,
+                     weights='rademacher', seed=42, executor=None):
+    """
+    OLS (linear probability) coefficients with CR1 and WCR bootstrap p-values.
+
+    Args:
+        X: (n x K) design matrix (e.g. ModelSpec.X)
+        y: outcome
+        clusters: cluster label per row (e.g. case_id)
+        columns: design column names
+        test: columns to test (default: all but 'Intercept')
+        weights: 'rademacher' or 'webb'
+
+    Returns:
+        dict keyed by column with coef, se (CR1), t, p_cluster (normal
+        approximation, as statsmodels) and p_boot (WCR bootstrap-t)
+    """
+    executor = executor or ResamplingExecutor(n_workers=1)
+    X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+    codes, D = _cluster_indicators(clusters)
+    n, n_params = X.shape
+    factor = _small_sample_factor(n, n_params, D.shape[1])
+    positions = _test_positions(columns, test)
+
+    Q = np.linalg.solve(X.T @ X, X.T)           # (X'X)^-1 X'
+    beta = Q @ y
+    residuals = y - X @ beta
+    scores = D.T @ (Q[positions].T * residuals[:, None])
+    se = np.sqrt(factor * (scores ** 2).sum(axis=0))
+    observed = beta[positions] / se
+
+    # Per tested column: restricted residuals u~, then beta* = c . v and
+    # cluster scores s* = A v for any weight vector v
+    C = np.empty((D.shape[1], len(positions)))
+    A = np.empty((len(positions), D.shape[1], D.shape[1]))
+    for j, k in enumerate(positions):
+        Xr = np.delete(X, k, axis=1)
+        restricted = y - Xr @ np.linalg.lstsq(Xr, y, rcond=None)[0]
+        U = D * restricted[:, None]
+        QU = Q @ U
+        MU = U - X @ QU
+        C[:, j] = QU[k]
+        A[j] = D.T @ (Q[k][:, None] * MU)
+
+    null_stats = executor.map_blocks(_wild_ols_block, n_boot, args=(weights, C, A, factor),
+                                     seed=seed, label='wild cluster bootstrap')
+    p_boot = _bootstrap_p(null_stats, observed)
+
+    return {
+        columns[k]: {
+            'coef': float(beta[k]),
+            'se': float(se[j]),
+            't': float(observed[j]),
+            'p_cluster': float(2 * stats.norm.sf(abs(observed[j]))),
+            'p_boot': float(p_boot[j]),
+        }
+        for j, k in enumerate(positions)
+    }
+
+# =============================================================================
+# LOGIT: WILD SCORE BOOTSTRAP
+# =============================================================================
+
+def fit_logit(X, y, start=None, tol=1e-10):
+    """
+    Logit MLE by Newton's method; returns (beta, converged).
+
+    Converged means a negligible step at a (near-)zero score, so a start
+    that saturates the fitted probabilities (Hessian ~ 0) is not mistaken
+    for the optimum.
+    """
+    beta = np.zeros(X.shape[1]) if start is None else np.array(start, dtype=float)
+    for _ in range(LOGIT_MAX_ITER):
+        mu = expit(X @ beta)
+        gradient = X.T @ (y - mu)
+        hessian = X.T @ (X * (mu * (1 - mu))[:, None])
+        step = np.linalg.lstsq(hessian, gradient, rcond=None)[0]
+        beta += step
+        if np.abs(step).max() < tol and np.abs(gradient).max() < 1e-6:
+            return beta, True
+    return beta, False
+
+def _cluster_scores(X, y, beta, D):
+    """Per-cluster scores (G x K) and the Hessian at beta."""
+    mu = expit(X @ beta)
+    hessian = X.T @ (X * (mu * (1 - mu))[:, None])
+    return D.T @ (X * (y - mu)[:, None]), hessian
+
+def _wild_score_block(rep_ids, rngs, kind, W):
+    """Executor block: bootstrap score statistics (replicates x tested columns)."""
+    V = cluster_weights(rngs, W.shape[0], kind)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (V @ W) / np.sqrt((V ** 2) @ (W ** 2))
+
+def wild_score_logit(X, y, clusters, columns, test=None, n_boot=N_WILD_BOOT,
+                     weights='rademacher', seed=42, executor=None):
+    """
+    Logit coefficients with CR1 and wild score bootstrap p-values.
+
+    Each tested coefficient gets one restricted fit (warm-started from the
+    unrestricted estimate with beta_k = 0, restarted from zero if that does
+    not converge, e.g. when dropping an uncentred year leaves the intercept
+    far off); its cluster scores and Hessian give the observed robust score
+    statistic and every bootstrap replicate.
+
+    Returns:
+        dict keyed by column with coef, se (CR1), z, p_cluster (Wald, as
+        statsmodels' cluster covariance), score (restricted robust score
+        statistic) and p_boot (wild score bootstrap); NaN when the
+        unrestricted or restricted fit does not converge
+    """
+    executor = executor or ResamplingExecutor(n_workers=1)
+    X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+    codes, D = _cluster_indicators(clusters)
+    n, n_params = X.shape
+    factor = _small_sample_factor(n, n_params, D.shape[1])
+    positions = _test_positions(columns, test)
+
+    beta, converged = fit_logit(X, y)
+    scores, hessian = _cluster_scores(X, y, beta, D)
+    bread = np.linalg.pinv(hessian)
+    covariance = factor * bread @ (scores.T @ scores) @ bread
+    se = np.sqrt(np.diag(covariance))[positions]
+    z = beta[positions] / se
+
+    # Projected restricted scores w_g = (H^-1 s_g)_k, one column per test
+    W = np.full((D.shape[1], len(positions)), np.nan)
+    for j, k in enumerate(positions):
+        Xr = np.delete(X, k, axis=1)
+        restricted, ok = fit_logit(Xr, y, start=np.delete(beta, k))
+        if not ok:
+            restricted, ok = fit_logit(Xr, y)
+        if not (ok and converged):
+            continue
+        scores_r, hessian_r = _cluster_scores(X, y, np.insert(restricted, k, 0.0), D)
+        W[:, j] = scores_r @ np.linalg.pinv(hessian_r)[k]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = W.sum(axis=0) / np.sqrt((W ** 2).sum(axis=0))
+    null_stats = executor.map_blocks(_wild_score_block, n_boot, args=(weights, W),
+                                     seed=seed, label='wild score bootstrap')
+    p_boot = np.where(np.isnan(observed), np.nan, _bootstrap_p(null_stats, observed))
+
+    return {
+        columns[k]: {
+            'coef': float(beta[k]) if converged else np.nan,
+            'se': float(se[j]) if converged else np.nan,
+            'z': float(z[j]) if converged else np.nan,
+            'p_cluster': float(2 * stats.norm.sf(abs(z[j]))) if converged else np.nan,
+            'score': float(observed[j]),
+            'p_boot': float(p_boot[j]),
+        }
+        for j, k in enumerate(positions)
+    }